@@ -1,66 +1,419 @@
-from flask import Flask, request, jsonify
-import pandas as pd
-import joblib
+import time
+
+# Mốc thời gian bắt đầu import module, dùng để đo thời gian khởi động
+_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, request, jsonify, g, Response
 from datetime import datetime
-import numpy as np
+import atexit
+import math
+import os
+import threading
+
+from utils.metrics import REGISTRY, timed, set_enabled
+from pricing.registry import (PricingSystemRegistry, RegionLoadError, DEFAULT_REGION_DIR,
+                              DEFAULT_MEMORY_BUDGET_MB)
+from pricing.quotes import QuoteStore, DEFAULT_QUOTE_TTL_S, DEFAULT_MAX_QUOTES
+
+# pandas/numpy/sklearn/joblib được import khi tải mô hình trong luồng khởi động,
+# server nhận kết nối ngay mà không phải chờ các thư viện này
 
 app = Flask(__name__)
 
-# Tải mô hình và preprocessor
-try:
-    pricing_system = joblib.load("ride_pricing_system.pkl")
-    print("Đã tải hệ thống định giá chuyến xe")
-except:
-    pricing_system = None
-    print("Chưa tạo hệ thống định giá chuyến xe. Hãy chạy main.py trước.")
+# Số chuyến tối đa cho một lần giả lập thống kê (request đồng bộ nên giữ thời gian xử lý dưới vài giây)
+MAX_ANALYTICS_RIDES = 200000
+
+# Số bin tối đa của histogram giá trong thống kê
+MAX_ANALYTICS_BINS = 200
+
+# Số ô tối đa của lưới quét tham số
+MAX_SWEEP_CELLS = 50000
+
+# Các chuyến mẫu dùng để khởi động (warm-up): đủ loại xe, thời tiết, giờ cao điểm/thấp điểm
+WARMUP_RIDES = [
+    {'vehicle_type': vehicle_type, 'weather_condition': weather, 'hour': hour,
+     'distance_km': 3.0 + 4 * vehicle_type, 'traffic_level': 3 + 2 * weather,
+     'area_demand': 40 + 20 * weather, 'available_drivers': 12 - 3 * weather}
+    for vehicle_type in range(4)
+    for weather in range(3)
+    for hour in (8, 14)
+]
+
+# Chuyến dài nằm ngoài bảng giá tính trước, để khởi động cả đường dự đoán bằng mô hình
+WARMUP_LONG_RIDE = {'vehicle_type': 1, 'weather_condition': 0, 'hour': 14, 'distance_km': 45.0,
+                    'traffic_level': 3, 'area_demand': 40, 'available_drivers': 12}
+
+# Hệ thống định giá theo khu vực, tải khi có request đầu tiên cho khu vực đó
+region_registry = PricingSystemRegistry(
+    region_dir=os.environ.get('REGION_MODEL_DIR', DEFAULT_REGION_DIR),
+    memory_budget_mb=float(os.environ.get('REGION_MEMORY_BUDGET_MB', DEFAULT_MEMORY_BUDGET_MB))
+)
+
+# Các mô hình thử nghiệm chấm shadow trên lưu lượng thực, dạng "tên=đường_dẫn,..."
+SHADOW_MODELS = os.environ.get('SHADOW_MODELS', '')
+
+# Khởi tạo sau khi hệ thống định giá sẵn sàng nếu có cấu hình SHADOW_MODELS
+shadow_scorer = None
+
+# Thư mục nhật ký báo giá (để trống để tắt); nhật ký được mở trong luồng khởi động
+QUOTE_JOURNAL_DIR = os.environ.get('QUOTE_JOURNAL_DIR', 'quote_journal')
+quote_journal = None
+
+# Báo giá được giữ để khách xác nhận theo mã mà không phải tính lại giá
+quote_store = QuoteStore(
+    ttl=float(os.environ.get('QUOTE_TTL_S', DEFAULT_QUOTE_TTL_S)),
+    max_quotes=int(os.environ.get('QUOTE_STORE_MAX', DEFAULT_MAX_QUOTES))
+)
+
+# Hệ thống định giá được tải và khởi động trong start_pricing_system
+pricing_system = None
+_ready = threading.Event()
+_startup_lock = threading.Lock()
+_startup_thread = None
+STARTUP = {}
+
+def start_pricing_system(path="ride_pricing_system.pkl", background=True):
+    """
+    Tải hệ thống định giá và khởi động nó trên các chuyến mẫu
+    
+    Khi chạy nền, server vẫn nhận request trong lúc tải; /api/health trả về
+    'starting' (HTTP 503) cho đến khi khởi động xong
+    
+    Args:
+        path: Đường dẫn file hệ thống định giá
+        background: Chạy trong luồng nền hay chạy ngay
+    """
+    global _startup_thread
+    
+    with _startup_lock:
+        if _startup_thread is not None or _ready.is_set():
+            return
+        if background:
+            _startup_thread = threading.Thread(target=_load_and_warm_up, args=(path,),
+                                               name='pricing-warmup', daemon=True)
+            _startup_thread.start()
+            return
+    
+    _load_and_warm_up(path)
+
+def wait_until_ready(timeout=None):
+    """
+    Chờ đến khi hệ thống định giá khởi động xong
+    
+    Args:
+        timeout: Thời gian chờ tối đa (giây), None để chờ mãi
+    
+    Returns:
+        True nếu đã sẵn sàng
+    """
+    return _ready.wait(timeout)
+
+def _load_and_warm_up(path):
+    global pricing_system
+    
+    if QUOTE_JOURNAL_DIR:
+        _start_quote_journal(QUOTE_JOURNAL_DIR)
+    
+    try:
+        started = time.perf_counter()
+        import joblib
+        
+        try:
+            system = joblib.load(path)
+        except Exception:
+            print("Chưa tạo hệ thống định giá chuyến xe. Hãy chạy main.py trước.")
+            return
+        STARTUP['load_s'] = time.perf_counter() - started
+        print("Đã tải hệ thống định giá chuyến xe")
+        
+        # Khởi động các nhánh tính giá (một chuyến và theo lô) để request đầu tiên
+        # không phải trả chi phí khởi tạo; không ghi vào chỉ số độ trễ
+        started = time.perf_counter()
+        set_enabled(False)
+        try:
+            import numpy as np
+            
+            quote_started = time.perf_counter()
+            system.get_ride_price(_build_ride_frame(WARMUP_RIDES[0]))
+            STARTUP['first_quote_ms'] = (time.perf_counter() - quote_started) * 1000
+            
+            for ride in WARMUP_RIDES + [WARMUP_LONG_RIDE]:
+                system.get_ride_price(_build_ride_frame(ride))
+            
+            batch = {key: np.array([ride[key] for ride in WARMUP_RIDES]) for key in WARMUP_RIDES[0]}
+            system.batch_price_rides(_build_ride_frame(batch, n_rows=len(WARMUP_RIDES)))
+            
+            quote_started = time.perf_counter()
+            system.get_ride_price(_build_ride_frame(WARMUP_RIDES[-1]))
+            STARTUP['warm_quote_ms'] = (time.perf_counter() - quote_started) * 1000
+        except Exception as e:
+            # Lỗi khi warm-up không ngăn việc phục vụ request
+            print(f"Lỗi khi khởi động hệ thống định giá: {e}")
+        finally:
+            set_enabled(True)
+        STARTUP['warmup_s'] = time.perf_counter() - started
+        
+        pricing_system = system
+    finally:
+        STARTUP['ready_after_s'] = time.perf_counter() - _IMPORT_STARTED
+        print("Thời gian khởi động:", ", ".join(f"{key}={value:.3f}" for key, value in STARTUP.items()))
+        _ready.set()
+    
+    # Mô hình thử nghiệm không cần thiết để phục vụ request nên được tải sau khi sẵn sàng
+    if pricing_system is not None and SHADOW_MODELS:
+        _start_shadow_scoring(SHADOW_MODELS)
+
+def _start_quote_journal(directory):
+    """
+    Mở nhật ký báo giá và bắt đầu luồng ghi
+    
+    Args:
+        directory: Thư mục chứa các segment nhật ký
+    """
+    global quote_journal
+    
+    from pricing.journal import QuoteJournal
+    
+    try:
+        quote_journal = QuoteJournal(directory)
+        # Ghi hết các bản ghi đang chờ và fsync trước khi trình thông dịch kết thúc
+        atexit.register(quote_journal.close, 5)
+    except Exception as e:
+        print(f"Không mở được nhật ký báo giá: {e}")
+
+def _start_shadow_scoring(spec):
+    """
+    Tải các mô hình thử nghiệm và bắt đầu chấm shadow
+    
+    Args:
+        spec: Chuỗi "tên=đường_dẫn,..." của các mô hình thử nghiệm
+    """
+    global shadow_scorer
+    
+    import joblib
+    from pricing.shadow import ShadowScorer
+    
+    try:
+        candidates = {}
+        for item in spec.split(','):
+            name, path = item.split('=', 1)
+            candidates[name.strip()] = joblib.load(path.strip())
+        shadow_scorer = ShadowScorer(candidates)
+        # Dừng các luồng chấm trước khi trình thông dịch kết thúc
+        atexit.register(shadow_scorer.close, 5)
+        print(f"Đang chấm shadow với các mô hình: {', '.join(candidates)}")
+    except Exception as e:
+        print(f"Không khởi động được chấm shadow: {e}")
+
+def _resolve_pricing_system(region=None):
+    """
+    Chọn hệ thống định giá cho request: hệ thống chung hoặc của khu vực được chỉ định
+    
+    Args:
+        region: Tên khu vực (None để dùng hệ thống chung)
+    
+    Returns:
+        Tuple (hệ thống định giá hoặc None, response lỗi hoặc None)
+    """
+    if region is None:
+        if pricing_system is None:
+            return None, _not_ready_response()
+        return pricing_system, None
+    
+    # Kiểm tra tên trước khi tải để ValueError từ bên trong lần tải không bị báo là tên sai
+    try:
+        region_registry.region_path(region)
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+    
+    try:
+        return region_registry.get(region), None
+    except KeyError as e:
+        return None, (jsonify({"error": e.args[0]}), 404)
+    except RegionLoadError as e:
+        # Lần tải lỗi không được cache nên request sau sẽ thử tải lại
+        return None, (jsonify({"error": str(e)}), 503, {'Retry-After': '5'})
+    except Exception as e:
+        print(f"Lỗi khi lấy hệ thống định giá của khu vực '{region}': {e!r}")
+        return None, (jsonify({"error": f"Lỗi khi tải khu vực '{region}'"}), 500)
+
+def _not_ready_response():
+    """Response lỗi khi hệ thống định giá chưa sẵn sàng"""
+    if not _ready.is_set():
+        return jsonify({"error": "Hệ thống định giá đang khởi động"}), 503, {'Retry-After': '1'}
+    return jsonify({"error": "Hệ thống định giá chưa được khởi tạo"}), 500
+
+def _build_ride_frame(data, n_rows=1):
+    """
+    Chuẩn bị DataFrame chuyến xe từ tham số của request
+    
+    Args:
+        data: Dict tham số chuyến xe; giá trị có thể là số hoặc mảng độ dài n_rows
+        n_rows: Số dòng của DataFrame
+        
+    Returns:
+        DataFrame với thông tin chuyến xe
+    """
+    import pandas as pd
+    
+    now = datetime.now()
+    
+    return pd.DataFrame({
+        'ride_id': data.get('ride_id', 'R000001'),
+        'distance_km': data.get('distance_km', 5.0),
+        'duration_min': data.get('duration_min', 15),
+        'booking_time': now,
+        'hour': data.get('hour', now.hour),
+        'day_of_week': now.weekday(),
+        'is_weekend': 1 if now.weekday() >= 5 else 0,
+        'month': now.month,
+        'weather_condition': data.get('weather_condition', 0),
+        'traffic_level': data.get('traffic_level', 3),
+        'available_drivers': data.get('available_drivers', 10),
+        'area_demand': data.get('area_demand', 50),
+        'vehicle_type': data.get('vehicle_type', 1),  # Mặc định xe 4 chỗ
+        'user_rating': data.get('user_rating', 4.5),
+        'user_previous_rides': data.get('user_previous_rides', 5),
+        'base_price': data.get('distance_km', 5.0) * 15000  # Giá cơ bản ước tính
+    }, index=range(n_rows))
+
+def _int_arg(name, default, low, high):
+    """
+    Đọc tham số số nguyên từ query string
+    
+    Args:
+        name: Tên tham số
+        default: Giá trị mặc định khi không có tham số
+        low: Giá trị nhỏ nhất cho phép
+        high: Giá trị lớn nhất cho phép
+    
+    Returns:
+        Giá trị số nguyên
+    
+    Raises:
+        ValueError: Tham số không phải số nguyên hoặc nằm ngoài khoảng cho phép
+    """
+    raw = request.args.get(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"{name} phải là số nguyên")
+    if not low <= value <= high:
+        raise ValueError(f"{name} phải nằm trong khoảng {low}-{high}")
+    return value
+
+def _endpoint_label():
+    """Nhãn endpoint cho các chỉ số (dùng mẫu route để số nhãn không tăng theo URL)"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@app.before_request
+def _start_request_metrics():
+    g.metrics_endpoint = _endpoint_label()
+    g.metrics_started = time.perf_counter()
+    REGISTRY.request_counter(g.metrics_endpoint).inc()
+    REGISTRY.in_flight_gauge(g.metrics_endpoint).inc()
+
+@app.after_request
+def _record_response_metrics(response):
+    # Flask cũng chạy after_request cho phản hồi 500 sinh ra từ ngoại lệ chưa xử lý,
+    # nên lỗi được đếm ở đây và teardown không đếm lại
+    g.metrics_response_recorded = True
+    if response.status_code >= 400:
+        REGISTRY.error_counter(g.metrics_endpoint, response.status_code).inc()
+    return response
+
+@app.teardown_request
+def _finish_request_metrics(exc):
+    endpoint = g.pop('metrics_endpoint', None)
+    if endpoint is None:
+        return
+    if exc is not None and not g.pop('metrics_response_recorded', False):
+        REGISTRY.error_counter(endpoint, 500).inc()
+    REGISTRY.in_flight_gauge(endpoint).dec()
+    REGISTRY.request_histogram(endpoint).observe(time.perf_counter() - g.pop('metrics_started'))
 
 @app.route('/api/get-price', methods=['POST'])
 def get_ride_price():
     """API endpoint để lấy giá chuyến xe"""
-    if pricing_system is None:
-        return jsonify({"error": "Hệ thống định giá chưa được khởi tạo"}), 500
-    
     # Lấy dữ liệu từ request
     data = request.json
     
+    system, error = _resolve_pricing_system(data.get('region'))
+    if error is not None:
+        return error
+    
     # Chuẩn bị dữ liệu chuyến
-    ride_data = pd.DataFrame({
-        'ride_id': [data.get('ride_id', 'R000001')],
-        'distance_km': [data.get('distance_km', 5.0)],
-        'duration_min': [data.get('duration_min', 15)],
-        'booking_time': [datetime.now()],
-        'hour': [data.get('hour', datetime.now().hour)],
-        'day_of_week': [datetime.now().weekday()],
-        'is_weekend': [1 if datetime.now().weekday() >= 5 else 0],
-        'month': [datetime.now().month],
-        'weather_condition': [data.get('weather_condition', 0)],
-        'traffic_level': [data.get('traffic_level', 3)],
-        'available_drivers': [data.get('available_drivers', 10)],
-        'area_demand': [data.get('area_demand', 50)],
-        'vehicle_type': [data.get('vehicle_type', 1)],  # Mặc định xe 4 chỗ
-        'user_rating': [data.get('user_rating', 4.5)],
-        'user_previous_rides': [data.get('user_previous_rides', 5)],
-        'base_price': [data.get('distance_km', 5.0) * 15000]  # Giá cơ bản ước tính
-    })
+    with timed('build_frame'):
+        ride_data = _build_ride_frame(data)
     
     # Tính toán giá
     try:
-        price_result = pricing_system.get_ride_price(ride_data)
-        return jsonify({
+        price_result = system.get_ride_price(ride_data)
+        
+        quote = {
             'ride_id': data.get('ride_id', 'R000001'),
-            'optimal_price': price_result['optimal_price'],
-            'base_price': price_result['base_price'],
-            'price_percent_change': price_result['price_percent_change'],
+            'optimal_price': float(price_result['optimal_price']),
+            'base_price': float(price_result['base_price']),
+            'price_percent_change': float(price_result['price_percent_change']),
             'insights': price_result['insights']
-        })
+        }
+        if data.get('region'):
+            quote['region'] = data['region']
+        quote['quote_id'] = QuoteStore.new_quote_id()
+        
+        # Tạo response trước: báo giá chỉ được ghi nhật ký và giữ giá khi đã trả về được cho khách
+        response = jsonify({**quote, 'quote_expires_in_s': quote_store.ttl})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    
+    # Ghi nhật ký kiểm toán qua hàng đợi (chỉ chờ có giới hạn khi hàng đợi đầy)
+    if quote_journal is not None:
+        try:
+            recorded = quote_journal.record(ride_data, price_result, data.get('region'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not recorded:
+            # Mọi báo giá trả về đều phải có trong nhật ký
+            error = jsonify({"error": "Không ghi được nhật ký báo giá, vui lòng thử lại"})
+            return error, 503, {'Retry-After': '1'}
+    
+    # Chấm shadow chỉ so với hệ thống chung; không chờ khi hàng đợi đầy
+    if shadow_scorer is not None and system is pricing_system:
+        shadow_scorer.submit(ride_data, price_result)
+    
+    # Giữ giá để khách xác nhận theo mã báo giá
+    quote_store.issue(quote, quote['quote_id'])
+    return response
+
+@app.route('/api/quotes/<quote_id>', methods=['GET'])
+def get_quote(quote_id):
+    """API endpoint lấy lại một báo giá còn hạn theo mã (không tính lại giá)"""
+    found = quote_store.get(quote_id)
+    if found is None:
+        return jsonify({"error": f"Không có báo giá '{quote_id}' hoặc báo giá đã hết hạn"}), 404
+    
+    quote, expires_in = found
+    return jsonify({**quote, 'quote_expires_in_s': expires_in})
+
+@app.route('/api/quotes/<quote_id>/confirm', methods=['POST'])
+def confirm_quote(quote_id):
+    """API endpoint xác nhận một báo giá còn hạn với đúng giá đã báo"""
+    found = quote_store.confirm(quote_id)
+    if found is None:
+        return jsonify({"error": f"Không có báo giá '{quote_id}', báo giá đã hết hạn hoặc đã được xác nhận"}), 404
+    
+    quote, _ = found
+    return jsonify({**quote, 'status': 'confirmed',
+                    'confirmed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
 
 @app.route('/api/simulate-rides', methods=['GET'])
 def simulate_rides():
     """API endpoint để giả lập nhiều chuyến xe"""
-    if pricing_system is None:
-        return jsonify({"error": "Hệ thống định giá chưa được khởi tạo"}), 500
+    system, error = _resolve_pricing_system(request.args.get('region'))
+    if error is not None:
+        return error
     
     # Tạo dữ liệu mẫu
     from data.data_generator import generate_sample_ride_data
@@ -69,7 +422,7 @@ def simulate_rides():
     rides_df = generate_sample_ride_data(n_samples=n_rides)
     
     # Tính giá cho tất cả chuyến
-    results = pricing_system.batch_price_rides(rides_df)
+    results = system.batch_price_rides(rides_df)
     
     # Trả về kết quả
     response = []
@@ -90,6 +443,62 @@ def simulate_rides():
     
     return jsonify(response)
 
+@app.route('/api/ride-analytics', methods=['GET'])
+def ride_analytics():
+    """API endpoint giả lập và định giá mẫu lớn, chỉ trả về các thống kê tổng hợp"""
+    system, error = _resolve_pricing_system(request.args.get('region'))
+    if error is not None:
+        return error
+    
+    from data.data_generator import generate_sample_ride_data
+    from pricing.analytics import summarize_pricing_results
+    
+    try:
+        n_rides = _int_arg('n_rides', 100000, 1, MAX_ANALYTICS_RIDES)
+        n_bins = _int_arg('bins', 20, 1, MAX_ANALYTICS_BINS)
+        seed = _int_arg('seed', 42, 0, 2 ** 32 - 1)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    rides_df = generate_sample_ride_data(n_samples=n_rides, seed=seed)
+    
+    # Không cần insights cho từng chuyến khi chỉ trả về thống kê
+    results = system.batch_price_rides(rides_df, include_insights=False)
+    
+    return jsonify(summarize_pricing_results(rides_df, results, n_bins=n_bins))
+
+@app.route('/api/price-sweep', methods=['POST'])
+def price_sweep():
+    """API endpoint tính giá trên toàn bộ lưới tham số (phân tích độ nhạy)"""
+    from pricing.sensitivity import parse_sweep_axes, build_sweep_grid, format_sweep_result
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Body phải là JSON object"}), 400
+    base_ride = data.get('base_ride', {})
+    if not isinstance(base_ride, dict):
+        return jsonify({"error": "base_ride phải là JSON object"}), 400
+    
+    system, error = _resolve_pricing_system(data.get('region'))
+    if error is not None:
+        return error
+    
+    try:
+        axes = parse_sweep_axes(data.get('ranges', {}), max_cells=MAX_SWEEP_CELLS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Chuyến cơ sở với các đặc trưng được quét thay bằng lưới đã trải phẳng
+    grid, shape = build_sweep_grid(axes)
+    ride_data = _build_ride_frame({**base_ride, **grid}, n_rows=math.prod(shape))
+    
+    # Tính giá cho toàn bộ lưới trong một lần gọi véc-tơ hóa
+    try:
+        results = system.batch_price_rides(ride_data, include_insights=False)
+        return jsonify(format_sweep_result(axes, shape, results))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/')
 def index():
     return """
@@ -98,19 +507,73 @@ def index():
     <ul>
         <li><code>/api/get-price</code> - POST - Lấy giá cho một chuyến xe</li>
         <li><code>/api/simulate-rides?n_rides=5</code> - GET - Giả lập nhiều chuyến xe</li>
+        <li><code>/api/ride-analytics?n_rides=100000</code> - GET - Thống kê giá trên mẫu lớn</li>
+        <li><code>/api/price-sweep</code> - POST - Tính giá trên lưới tham số</li>
+        <li><code>/api/metrics</code> - GET - Chỉ số độ trễ theo định dạng Prometheus</li>
+        <li><code>/api/shadow-stats</code> - GET - Chênh lệch giá của các mô hình thử nghiệm</li>
+        <li><code>/api/journal-stats</code> - GET - Trạng thái nhật ký báo giá</li>
+        <li><code>/api/regions</code> - GET - Các khu vực và thống kê của registry mô hình</li>
+        <li><code>/api/quotes/&lt;quote_id&gt;</code> - GET - Lấy lại báo giá đang được giữ</li>
+        <li><code>/api/quotes/&lt;quote_id&gt;/confirm</code> - POST - Xác nhận báo giá với giá đã giữ</li>
+        <li><code>/api/quote-stats</code> - GET - Thống kê kho báo giá</li>
     </ul>
     """
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """API endpoint kiểm tra trạng thái hệ thống"""
+    if not _ready.is_set():
+        # Chưa sẵn sàng nhận tải cho đến khi mô hình được tải và khởi động xong
+        status = {
+            'status': 'starting',
+            'pricing_system': 'loading',
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        return jsonify(status), 503
+    
     status = {
         'status': 'healthy',
         'pricing_system': 'loaded' if pricing_system is not None else 'not_loaded',
-        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'startup': STARTUP
     }
+    if quote_journal is not None:
+        # Báo giá bị từ chối vì không ghi được nhật ký
+        status['journal_dropped'] = quote_journal.stats()['dropped']
     return jsonify(status)
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """API endpoint xuất các chỉ số độ trễ và số request theo định dạng Prometheus"""
+    return Response(REGISTRY.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/journal-stats', methods=['GET'])
+def journal_stats():
+    """API endpoint trạng thái nhật ký báo giá (số bản ghi đã ghi/đang chờ/bị bỏ qua)"""
+    if quote_journal is None:
+        return jsonify({"error": "Nhật ký báo giá chưa được bật (QUOTE_JOURNAL_DIR)"}), 404
+    return jsonify(quote_journal.stats())
+
+@app.route('/api/quote-stats', methods=['GET'])
+def quote_stats():
+    """API endpoint thống kê kho báo giá (số báo giá đang giữ, đã xác nhận, hết hạn...)"""
+    return jsonify(quote_store.stats())
+
+@app.route('/api/regions', methods=['GET'])
+def regions():
+    """API endpoint liệt kê các khu vực và thống kê hit/tải/loại bỏ của registry"""
+    return jsonify({
+        'available_regions': region_registry.available_regions(),
+        **region_registry.stats()
+    })
+
+@app.route('/api/shadow-stats', methods=['GET'])
+def shadow_stats():
+    """API endpoint thống kê chênh lệch giá và độ lệch của các mô hình thử nghiệm (shadow)"""
+    if shadow_scorer is None:
+        return jsonify({"error": "Chưa cấu hình mô hình thử nghiệm (SHADOW_MODELS)"}), 404
+    return jsonify(shadow_scorer.stats())
+
 @app.route('/api/pricing-factors', methods=['GET'])
 def pricing_factors():
     """API endpoint hiển thị các yếu tố ảnh hưởng đến giá"""
@@ -138,5 +601,11 @@ def pricing_factors():
     }
     return jsonify(factors)
 
+STARTUP['import_s'] = time.perf_counter() - _IMPORT_STARTED
+
+# Tiến trình giám sát của reloader (debug=True) không phục vụ request nên không cần tải mô hình
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    start_pricing_system()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from data.data_generator import TRAINING_REFERENCE_TIME, generate_sample_ride_data
+
+# Tỷ lệ mặc định của các loại request
+DEFAULT_MIX = {'get_price': 0.8, 'simulate': 0.1, 'health': 0.1}
+
+# Các trường của chuyến xe được gửi lên /api/get-price
+RIDE_FIELDS = [
+    'ride_id', 'distance_km', 'duration_min', 'hour', 'weather_condition', 'traffic_level',
+    'available_drivers', 'area_demand', 'vehicle_type', 'user_rating', 'user_previous_rides'
+]
+
+def parse_mix(mix):
+    """
+    Đọc tỷ lệ các loại request từ chuỗi dạng "get_price=0.8,simulate=0.1,health=0.1"
+    
+    Args:
+        mix: Chuỗi tỷ lệ
+    
+    Returns:
+        Dict loại request -> tỷ lệ (đã chuẩn hóa về tổng bằng 1)
+    """
+    weights = {}
+    for item in mix.split(','):
+        kind, weight = item.split('=')
+        kind = kind.strip()
+        if kind not in DEFAULT_MIX:
+            raise ValueError(f"Loại request không hợp lệ: '{kind}'")
+        weights[kind] = float(weight)
+    
+    total = sum(weights.values())
+    return {kind: weight / total for kind, weight in weights.items()}
+
+def build_schedule(rate, duration, mix, n_rides=10000, seed=42):
+    """
+    Tạo lịch gửi request theo mô hình open-loop: thời điểm đến theo phân phối Poisson
+    với tốc độ cố định, không phụ thuộc vào việc server trả lời nhanh hay chậm
+    
+    Args:
+        rate: Số request mỗi giây
+        duration: Thời gian chạy (giây)
+        mix: Dict loại request -> tỷ lệ
+        n_rides: Số chuyến xe mẫu dùng làm dữ liệu request
+        seed: Random seed
+    
+    Returns:
+        List tuple (thời điểm gửi tính từ lúc bắt đầu, loại request, payload)
+    """
+    rng = np.random.default_rng(seed)
+    rides = generate_sample_ride_data(n_samples=n_rides, seed=seed, reference_time=TRAINING_REFERENCE_TIME)
+    rides = rides[RIDE_FIELDS].to_dict('records')
+    
+    arrivals = np.cumsum(rng.exponential(1.0 / rate, size=int(rate * duration * 1.2) + 10))
+    arrivals = arrivals[arrivals < duration]
+    kinds = rng.choice(list(mix.keys()), size=len(arrivals), p=list(mix.values()))
+    
+    return [(float(at), str(kind), rides[i % len(rides)])
+            for i, (at, kind) in enumerate(zip(arrivals, kinds))]
+
+async def _send(session, base_url, kind, payload, simulate_rides):
+    if kind == 'get_price':
+        request = session.post(f"{base_url}/get-price", json=payload)
+    elif kind == 'simulate':
+        request = session.get(f"{base_url}/simulate-rides", params={'n_rides': simulate_rides})
+    else:
+        request = session.get(f"{base_url}/health")
+    
+    async with request as response:
+        await response.read()
+        return response.status
+
+async def _run(base_url, schedule, concurrency, simulate_rides, timeout):
+    import aiohttp
+    
+    queue = asyncio.Queue()
+    results = []
+    started = time.perf_counter()
+    
+    async def producer():
+        for at, kind, payload in schedule:
+            delay = started + at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            queue.put_nowait((at, kind, payload))
+        for _ in range(concurrency):
+            queue.put_nowait(None)
+    
+    async def client(session):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            at, kind, payload = item
+            try:
+                status = await _send(session, base_url, kind, payload, simulate_rides)
+                error = None if status < 400 else f"HTTP {status}"
+            except Exception as e:
+                error = type(e).__name__
+            # Độ trễ tính từ thời điểm request lẽ ra được gửi (bao gồm thời gian chờ trong hàng đợi)
+            results.append((at, kind, time.perf_counter() - started - at, error))
+    
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        await asyncio.gather(producer(), *[client(session) for _ in range(concurrency)])
+    
+    return results, time.perf_counter() - started
+
+def run_load_test(base_url="http://localhost:5001/api", rate=50, duration=30, concurrency=32,
+                  mix=None, interval=5, simulate_rides=5, timeout=30, seed=42):
+    """
+    Tạo tải lên API với nhiều client asyncio đồng thời
+    
+    Args:
+        base_url: Địa chỉ API
+        rate: Số request mỗi giây (open-loop)
+        duration: Thời gian chạy (giây)
+        concurrency: Số client đồng thời (số kết nối tối đa)
+        mix: Dict loại request -> tỷ lệ (mặc định DEFAULT_MIX)
+        interval: Độ dài mỗi khoảng thời gian trong báo cáo (giây)
+        simulate_rides: Số chuyến mỗi request /api/simulate-rides
+        timeout: Timeout của mỗi request (giây)
+        seed: Random seed
+    
+    Returns:
+        Dict báo cáo (tổng hợp, theo loại request và theo từng khoảng thời gian)
+    """
+    schedule = build_schedule(rate, duration, mix or DEFAULT_MIX, seed=seed)
+    results, elapsed = asyncio.run(_run(base_url, schedule, concurrency, simulate_rides, timeout))
+    
+    return summarize_results(results, elapsed, interval)
+
+def summarize_results(results, elapsed, interval=5):
+    """
+    Tổng hợp kết quả tải
+    
+    Args:
+        results: List tuple (thời điểm gửi, loại request, độ trễ, lỗi hoặc None)
+        elapsed: Tổng thời gian chạy (giây)
+        interval: Độ dài mỗi khoảng thời gian (giây)
+    
+    Returns:
+        Dict báo cáo
+    """
+    def stats(rows, seconds):
+        if len(rows) == 0:
+            return {'requests': 0, 'throughput': 0.0, 'error_rate': 0.0}
+        latencies = np.array([row[2] for row in rows]) * 1000
+        errors = sum(1 for row in rows if row[3] is not None)
+        return {
+            'requests': len(rows),
+            'throughput': len(rows) / seconds,
+            'error_rate': errors / len(rows),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p90_ms': float(np.percentile(latencies, 90)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'max_ms': float(latencies.max())
+        }
+    
+    by_kind = {}
+    for row in results:
+        by_kind.setdefault(row[1], []).append(row)
+    
+    by_window = {}
+    for row in results:
+        by_window.setdefault(int(row[0] // interval), []).append(row)
+    
+    errors = {}
+    for row in results:
+        if row[3] is not None:
+            errors[row[3]] = errors.get(row[3], 0) + 1
+    
+    return {
+        'elapsed_s': elapsed,
+        'overall': stats(results, elapsed),
+        'by_kind': {kind: stats(rows, elapsed) for kind, rows in sorted(by_kind.items())},
+        'timeline': [dict(start_s=window * interval, **stats(rows, interval))
+                     for window, rows in sorted(by_window.items())],
+        'errors': errors
+    }
+
+def print_report(report):
+    """
+    In báo cáo tải ra màn hình
+    """
+    def line(label, stats):
+        if stats['requests'] == 0:
+            return f"{label:<14} {0:>8}"
+        return (f"{label:<14} {stats['requests']:>8} {stats['throughput']:>9.1f}/s "
+                f"{stats['error_rate']:>7.1%}  p50 {stats['p50_ms']:>8.1f} ms  "
+                f"p90 {stats['p90_ms']:>8.1f} ms  p99 {stats['p99_ms']:>8.1f} ms")
+    
+    print(f"Thời gian chạy: {report['elapsed_s']:.1f} giây")
+    print(line("Tổng", report['overall']))
+    for kind, stats in report['by_kind'].items():
+        print(line(kind, stats))
+    
+    print("Theo thời gian:")
+    for stats in report['timeline']:
+        print(line(f"{stats['start_s']:>6.0f}s", stats))
+    
+    if report['errors']:
+        print("Lỗi:", json.dumps(report['errors'], ensure_ascii=False))
@@ -0,0 +1,227 @@
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.data_generator import TRAINING_REFERENCE_TIME, generate_sample_ride_data
+from data.preprocessor import RideDataPreprocessor
+from models.pricing_model import RidePricingModel
+from pricing.dynamic_pricer import DynamicRidePricingSystem
+from utils import metrics
+
+DEFAULT_SIZES = [1, 10, 100, 1000, 10000, 100000, 1000000]
+
+def build_benchmark_system(n_samples=10000, seed=42):
+    """
+    Huấn luyện hệ thống định giá trên dữ liệu cố định seed (giống main.train_model)
+    
+    Args:
+        n_samples: Số chuyến xe huấn luyện
+        seed: Random seed của dữ liệu
+    
+    Returns:
+        DynamicRidePricingSystem
+    """
+    data = generate_sample_ride_data(n_samples=n_samples, seed=seed,
+                                     reference_time=TRAINING_REFERENCE_TIME)
+    X = data.drop(['ride_id', 'booking_time', 'base_price'], axis=1)
+    
+    preprocessor = RideDataPreprocessor().fit(X)
+    model = RidePricingModel().fit(preprocessor.transform(X), data['base_price'])
+    
+    return DynamicRidePricingSystem(model, preprocessor)
+
+def run_benchmarks(pricing_system, sizes=DEFAULT_SIZES, seed=7, min_time=0.5, max_calls=1000,
+                   min_calls=3):
+    """
+    Đo hiệu năng các hàm quan trọng của hệ thống định giá
+    
+    Args:
+        pricing_system: DynamicRidePricingSystem cần đo
+        sizes: Các kích thước đầu vào (số chuyến) cho các hàm xử lý theo lô
+        seed: Random seed của dữ liệu đo
+        min_time: Thời gian đo tối thiểu cho mỗi trường hợp (giây)
+        max_calls: Số lần gọi tối đa cho mỗi trường hợp
+        min_calls: Số lần gọi tối thiểu cho mỗi trường hợp
+    
+    Returns:
+        List dict kết quả cho mỗi trường hợp
+    """
+    rides_df = generate_sample_ride_data(n_samples=max(sizes), seed=seed,
+                                         reference_time=TRAINING_REFERENCE_TIME)
+    features = rides_df.drop(['ride_id', 'booking_time', 'base_price'], axis=1)
+    
+    cases = []
+    
+    # Các hàm xử lý một chuyến xe: xoay vòng qua tối đa 1000 chuyến khác nhau
+    single_rides = [rides_df.iloc[[i]] for i in range(min(len(rides_df), 1000))]
+    cases.append(('apply_business_rules', 1,
+                  _cycle(single_rides, pricing_system._apply_business_rules)))
+    cases.append(('get_ride_price', 1,
+                  _cycle(single_rides, pricing_system.get_ride_price)))
+    cases.append(('get_ride_price_uninstrumented', 1,
+                  _cycle(single_rides, _without_metrics(pricing_system.get_ride_price))))
+    
+    for size in sizes:
+        rides = rides_df.iloc[:size]
+        X = pricing_system.preprocessor.transform(features.iloc[:size])
+        
+        cases.append(('preprocessor_transform', size,
+                       lambda rides=rides: pricing_system.preprocessor.transform(rides)))
+        cases.append(('model_predict', size,
+                      lambda X=X: pricing_system.model.predict(X)))
+        cases.append(('batch_price_rides', size,
+                      lambda rides=rides: pricing_system.batch_price_rides(rides)))
+    
+    results = []
+    for name, size, func in cases:
+        result = measure(func, min_time=min_time, max_calls=max_calls, min_calls=min_calls)
+        result.update({'case': name, 'size': size, 'rows_per_sec': result['ops_per_sec'] * size})
+        results.append(result)
+        print(_format_result(result))
+    
+    # Chi phí của một lần đo giai đoạn (mỗi lần tính giá qua API dùng 4 lần đo)
+    timer_overhead_us = metrics.measure_timer_overhead() * 1e6
+    print(f"Chi phí đo giai đoạn: {timer_overhead_us:.2f} µs/lần, "
+          f"~{timer_overhead_us * 4:.2f} µs mỗi lần tính giá")
+    
+    return results
+
+def measure(func, min_time=0.5, max_calls=1000, min_calls=3, warmup=1):
+    """
+    Đo độ trễ của một hàm: gọi lặp lại cho đến khi đủ thời gian hoặc đủ số lần gọi,
+    sau đó đo bộ nhớ đỉnh trong một lần gọi riêng (tracemalloc làm chậm phép đo thời gian)
+    
+    Args:
+        func: Hàm không tham số cần đo
+        min_time: Thời gian đo tối thiểu (giây)
+        max_calls: Số lần gọi tối đa
+        min_calls: Số lần gọi tối thiểu
+        warmup: Số lần gọi khởi động (không tính)
+    
+    Returns:
+        Dict với số lần gọi, ops/sec, độ trễ p50/p99 (ms) và bộ nhớ đỉnh (MB)
+    """
+    for _ in range(warmup):
+        func()
+    
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < min_calls or (len(latencies) < max_calls
+                                         and time.perf_counter() - started < min_time):
+        call_started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - call_started)
+    
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    latencies = np.array(latencies)
+    
+    return {
+        'calls': int(len(latencies)),
+        'ops_per_sec': float(len(latencies) / latencies.sum()),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'peak_memory_mb': peak / 1024 ** 2
+    }
+
+def save_results(results, path, seed):
+    """
+    Ghi kết quả đo ra file JSON kèm thông tin môi trường
+    
+    Args:
+        results: List kết quả từ run_benchmarks
+        path: Đường dẫn file JSON
+        seed: Random seed của dữ liệu đo
+    """
+    import sklearn
+    
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'sklearn': sklearn.__version__,
+            'seed': seed
+        },
+        'results': results
+    }
+    
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+def compare_to_baseline(results, baseline_path, tolerance=0.1):
+    """
+    So sánh kết quả với baseline đã lưu
+    
+    Args:
+        results: List kết quả từ run_benchmarks
+        baseline_path: File JSON baseline (định dạng của save_results)
+        tolerance: Tỷ lệ chậm hơn tối đa trước khi coi là suy giảm hiệu năng
+    
+    Returns:
+        List dict so sánh cho các trường hợp có trong cả hai, đánh dấu trường hợp suy giảm
+    """
+    with open(baseline_path) as f:
+        baseline = {(r['case'], r['size']): r for r in json.load(f)['results']}
+    
+    comparison = []
+    for result in results:
+        previous = baseline.get((result['case'], result['size']))
+        if previous is None:
+            continue
+        
+        p50_ratio = result['p50_ms'] / previous['p50_ms']
+        comparison.append({
+            'case': result['case'],
+            'size': result['size'],
+            'baseline_p50_ms': previous['p50_ms'],
+            'p50_ms': result['p50_ms'],
+            'p50_ratio': p50_ratio,
+            'regression': p50_ratio > 1 + tolerance
+        })
+    
+    return comparison
+
+def _cycle(rides, func):
+    """
+    Tạo hàm không tham số gọi func lần lượt trên từng chuyến trong danh sách
+    """
+    state = {'i': 0}
+    
+    def call():
+        ride = rides[state['i'] % len(rides)]
+        state['i'] += 1
+        return func(ride)
+    
+    return call
+
+def _without_metrics(func):
+    """
+    Bọc func để chạy khi tắt việc đo thời gian các giai đoạn
+    """
+    def call(*args):
+        metrics.set_enabled(False)
+        try:
+            return func(*args)
+        finally:
+            metrics.set_enabled(True)
+    
+    return call
+
+def _format_result(result):
+    return (f"{result['case']:<30} {result['size']:>9,} rows  "
+            f"{result['ops_per_sec']:>10,.1f} ops/s  {result['rows_per_sec']:>12,.0f} rows/s  "
+            f"p50 {result['p50_ms']:>10.3f} ms  p99 {result['p99_ms']:>10.3f} ms  "
+            f"peak {result['peak_memory_mb']:>8.1f} MB")
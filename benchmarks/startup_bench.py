@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Chạy trong tiến trình mới: import API, chờ khởi động xong rồi báo lại các mốc thời gian
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import api.app as api
+imported = time.perf_counter()
+api.wait_until_ready()
+ready = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - started,
+    'ready_s': ready - started,
+    'startup': api.STARTUP,
+    'pricing_loaded': api.pricing_system is not None,
+    'plotting_loaded': sorted(m for m in ('matplotlib', 'seaborn', 'streamlit') if m in sys.modules)
+}))
+"""
+
+def measure_cold_start(n_runs=5, cwd=None):
+    """
+    Đo thời gian khởi động nguội của API: mỗi lần đo chạy một tiến trình Python mới
+    
+    Args:
+        n_runs: Số lần đo
+        cwd: Thư mục chạy (chứa ride_pricing_system.pkl), mặc định thư mục hiện tại
+    
+    Returns:
+        Dict với các lần đo và trung vị của từng mốc thời gian (giây, riêng quote tính bằng ms)
+    """
+    cwd = cwd or os.getcwd()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [cwd, os.environ.get('PYTHONPATH')])))
+    
+    runs = []
+    for _ in range(n_runs):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', _PROBE], cwd=cwd, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        run = json.loads(output.strip().splitlines()[-1])
+        run['process_ready_s'] = time.perf_counter() - started
+        runs.append(run)
+    
+    keys = ['import_s', 'ready_s', 'process_ready_s']
+    summary = {key: float(np.median([run[key] for run in runs])) for key in keys}
+    for key in ('load_s', 'warmup_s', 'first_quote_ms', 'warm_quote_ms'):
+        values = [run['startup'][key] for run in runs if key in run['startup']]
+        if values:
+            summary[key] = float(np.median(values))
+    
+    return {'runs': runs, 'median': summary}
+
+def print_report(report):
+    """
+    In báo cáo thời gian khởi động ra màn hình
+    """
+    median = report['median']
+    print(f"Import api.app:          {median['import_s'] * 1000:>8.1f} ms")
+    if 'load_s' in median:
+        print(f"Tải mô hình:             {median['load_s'] * 1000:>8.1f} ms")
+        print(f"Khởi động (warm-up):     {median['warmup_s'] * 1000:>8.1f} ms")
+        print(f"Quote đầu tiên (nguội):  {median['first_quote_ms']:>8.1f} ms")
+        print(f"Quote sau warm-up:       {median['warm_quote_ms']:>8.1f} ms")
+    print(f"Sẵn sàng sau import:     {median['ready_s'] * 1000:>8.1f} ms")
+    print(f"Sẵn sàng tính từ lúc chạy tiến trình: {median['process_ready_s'] * 1000:.1f} ms")
+    
+    plotting = sorted({module for run in report['runs'] for module in run['plotting_loaded']})
+    print("Thư viện vẽ biểu đồ đã tải:", ", ".join(plotting) if plotting else "không có")
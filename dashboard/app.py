@@ -2,8 +2,8 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
 import requests
+import requests.adapters
 import json
 from datetime import datetime
 import time
@@ -21,31 +21,110 @@ st.title("🚕 Dashboard Dynamic Pricing cho Ứng dụng Đặt Xe")
 # Kết nối tới API
 API_URL = "http://localhost:5001/api"
 
+# Các tham số có thể quét trong phân tích độ nhạy
+SWEEP_RANGES = {
+    "Giờ trong ngày": ("hour", {"start": 0, "stop": 23}),
+    "Thời tiết": ("weather_condition", {"start": 0, "stop": 2}),
+    "Mức độ tắc nghẽn": ("traffic_level", {"start": 0, "stop": 10}),
+    "Số tài xế có sẵn": ("available_drivers", {"start": 1, "stop": 50}),
+    "Nhu cầu khu vực": ("area_demand", {"start": 0, "stop": 100, "step": 5}),
+    "Khoảng cách (km)": ("distance_km", {"start": 1, "stop": 30, "step": 1})
+}
+
+# Thời gian cache (giây) cho các phản hồi từ API
+HEALTH_CACHE_TTL = 10
+PRICING_FACTORS_CACHE_TTL = 600
+QUOTE_CACHE_TTL = 60
+QUOTE_CACHE_MAX_ENTRIES = 256
+REQUEST_TIMEOUT = 30
+
+# Các trường giữ giá (price lock) của /get-price bị bỏ khỏi kết quả được cache
+QUOTE_LOCK_FIELDS = ("quote_id", "quote_expires_in_s")
+
+@st.cache_resource
+def get_session():
+    """Session HTTP dùng chung, giữ kết nối TCP giữa các lần chạy lại của Streamlit"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=10)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=HEALTH_CACHE_TTL, show_spinner=False)
+def _fetch_health():
+    response = get_session().get(f"{API_URL}/health", timeout=REQUEST_TIMEOUT)
+    return response.json()
+
+@st.cache_data(ttl=PRICING_FACTORS_CACHE_TTL, show_spinner=False)
+def _fetch_pricing_factors():
+    response = get_session().get(f"{API_URL}/pricing-factors", timeout=REQUEST_TIMEOUT)
+    return response.json()
+
+@st.cache_data(ttl=QUOTE_CACHE_TTL, max_entries=QUOTE_CACHE_MAX_ENTRIES, show_spinner=False)
+def _fetch_price(params_key):
+    # params_key là tuple (tên tham số, giá trị) đã sắp xếp, dùng làm khóa cache
+    response = get_session().post(f"{API_URL}/get-price", json=dict(params_key), timeout=REQUEST_TIMEOUT)
+    result = response.json()
+    if "error" in result:
+        # Không cache kết quả lỗi
+        raise RuntimeError(result["error"])
+    # Mã báo giá chỉ có hiệu lực trong thời gian giữ giá của API và không được dùng lại
+    # sau lần hiển thị đầu tiên, nên không giữ trong cache
+    for field in QUOTE_LOCK_FIELDS:
+        result.pop(field, None)
+    return result
+
+@st.cache_data(ttl=QUOTE_CACHE_TTL, max_entries=QUOTE_CACHE_MAX_ENTRIES, show_spinner=False)
+def _fetch_price_sweep(request_key):
+    # request_key là JSON (đã sắp xếp khóa) của base ride và các khoảng quét
+    response = get_session().post(f"{API_URL}/price-sweep", data=request_key,
+                                  headers={"Content-Type": "application/json"}, timeout=REQUEST_TIMEOUT)
+    result = response.json()
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result
+
 def get_health():
     try:
-        response = requests.get(f"{API_URL}/health")
-        return response.json()
+        health = _fetch_health()
     except:
         return {"status": "error", "pricing_system": "not_connected"}
+    if health.get("status") == "starting":
+        # Không giữ trạng thái đang khởi động trong cache
+        _fetch_health.clear()
+    return health
 
 def get_pricing_factors():
     try:
-        response = requests.get(f"{API_URL}/pricing-factors")
-        return response.json()
+        return _fetch_pricing_factors()
     except:
         return {}
 
 def simulate_rides(n_rides=5):
     try:
-        response = requests.get(f"{API_URL}/simulate-rides", params={"n_rides": n_rides})
+        response = get_session().get(f"{API_URL}/simulate-rides", params={"n_rides": n_rides},
+                                     timeout=REQUEST_TIMEOUT)
         return response.json()
     except:
         return []
 
-def get_price(ride_params):
+def get_ride_analytics(n_rides=100000):
     try:
-        response = requests.post(f"{API_URL}/get-price", json=ride_params)
+        response = get_session().get(f"{API_URL}/ride-analytics", params={"n_rides": n_rides},
+                                     timeout=REQUEST_TIMEOUT)
         return response.json()
+    except:
+        return {}
+
+def get_price_sweep(base_ride, ranges):
+    try:
+        return _fetch_price_sweep(json.dumps({"base_ride": base_ride, "ranges": ranges}, sort_keys=True))
+    except Exception as e:
+        return {"error": str(e)}
+
+def get_price(ride_params):
+    try:
+        return _fetch_price(tuple(sorted(ride_params.items())))
     except Exception as e:
         st.error(f"Lỗi khi gọi API: {str(e)}")
         return {"error": str(e)}
@@ -54,6 +133,9 @@ def get_price(ride_params):
 health = get_health()
 if health["status"] == "healthy":
     st.sidebar.success("✅ Kết nối đến API thành công")
+elif health["status"] == "starting":
+    st.sidebar.warning("⏳ API đang khởi động, hãy tải lại trang sau giây lát.")
+    st.stop()
 else:
     st.sidebar.error("❌ Không thể kết nối đến API. Hãy chắc chắn server đang chạy.")
     st.stop()
@@ -66,50 +148,64 @@ tab1, tab2 = st.tabs(["Giả lập", "Mô phỏng theo tham số"])
 with tab1:
     st.header("Giả lập nhiều chuyến xe")
     
-    # Số lượng chuyến để giả lập
-    n_rides = st.slider("Số lượng chuyến để giả lập", 1, 20, 5)
+    # Số lượng chuyến để giả lập (thống kê được tính trên server)
+    n_rides = st.slider("Số lượng chuyến để giả lập", 1000, 200000, 100000, 1000)
+    n_detail_rides = st.slider("Số chuyến hiển thị chi tiết", 1, 20, 5)
     
     if st.button("Chạy giả lập"):
         with st.spinner("Đang tính toán giá cho các chuyến xe..."):
-            rides_data = simulate_rides(n_rides)
+            analytics = get_ride_analytics(n_rides)
+            rides_data = simulate_rides(n_detail_rides)
             
-        if rides_data:
+        if analytics and 'error' not in analytics:
             # Hiển thị dữ liệu
-            st.subheader(f"Kết quả giả lập {len(rides_data)} chuyến xe")
+            st.subheader(f"Kết quả giả lập {analytics['n_rides']:,} chuyến xe")
             
-            # Chuyển đổi về DataFrame để dễ làm việc
-            df = pd.DataFrame(rides_data)
+            price_by_vehicle_type = analytics['price_by_vehicle_type']
             
             # Hiển thị thống kê
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Giá trung bình", f"{df['optimal_price'].mean():,.0f}đ")
+                st.metric("Giá trung bình", f"{analytics['mean_price']:,.0f}đ")
             with col2:
-                st.metric("% thay đổi trung bình", f"{df['price_percent_change'].mean():.1f}%")
+                st.metric("% thay đổi trung bình", f"{analytics['mean_percent_change']:.1f}%")
             with col3:
-                vehicle_counts = df['vehicle_type'].value_counts()
-                st.metric("Loại xe phổ biến nhất", df['vehicle_type'].mode()[0])
+                most_common = max(price_by_vehicle_type, key=lambda x: x['count'])
+                st.metric("Loại xe phổ biến nhất", most_common['vehicle_type'])
             
             # Biểu đồ
             fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
             
             # Biểu đồ % thay đổi giá
-            sns.histplot(df['price_percent_change'], bins=10, kde=True, ax=ax1)
+            histogram = analytics['percent_change_histogram']
+            bin_edges = np.array(histogram['bin_edges'])
+            ax1.bar(bin_edges[:-1], histogram['counts'], width=np.diff(bin_edges), align='edge')
             ax1.axvline(0, color='red', linestyle='--')
             ax1.set_title("Phân bố % thay đổi giá")
             ax1.set_xlabel("% thay đổi giá")
             
-            # Biểu đồ giá theo loại xe
-            sns.boxplot(x='vehicle_type', y='optimal_price', data=df, ax=ax2)
+            # Biểu đồ giá theo loại xe (từ các phân vị đã tính sẵn)
+            ax2.bxp([{
+                'label': stats['vehicle_type'],
+                'med': stats['median'],
+                'q1': stats['q1'],
+                'q3': stats['q3'],
+                'whislo': stats['whislo'],
+                'whishi': stats['whishi'],
+                'fliers': []
+            } for stats in price_by_vehicle_type])
             ax2.set_title("Giá theo loại xe")
             ax2.set_xlabel("Loại xe")
             ax2.set_ylabel("Giá (đồng)")
             
             st.pyplot(fig)
+        else:
+            st.error(f"Lỗi khi gọi API: {analytics.get('error', 'không nhận được kết quả giả lập')}")
             
+        if rides_data:
             # Hiển thị bảng dữ liệu
             st.subheader("Chi tiết các chuyến xe")
-            st.dataframe(df)
+            st.dataframe(pd.DataFrame(rides_data))
 
 with tab2:
     st.header("Mô phỏng theo tham số")
@@ -193,6 +289,67 @@ with tab2:
             st.subheader("Phân tích giá")
             for insight in result['insights']:
                 st.info(insight)
+    
+    # Phân tích độ nhạy: tính giá trên toàn bộ lưới hai tham số trong một lần gọi API
+    st.subheader("Phân tích độ nhạy của giá")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        x_label = st.selectbox("Tham số trục ngang", list(SWEEP_RANGES.keys()), index=0)
+    with col2:
+        y_label = st.selectbox("Tham số trục dọc", list(SWEEP_RANGES.keys()), index=3)
+    
+    if st.button("Phân tích độ nhạy"):
+        if x_label == y_label:
+            st.warning("Hãy chọn hai tham số khác nhau")
+        else:
+            base_ride = {
+                "distance_km": distance,
+                "duration_min": distance * 3,
+                "weather_condition": weather["value"],
+                "traffic_level": traffic,
+                "available_drivers": drivers,
+                "area_demand": demand,
+                "vehicle_type": vehicle_type["value"],
+                "user_rating": user_rating,
+                "user_previous_rides": user_rides
+            }
+            y_feature, y_range = SWEEP_RANGES[y_label]
+            x_feature, x_range = SWEEP_RANGES[x_label]
+            
+            with st.spinner("Đang tính giá trên lưới tham số..."):
+                sweep = get_price_sweep(base_ride, {y_feature: y_range, x_feature: x_range})
+            
+            if "error" in sweep:
+                st.error(f"Lỗi: {sweep['error']}")
+            else:
+                # Trục của tensor giá theo thứ tự trả về từ API
+                axis_names = [axis["name"] for axis in sweep["axes"]]
+                prices = np.array(sweep["optimal_price"])
+                if axis_names[0] != y_feature:
+                    prices = prices.T
+                y_values = sweep["axes"][axis_names.index(y_feature)]["values"]
+                x_values = sweep["axes"][axis_names.index(x_feature)]["values"]
+                
+                fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+                
+                # Heatmap giá theo hai tham số
+                image = ax1.imshow(prices, origin="lower", aspect="auto", cmap="viridis",
+                                   extent=[x_values[0], x_values[-1], y_values[0], y_values[-1]])
+                fig.colorbar(image, ax=ax1, label="Giá (đồng)")
+                ax1.set_title("Giá tối ưu")
+                ax1.set_xlabel(x_label)
+                ax1.set_ylabel(y_label)
+                
+                # Đường giá theo tham số trục ngang tại một số giá trị của trục dọc
+                for row in np.linspace(0, len(y_values) - 1, min(4, len(y_values))).astype(int):
+                    ax2.plot(x_values, prices[row], label=f"{y_label} = {y_values[row]}")
+                ax2.set_title("Đường giá")
+                ax2.set_xlabel(x_label)
+                ax2.set_ylabel("Giá (đồng)")
+                ax2.legend()
+                
+                st.pyplot(fig)
 
 # Hiển thị các yếu tố ảnh hưởng đến giá
 st.sidebar.header("Yếu tố ảnh hưởng đến giá")
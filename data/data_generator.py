@@ -3,13 +3,19 @@ import numpy as np
 from datetime import datetime, timedelta
 import random
 
-def generate_sample_ride_data(n_samples=1000, seed=42):
+# Mốc thời gian cố định cho dữ liệu huấn luyện: cùng seed luôn cho cùng dữ liệu,
+# nên huấn luyện tái lập được và dùng lại được cache đặc trưng
+TRAINING_REFERENCE_TIME = datetime(2024, 1, 31)
+
+def generate_sample_ride_data(n_samples=1000, seed=42, reference_time=None):
     """
     Tạo dữ liệu mẫu về chuyến xe cho mục đích huấn luyện mô hình
     
     Args:
         n_samples: Số lượng chuyến xe mẫu
         seed: Random seed để tái tạo
+        reference_time: Mốc thời gian, các chuyến được đặt trong 30 ngày trước mốc này
+            (None để dùng thời điểm hiện tại; truyền mốc cố định để cùng seed cho cùng dữ liệu)
         
     Returns:
         DataFrame với dữ liệu chuyến xe
@@ -21,7 +27,7 @@ def generate_sample_ride_data(n_samples=1000, seed=42):
     ride_ids = [f"R{str(i).zfill(6)}" for i in range(n_samples)]
     
     # Tạo thời gian đặt xe ngẫu nhiên trong 30 ngày qua
-    now = datetime.now()
+    now = reference_time or datetime.now()
     start_date = now - timedelta(days=30)
     booking_times = [start_date + timedelta(
         days=random.randint(0, 30),
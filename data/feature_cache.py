@@ -0,0 +1,267 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import joblib
+
+from data.preprocessor import RideDataPreprocessor
+
+# Thư mục cache mặc định
+DEFAULT_CACHE_DIR = ".feature_cache"
+
+# Số mục và tổng dung lượng tối đa của cache; mục ít được dùng gần đây nhất bị xóa trước
+DEFAULT_MAX_ENTRIES = 4
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Tăng khi định dạng lưu trữ của một mục cache thay đổi; thay đổi cách tiền xử lý
+# đã được phản ánh qua mã nguồn của RideDataPreprocessor trong khóa
+CACHE_VERSION = 2
+
+def preprocessor_fingerprint(preprocessor):
+    """
+    Dấu vân tay của cách tiền xử lý: băm mã nguồn lớp preprocessor cùng cấu hình của nó,
+    nên sửa code tiền xử lý tự động vô hiệu hóa cache
+    
+    Args:
+        preprocessor: RideDataPreprocessor (chưa khớp)
+    
+    Returns:
+        Chuỗi hex
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        digest.update(inspect.getsource(type(preprocessor)).encode())
+    except (OSError, TypeError):
+        # Không lấy được mã nguồn (vd. chỉ có file .pyc): dùng bytecode của các phương thức
+        for name, member in sorted(vars(type(preprocessor)).items()):
+            if inspect.isfunction(member):
+                digest.update(name.encode() + member.__code__.co_code)
+    digest.update(json.dumps(preprocessor.get_config(), sort_keys=True).encode())
+    return digest.hexdigest()
+
+def dataset_fingerprint(df):
+    """
+    Dấu vân tay của một DataFrame: băm nội dung từng dòng (véc-tơ hóa), tên cột và kiểu dữ liệu
+    
+    Args:
+        df: DataFrame
+    
+    Returns:
+        Chuỗi hex
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([[str(column), str(dtype)] for column, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+class FeatureCache:
+    """
+    Cache trên đĩa cho ma trận đặc trưng đã tiền xử lý và preprocessor đã khớp
+    - Khóa là dấu vân tay của các cột đầu vào mà preprocessor dùng (bỏ qua mã chuyến, mốc thời gian
+      và các cột khác), cùng mã nguồn và cấu hình preprocessor, nên bất kỳ thay đổi nào của đầu vào
+      hay cách tiền xử lý đều dẫn đến khóa mới (tự động vô hiệu hóa)
+    - Ma trận được lưu dạng .npy và được memory-map khi đọc lại
+    - Mỗi mục được ghi vào thư mục tạm rồi đổi tên, nên không bao giờ đọc phải mục ghi dở
+    - Số mục và tổng dung lượng bị giới hạn: sau mỗi lần ghi, các mục ít được dùng gần đây nhất
+      (theo thời điểm đọc/ghi cuối) bị xóa cho đến khi nằm trong giới hạn
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Khởi tạo cache
+        
+        Args:
+            cache_dir: Thư mục chứa các mục cache
+            max_entries: Số mục tối đa được giữ
+            max_bytes: Tổng dung lượng tối đa của các mục (byte); mục vừa ghi luôn được giữ
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries phải lớn hơn 0")
+        
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+    
+    def key(self, datasets, preprocessor):
+        """
+        Tính khóa cache
+        
+        Args:
+            datasets: Dict tên tập -> DataFrame dữ liệu gốc (vd. {'train': X_train, 'test': X_test})
+            preprocessor: RideDataPreprocessor (chưa khớp) dùng để lấy cấu hình
+        
+        Returns:
+            Chuỗi hex
+        """
+        # Chỉ các cột preprocessor đọc mới ảnh hưởng đến kết quả
+        columns = list(preprocessor.numeric_features) + list(preprocessor.categorical_features)
+        payload = {
+            'version': CACHE_VERSION,
+            'preprocessor': preprocessor_fingerprint(preprocessor),
+            'datasets': {name: dataset_fingerprint(df[columns])
+                         for name, df in sorted(datasets.items())}
+        }
+        return hashlib.blake2b(json.dumps(payload, sort_keys=True).encode(), digest_size=16).hexdigest()
+    
+    def load(self, key):
+        """
+        Đọc một mục cache
+        
+        Args:
+            key: Khóa cache
+        
+        Returns:
+            Tuple (preprocessor đã khớp, dict tên tập -> DataFrame đặc trưng trên memmap) hoặc None
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        meta_path = os.path.join(entry_dir, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            preprocessor = joblib.load(os.path.join(entry_dir, 'preprocessor.pkl'))
+            matrices = {}
+            for name in meta['datasets']:
+                values = np.load(os.path.join(entry_dir, f'{name}.npy'), mmap_mode='r')
+                # copy=False để DataFrame dùng trực tiếp vùng nhớ memmap
+                matrices[name] = pd.DataFrame(values, columns=meta['feature_names'], copy=False)
+        except Exception:
+            # Mục hỏng được coi như không có trong cache
+            return None
+        
+        # Đánh dấu mục vừa được dùng để việc dọn cache giữ lại nó
+        try:
+            os.utime(entry_dir)
+        except OSError:
+            pass
+        
+        return preprocessor, matrices
+    
+    def save(self, key, preprocessor, matrices):
+        """
+        Ghi một mục cache
+        
+        Args:
+            key: Khóa cache
+            preprocessor: RideDataPreprocessor đã khớp
+            matrices: Dict tên tập -> DataFrame đặc trưng đã biến đổi
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_dir = os.path.join(self.cache_dir, key)
+        tmp_dir = tempfile.mkdtemp(prefix=f'.{key}-', dir=self.cache_dir)
+        
+        try:
+            joblib.dump(preprocessor, os.path.join(tmp_dir, 'preprocessor.pkl'))
+            for name, df in matrices.items():
+                np.save(os.path.join(tmp_dir, f'{name}.npy'), df.to_numpy())
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump({
+                    'version': CACHE_VERSION,
+                    'feature_names': list(preprocessor.feature_names),
+                    'datasets': {name: list(df.shape) for name, df in matrices.items()}
+                }, f, indent=2)
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Tiến trình khác đã ghi cùng khóa trước (os.rename thất bại khi thư mục đích đã có)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.exists(os.path.join(entry_dir, 'meta.json')):
+                raise
+        
+        self.evict(keep=key)
+    
+    def entries(self):
+        """
+        Các mục đang có trong cache
+        
+        Returns:
+            List tuple (khóa, thời điểm dùng cuối, dung lượng byte), mục dùng gần nhất ở đầu
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            # Bỏ qua thư mục tạm của các lần ghi đang diễn ra
+            entry_dir = os.path.join(self.cache_dir, key)
+            if key.startswith('.') or not os.path.isdir(entry_dir):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+                entries.append((key, os.stat(entry_dir).st_mtime, size))
+            except OSError:
+                continue
+        
+        return sorted(entries, key=lambda entry: entry[1], reverse=True)
+    
+    def evict(self, keep=None):
+        """
+        Xóa các mục ít được dùng gần đây nhất cho đến khi cache nằm trong giới hạn
+        số mục và dung lượng
+        
+        Args:
+            keep: Khóa không được xóa (vd. mục vừa ghi)
+        
+        Returns:
+            List khóa đã xóa
+        """
+        entries = self.entries()
+        # Mục được giữ đứng đầu để không bao giờ bị tính là thừa
+        entries.sort(key=lambda entry: entry[0] != keep)
+        
+        evicted = []
+        total_bytes = sum(size for _, _, size in entries)
+        while len(entries) > 1 and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            key, _, size = entries.pop()
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            total_bytes -= size
+            evicted.append(key)
+        
+        return evicted
+    
+    def clear(self):
+        """
+        Xóa toàn bộ cache
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+def preprocess_with_cache(X_train, X_test, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Khớp RideDataPreprocessor trên tập huấn luyện và biến đổi cả hai tập,
+    dùng lại kết quả trong cache nếu dữ liệu và cấu hình không đổi
+    
+    Args:
+        X_train: DataFrame dữ liệu huấn luyện (chưa tiền xử lý)
+        X_test: DataFrame dữ liệu kiểm thử (chưa tiền xử lý)
+        cache_dir: Thư mục cache (None để không dùng cache)
+    
+    Returns:
+        Tuple (preprocessor đã khớp, X_train đã biến đổi, X_test đã biến đổi, có dùng cache hay không)
+    """
+    preprocessor = RideDataPreprocessor()
+    datasets = {'train': X_train, 'test': X_test}
+    
+    cache = FeatureCache(cache_dir) if cache_dir else None
+    if cache is not None:
+        key = cache.key(datasets, preprocessor)
+        cached = cache.load(key)
+        if cached is not None:
+            preprocessor, matrices = cached
+            return preprocessor, matrices['train'], matrices['test'], True
+    
+    preprocessor.fit(X_train)
+    matrices = {name: preprocessor.transform(df) for name, df in datasets.items()}
+    
+    if cache is not None:
+        try:
+            cache.save(key, preprocessor, matrices)
+        except OSError as e:
+            print(f"Không ghi được cache đặc trưng: {e}")
+    
+    return preprocessor, matrices['train'], matrices['test'], False
@@ -11,9 +11,44 @@ class RideDataPreprocessor:
     - Mã hóa one-hot cho thuộc tính phân loại
     - Tạo các thuộc tính tương tác
     """
+    # Các thuộc tính đầu vào
+    numeric_features = [
+        'distance_km', 'duration_min', 'hour', 'day_of_week', 
+        'traffic_level', 'available_drivers', 'area_demand', 
+        'user_rating', 'user_previous_rides'
+    ]
+    categorical_features = ['weather_condition', 'vehicle_type', 'is_weekend']
+    
     def __init__(self):
         self.preprocessor = None
         self.feature_names = None
+    
+    def get_config(self):
+        """
+        Cấu hình của preprocessor (danh sách thuộc tính và tham số các transformer),
+        dùng để nhận biết khi cách tiền xử lý thay đổi
+        
+        Returns:
+            Dict cấu hình
+        """
+        import sklearn
+        
+        return {
+            'numeric_features': list(self.numeric_features),
+            'categorical_features': list(self.categorical_features),
+            'transformer': repr(sorted(self._build_transformer().get_params(deep=True).items())),
+            'sklearn': sklearn.__version__
+        }
+    
+    def _build_transformer(self):
+        """
+        Xây dựng transformer (chưa khớp)
+        """
+        return ColumnTransformer(
+            transformers=[
+                ('num', StandardScaler(), self.numeric_features),
+                ('cat', OneHotEncoder(drop='first', sparse_output=False), self.categorical_features)
+            ])
         
     def fit(self, X):
         """
@@ -25,32 +60,16 @@ class RideDataPreprocessor:
         Returns:
             self
         """
-        # Định nghĩa các cột
-        numeric_features = [
-            'distance_km', 'duration_min', 'hour', 'day_of_week', 
-            'traffic_level', 'available_drivers', 'area_demand', 
-            'user_rating', 'user_previous_rides'
-        ]
-        
-        categorical_features = ['weather_condition', 'vehicle_type', 'is_weekend']
-        
-        # Xây dựng transformer
-        preprocessor = ColumnTransformer(
-            transformers=[
-                ('num', StandardScaler(), numeric_features),
-                ('cat', OneHotEncoder(drop='first', sparse_output=False), categorical_features)
-            ])
-        
-        # Khớp preprocessor
-        self.preprocessor = preprocessor.fit(X)
+        # Xây dựng transformer và khớp preprocessor
+        self.preprocessor = self._build_transformer().fit(X)
         
         # Lấy tên các thuộc tính sau khi biến đổi
         cat_columns = []
-        for i, col in enumerate(categorical_features):
+        for i, col in enumerate(self.categorical_features):
             categories = self.preprocessor.transformers_[1][1].categories_[i][1:]
             cat_columns.extend([f'{col}_{cat}' for cat in categories])
         
-        self.feature_names = numeric_features + cat_columns
+        self.feature_names = list(self.numeric_features) + cat_columns
         
         return self
     
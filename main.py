@@ -1,27 +1,37 @@
-import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split
-import joblib
-import matplotlib.pyplot as plt
-import seaborn as sns
 import argparse
 import os
 
-from data.data_generator import generate_sample_ride_data
-from data.preprocessor import RideDataPreprocessor
-from models.pricing_model import RidePricingModel
-from pricing.dynamic_pricer import DynamicRidePricingSystem
+# Các thư viện nặng (pandas, sklearn, joblib...) được import trong từng hành động
+# để mỗi hành động chỉ tải những gì nó cần
 
-def train_model():
+def train_model(output_path="ride_pricing_system.pkl", seed=42, feature_cache_dir=".feature_cache",
+                compact_tolerance=None, price_surface=False):
     """
     Tạo dữ liệu, huấn luyện mô hình và lưu hệ thống định giá
+    
+    Args:
+        output_path: File lưu hệ thống định giá
+        seed: Random seed của dữ liệu huấn luyện
+        feature_cache_dir: Thư mục cache đặc trưng đã tiền xử lý (None để không dùng cache)
+        compact_tolerance: Nén mô hình sau khi huấn luyện với mức tăng MAE tương đối cho phép
+            trên tập validation tách từ tập huấn luyện (None để không nén)
+        price_surface: Tính trước bảng giá mô hình trên lưới chuyến xe thường gặp và lưu cùng hệ thống
     """
+    from sklearn.model_selection import train_test_split
+    import joblib
+    
+    from data.data_generator import TRAINING_REFERENCE_TIME, generate_sample_ride_data
+    from data.feature_cache import preprocess_with_cache
+    from models.pricing_model import RidePricingModel
+    from pricing.dynamic_pricer import DynamicRidePricingSystem
+    
     print("===== Xây dựng hệ thống Dynamic Pricing cho ứng dụng đặt xe =====")
     
     # Bước 1: Tạo dữ liệu mẫu
     print("1. Tạo dữ liệu mẫu...")
     n_samples = 10000
-    data = generate_sample_ride_data(n_samples=n_samples)
+    data = generate_sample_ride_data(n_samples=n_samples, seed=seed,
+                                     reference_time=TRAINING_REFERENCE_TIME)
     print(f"Đã tạo {n_samples} chuyến xe mẫu")
     
     # Chia tập huấn luyện và kiểm thử
@@ -34,16 +44,21 @@ def train_model():
     
     # Bước 2: Tiền xử lý dữ liệu
     print("2. Tiền xử lý dữ liệu...")
-    preprocessor = RideDataPreprocessor()
-    preprocessor.fit(X_train)
-    
-    X_train_processed = preprocessor.transform(X_train)
-    X_test_processed = preprocessor.transform(X_test)
+    preprocessor, X_train_processed, X_test_processed, cache_hit = preprocess_with_cache(
+        X_train, X_test, cache_dir=feature_cache_dir)
+    if cache_hit:
+        print("Dùng ma trận đặc trưng đã tiền xử lý từ cache")
     
     print(f"Số lượng đặc trưng sau khi tiền xử lý: {X_train_processed.shape[1]}")
     
     # Bước 3: Huấn luyện mô hình
     print("3. Huấn luyện mô hình dự đoán giá...")
+    if compact_tolerance is not None:
+        # Tách tập validation từ tập huấn luyện để chọn cấu hình nén, tập kiểm thử chỉ dùng để báo cáo
+        X_train_processed, X_val_processed, y_train, y_val = train_test_split(
+            X_train_processed, y_train, test_size=0.2, random_state=42)
+        print(f"Tách {X_val_processed.shape[0]} chuyến làm tập validation cho việc nén mô hình")
+    
     model = RidePricingModel()
     model.fit(X_train_processed, y_train)
     
@@ -67,13 +82,56 @@ def train_model():
     for i, (feature, importance) in enumerate(zip(feature_imp['feature'][:5], feature_imp['importance'][:5])):
         print(f"{i+1}. {feature}: {importance:.4f}")
     
+    if compact_tolerance is not None:
+        print(f"Nén mô hình (MAE trên tập validation tăng không quá {compact_tolerance:.1%})...")
+        report = model.compact(X_val_processed, y_val, tolerance=compact_tolerance)
+        print(f"  - Số cây: {report['full_n_trees']} -> {report['n_trees']}, "
+              f"độ sâu: {report['full_max_depth']} -> {report['max_depth']}, "
+              f"số nút: {report['full_n_nodes']:,} -> {report['n_nodes']:,} "
+              f"(gộp {report['merged_leaves']} cặp lá)")
+        print(f"  - MAE trên tập validation: {report['full_mae']:,.0f} -> {report['compacted_mae']:,.0f} đồng "
+              f"(tăng {report['mae_increase']:+.2%}, cận trên {report['confidence']:.0%}: "
+              f"{report['mae_increase_upper']:+.2%})")
+        if report['rejected_by_bound']:
+            print(f"  - {report['rejected_by_bound']} cấu hình nhỏ hơn có MAE trong mức cho phép nhưng không "
+                  f"có ý nghĩa thống kê trên {report['validation_rows']} chuyến validation (cận trên vượt mức), "
+                  f"không được chọn")
+        compacted_metrics = model.evaluate(X_test_processed, y_test)
+        print(f"  - MAE trên tập kiểm thử: {test_metrics['mae']:,.0f} -> {compacted_metrics['mae']:,.0f} đồng")
+        before, after = report['before'], report['after']
+        print(f"  - Kích thước mô hình: {before['artifact_bytes'] / 1024:,.0f} KB -> "
+              f"{after['artifact_bytes'] / 1024:,.0f} KB")
+        print(f"  - Thời gian tải: {before['load_ms']:.1f} ms -> {after['load_ms']:.1f} ms")
+        print(f"  - Dự đoán 1 chuyến: {before['predict_one_ms']:.2f} ms -> {after['predict_one_ms']:.2f} ms")
+        print(f"  - Dự đoán {after['batch_rows']} chuyến: {before['predict_batch_ms']:.1f} ms -> "
+              f"{after['predict_batch_ms']:.1f} ms")
+    
     # Bước 4: Khởi tạo hệ thống Dynamic Pricing
     print("4. Khởi tạo hệ thống Dynamic Pricing...")
     pricing_system = DynamicRidePricingSystem(model, preprocessor)
     
+    if price_surface:
+        import time
+        
+        from pricing.price_surface import PriceSurface, reference_from_rides
+        
+        print("Tính trước bảng giá mô hình trên lưới chuyến xe thường gặp...")
+        started = time.perf_counter()
+        surface = PriceSurface.build(model, preprocessor, reference=reference_from_rides(X_train))
+        print(f"  - {surface.n_points:,} điểm lưới ({surface.values.nbytes / 1024:,.0f} KB) "
+              f"trong {time.perf_counter() - started:.2f} giây")
+        report = surface.evaluate(X_test, model, preprocessor)
+        print(f"  - Chuyến kiểm thử nằm trong lưới: {report['coverage']:.1%}")
+        if 'mae' in report:
+            print(f"  - Sai số so với mô hình: MAE {report['mae']:,.0f} đồng ({report['mape']:.3f}%), "
+                  f"p95 {report['p95_abs_error']:,.0f} đồng, lớn nhất {report['max_abs_error']:,.0f} đồng")
+        pricing_system.price_surface = surface
+    
     # Lưu hệ thống định giá
-    joblib.dump(pricing_system, "ride_pricing_system.pkl")
-    print("Đã lưu hệ thống định giá vào 'ride_pricing_system.pkl'")
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    joblib.dump(pricing_system, output_path)
+    print(f"Đã lưu hệ thống định giá vào '{output_path}'")
     
     # Bước 5: Demo thử nghiệm
     print("5. Thử nghiệm hệ thống với một số chuyến xe mẫu...")
@@ -106,74 +164,236 @@ def train_model():
     print("Để chạy API server, thực thi: python -m api.app")
     print("Để chạy dashboard, thực thi: streamlit run dashboard/app.py")
 
-def test_api():
+def load_test(base_url, rate, duration, concurrency, mix, output_path=None):
     """
-    Kiểm thử API endpoints
+    Tạo tải lên API đang chạy và báo cáo thông lượng, độ trễ và tỷ lệ lỗi
     """
-    import requests
-    from requests.exceptions import ConnectionError
+    import json
+    from benchmarks.load_test import run_load_test, parse_mix, print_report
     
-    print("===== Kiểm thử API =====")
+    print("===== Kiểm thử tải API =====")
+    print(f"Địa chỉ: {base_url}, tốc độ: {rate} request/giây, thời gian: {duration} giây, "
+          f"số client: {concurrency}")
     
-    base_url = "http://localhost:5000/api"
+    report = run_load_test(base_url=base_url, rate=rate, duration=duration,
+                           concurrency=concurrency, mix=parse_mix(mix))
+    print_report(report)
     
-    try:
-        # Kiểm tra health
-        print("Kiểm tra API health...")
-        response = requests.get(f"{base_url}/health")
-        if response.status_code == 200:
-            print("Health check OK:", response.json())
-        else:
-            print(f"Lỗi: {response.status_code}")
-        
-        # Thử tính giá
-        print("Thử tính giá 1 chuyến...")
-        test_ride = {
-            "distance_km": 5.0,
-            "duration_min": 15,
-            "weather_condition": 0,
-            "traffic_level": 3,
-            "available_drivers": 10,
-            "area_demand": 50,
-            "vehicle_type": 1,
-            "user_rating": 4.5,
-            "user_previous_rides": 5
-        }
-        
-        response = requests.post(f"{base_url}/get-price", json=test_ride)
-        if response.status_code == 200:
-            result = response.json()
-            print(f"Giá cơ bản: {result['base_price']:,.0f} đồng")
-            print(f"Giá tối ưu: {result['optimal_price']:,.0f} đồng")
-            print(f"% thay đổi giá: {result['price_percent_change']:.1f}%")
-        else:
-            print(f"Lỗi: {response.status_code}")
-        
-        # Thử giả lập chuyến
-        print("Thử giả lập 3 chuyến...")
-        response = requests.get(f"{base_url}/simulate-rides?n_rides=3")
-        if response.status_code == 200:
-            results = response.json()
-            print(f"Nhận được {len(results)} kết quả")
-            for i, ride in enumerate(results):
-                print(f"Chuyến {i+1}: {ride['ride_id']} - {ride['optimal_price']:,.0f} đồng")
-        else:
-            print(f"Lỗi: {response.status_code}")
-        
-    except ConnectionError:
+    if report['errors'].get('ClientConnectorError') == report['overall']['requests']:
         print("Không thể kết nối đến API server. Hãy chắc chắn server đang chạy.")
     
-    print("===== Kết thúc kiểm thử API =====")
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Đã lưu báo cáo vào '{output_path}'")
+    
+    print("===== Kết thúc kiểm thử tải =====")
+
+def parallel_scaling(n_rides=1000000):
+    """
+    Đo hiệu suất mở rộng của chế độ định giá song song với 1/2/4/8 tiến trình
+    """
+    import joblib
+    
+    from data.data_generator import generate_sample_ride_data
+    from pricing.parallel import measure_parallel_scaling
+    
+    print("===== Đo hiệu suất định giá song song =====")
+    
+    pricing_system = joblib.load("ride_pricing_system.pkl")
+    
+    print(f"Tạo {n_rides:,} chuyến xe mẫu...")
+    rides_df = generate_sample_ride_data(n_samples=n_rides)
+    
+    report = measure_parallel_scaling(pricing_system, rides_df, worker_counts=(1, 2, 4, 8))
+    
+    print(f"{'Tiến trình':>10} {'Thời gian (s)':>14} {'Chuyến/giây':>14} {'Tăng tốc':>9} {'Hiệu suất':>10} {'Giống hệt':>10}")
+    for row in report:
+        label = "đơn" if row['n_workers'] == 0 else str(row['n_workers'])
+        print(f"{label:>10} {row['seconds']:>14.2f} {row['rides_per_sec']:>14,.0f} "
+              f"{row['speedup']:>9.2f} {row['efficiency']:>10.0%} {str(row['identical']):>10}")
+    
+    print("===== Kết thúc đo hiệu suất =====")
+
+def backtest(data_path, policy_paths, chunk_size=100000):
+    """
+    Chạy lại dữ liệu chuyến xe lịch sử qua một hoặc nhiều hệ thống định giá đã lưu
+    """
+    import joblib
+    
+    from pricing.backtest import PricingBacktester
+    
+    print("===== Backtest chính sách định giá =====")
+    
+    policies = {os.path.splitext(os.path.basename(path))[0]: joblib.load(path) for path in policy_paths}
+    backtester = PricingBacktester(policies, chunk_size=chunk_size).run(data_path)
+    
+    print("Kết quả tổng hợp:")
+    print(backtester.summary().T.to_string(float_format=lambda x: f"{x:,.3f}"))
+    
+    for dimension in backtester.active_dimensions:
+        print(f"Kết quả theo {dimension}:")
+        report = backtester.report(dimension)
+        print(report.xs('revenue', axis=1, level=1).join(
+            report.xs('avg_price_multiplier', axis=1, level=1), lsuffix='_revenue', rsuffix='_multiplier'
+        ).to_string(float_format=lambda x: f"{x:,.3f}"))
+    
+    print("===== Kết thúc backtest =====")
+
+def evaluate(data_path=None, n_rides=1000000, chunk_size=100000):
+    """
+    Đánh giá mô hình của hệ thống định giá đã lưu theo từng chunk (bộ nhớ cố định)
+    """
+    import joblib
+    
+    from data.data_generator import generate_sample_ride_data
+    from pricing.backtest import iter_ride_chunks
+    
+    print("===== Đánh giá mô hình theo từng chunk =====")
+    
+    pricing_system = joblib.load("ride_pricing_system.pkl")
+    
+    if data_path:
+        chunks = iter_ride_chunks(data_path, chunk_size=chunk_size)
+    else:
+        # Dữ liệu mẫu được tạo lần lượt từng chunk với seed khác nhau
+        print(f"Tạo {n_rides:,} chuyến xe mẫu theo từng chunk {chunk_size:,} chuyến...")
+        chunks = (generate_sample_ride_data(n_samples=min(chunk_size, n_rides - start), seed=1000 + i)
+                  for i, start in enumerate(range(0, n_rides, chunk_size)))
+    
+    result = pricing_system.model.evaluate_streaming(chunks, pricing_system.preprocessor)
+    
+    print(f"Số chuyến: {result['n']:,}")
+    print(f"  - MAE: {result['mae']:,.0f} đồng")
+    print(f"  - MAPE: {result['mape']:.2f}%")
+    print(f"  - RMSE: {result['rmse']:,.0f} đồng")
+    print(f"  - R²: {result['r2']:.4f}")
+    print("Phân vị sai số tuyệt đối (ước lượng):")
+    for q, value in result['abs_error_quantiles'].items():
+        print(f"  - p{q * 100:g}: {value:,.0f} đồng ({result['abs_pct_error_quantiles'][q]:.2f}%)")
+    
+    for segment, groups in result['segments'].items():
+        print(f"Theo {segment}:")
+        for key, metrics in groups.items():
+            print(f"  {key:>4}: {metrics['n']:>10,} chuyến  MAE {metrics['mae']:>10,.0f}  "
+                  f"MAPE {metrics['mape']:>6.2f}%  R² {metrics['r2']:.4f}")
+    
+    print("===== Kết thúc đánh giá =====")
+
+def bench(output_path="bench_results.json", baseline_path=None, max_size=1000000, seed=7):
+    """
+    Chạy bộ benchmark cho các hàm quan trọng và ghi kết quả ra file JSON
+    
+    Args:
+        output_path: File JSON lưu kết quả
+        baseline_path: File JSON benchmark trước đó để so sánh (None để bỏ qua)
+        max_size: Kích thước đầu vào lớn nhất
+        seed: Random seed của dữ liệu đo (được ghi vào kết quả)
+    """
+    from benchmarks.pricing_bench import (DEFAULT_SIZES, build_benchmark_system, run_benchmarks,
+                                          save_results, compare_to_baseline)
+    
+    print("===== Benchmark hệ thống định giá =====")
+    
+    print("Huấn luyện hệ thống định giá trên dữ liệu cố định...")
+    pricing_system = build_benchmark_system()
+    
+    sizes = [size for size in DEFAULT_SIZES if size <= max_size]
+    results = run_benchmarks(pricing_system, sizes=sizes, seed=seed)
+    
+    save_results(results, output_path, seed=seed)
+    print(f"Đã lưu kết quả vào '{output_path}'")
+    
+    if baseline_path:
+        print(f"So sánh với baseline '{baseline_path}':")
+        for row in compare_to_baseline(results, baseline_path):
+            flag = "CHẬM HƠN" if row['regression'] else "ok"
+            print(f"- {row['case']} ({row['size']:,} rows): {row['baseline_p50_ms']:.3f} ms -> "
+                  f"{row['p50_ms']:.3f} ms (x{row['p50_ratio']:.2f}) {flag}")
+    
+    print("===== Kết thúc benchmark =====")
+
+def startup(n_runs=5):
+    """
+    Đo thời gian khởi động nguội của API (import, tải mô hình, warm-up, quote đầu tiên)
+    """
+    from benchmarks.startup_bench import measure_cold_start, print_report
+    
+    print("===== Đo thời gian khởi động API =====")
+    
+    print_report(measure_cold_start(n_runs=n_runs))
+    
+    print("===== Kết thúc đo thời gian khởi động =====")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Dynamic Ride Pricing System')
     parser.add_argument('--action', type=str, default='train', 
-                        choices=['train', 'test_api'],
-                        help='Hành động để thực hiện (train|test_api)')
+                        choices=['train', 'load_test', 'scaling', 'backtest', 'bench', 'startup', 'evaluate'],
+                        help='Hành động để thực hiện (train|load_test|scaling|backtest|bench|startup|evaluate)')
+    parser.add_argument('--region', type=str,
+                        help='Huấn luyện hệ thống định giá cho một khu vực (lưu vào regions/<region>.pkl)')
+    parser.add_argument('--no-feature-cache', action='store_true',
+                        help='Không dùng cache đặc trưng đã tiền xử lý khi huấn luyện')
+    parser.add_argument('--compact-tolerance', type=float,
+                        help='Nén mô hình sau khi huấn luyện, cho phép MAE tăng tương đối tối đa '
+                             'bằng giá trị này (vd. 0.01)')
+    parser.add_argument('--price-surface', action='store_true',
+                        help='Tính trước bảng giá mô hình trên lưới (khoảng cách, loại xe, thời tiết, '
+                             'tắc nghẽn) và lưu cùng hệ thống định giá')
+    parser.add_argument('--n-rides', type=int, default=1000000,
+                        help='Số chuyến xe dùng để đo hiệu suất song song (scaling) hoặc đánh giá (evaluate)')
+    parser.add_argument('--data', type=str,
+                        help='File dữ liệu chuyến xe lịch sử (CSV/Parquet); bắt buộc với backtest, '
+                             'evaluate dùng dữ liệu tổng hợp nếu bỏ trống')
+    parser.add_argument('--policies', type=str, nargs='+', default=['ride_pricing_system.pkl'],
+                        help='Các file hệ thống định giá cần so sánh trong backtest')
+    parser.add_argument('--output', type=str,
+                        help='File JSON lưu kết quả benchmark (mặc định bench_results.json) '
+                             'hoặc báo cáo kiểm thử tải')
+    parser.add_argument('--baseline', type=str,
+                        help='File JSON benchmark trước đó để so sánh')
+    parser.add_argument('--max-size', type=int, default=1000000,
+                        help='Kích thước đầu vào lớn nhất của benchmark')
+    parser.add_argument('--bench-seed', type=int, default=7,
+                        help='Random seed của dữ liệu đo benchmark')
+    parser.add_argument('--url', type=str, default='http://localhost:5001/api',
+                        help='Địa chỉ API cho kiểm thử tải')
+    parser.add_argument('--rate', type=float, default=50,
+                        help='Số request mỗi giây khi kiểm thử tải')
+    parser.add_argument('--duration', type=float, default=30,
+                        help='Thời gian kiểm thử tải (giây)')
+    parser.add_argument('--concurrency', type=int, default=32,
+                        help='Số client đồng thời khi kiểm thử tải')
+    parser.add_argument('--mix', type=str, default='get_price=0.8,simulate=0.1,health=0.1',
+                        help='Tỷ lệ các loại request khi kiểm thử tải')
     
     args = parser.parse_args()
     
     if args.action == 'train':
-        train_model()
-    elif args.action == 'test_api':
-        test_api()
+        feature_cache_dir = None if args.no_feature_cache else ".feature_cache"
+        if args.region:
+            import zlib
+            
+            from pricing.registry import PricingSystemRegistry
+            
+            # Seed riêng cho mỗi khu vực để dữ liệu mẫu của các khu vực khác nhau
+            train_model(PricingSystemRegistry().region_path(args.region),
+                        seed=zlib.crc32(args.region.encode()), feature_cache_dir=feature_cache_dir,
+                        compact_tolerance=args.compact_tolerance, price_surface=args.price_surface)
+        else:
+            train_model(feature_cache_dir=feature_cache_dir, compact_tolerance=args.compact_tolerance,
+                        price_surface=args.price_surface)
+    elif args.action == 'load_test':
+        load_test(args.url, args.rate, args.duration, args.concurrency, args.mix, args.output)
+    elif args.action == 'scaling':
+        parallel_scaling(args.n_rides)
+    elif args.action == 'backtest':
+        if not args.data:
+            parser.error("--data là bắt buộc với --action backtest")
+        backtest(args.data, args.policies)
+    elif args.action == 'bench':
+        bench(args.output or 'bench_results.json', args.baseline, args.max_size, args.bench_seed)
+    elif args.action == 'startup':
+        startup()
+    elif args.action == 'evaluate':
+        evaluate(args.data, args.n_rides)
@@ -0,0 +1,358 @@
+import io
+import time
+
+import numpy as np
+
+# Số phần tử (dòng x cây) tối đa được duyệt cùng lúc khi dự đoán, giới hạn bộ nhớ tạm
+_MAX_TRAVERSAL_CELLS = 1 << 20
+
+class CompactForest:
+    """
+    Rừng cây hồi quy dạng mảng phẳng, thay thế RandomForestRegressor đã huấn luyện khi dự đoán
+    - Các nút của mọi cây nằm trong cùng các mảng feature/threshold/children/value
+    - Nút lá trỏ về chính nó với ngưỡng +inf, nên mọi cây được duyệt đúng max_depth bước
+      (véc-tơ hóa trên tất cả dòng x cây, không cần kiểm tra lá)
+    - Đầu vào được ép về float32 như sklearn, nên ngưỡng float32 (làm tròn xuống) cho
+      cùng nhánh rẽ với ngưỡng float64 gốc
+    """
+    def __init__(self, feature, threshold, children, value, roots, max_depth, feature_names=None):
+        """
+        Args:
+            feature: Chỉ số đặc trưng của từng nút
+            threshold: Ngưỡng rẽ của từng nút (đi sang phải nếu giá trị > ngưỡng)
+            children: Mảng (số nút, 2) chỉ số nút con trái/phải
+            value: Giá trị dự đoán của từng nút
+            roots: Chỉ số nút gốc của từng cây
+            max_depth: Độ sâu lớn nhất của các cây
+            feature_names: Thứ tự cột đặc trưng khi huấn luyện
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.feature_names = None if feature_names is None else list(feature_names)
+    
+    @property
+    def n_trees(self):
+        return len(self.roots)
+    
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+    
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.feature, self.threshold, self.children,
+                                              self.value, self.roots))
+    
+    def predict(self, X):
+        """
+        Dự đoán bằng trung bình các cây
+        
+        Args:
+            X: DataFrame hoặc mảng đặc trưng đã tiền xử lý
+        
+        Returns:
+            Array giá dự đoán
+        """
+        X = self._as_matrix(X)
+        out = np.empty(len(X))
+        for start, stop, nodes in self._traverse(X):
+            out[start:stop] = self.value.take(nodes).reshape(stop - start, -1).mean(axis=1, dtype=np.float64)
+        return out
+    
+    def _traverse(self, X, n_steps=None):
+        """
+        Duyệt các cây theo từng nhóm dòng
+        
+        Args:
+            X: Mảng float32 đã qua _as_matrix
+            n_steps: Số bước duyệt (mặc định max_depth); ít bước hơn tương đương cắt cây ở độ sâu đó
+        
+        Yields:
+            Tuple (dòng đầu, dòng cuối, chỉ số nút theo thứ tự dòng x cây)
+        """
+        n_steps = self.max_depth if n_steps is None else n_steps
+        n_features = X.shape[1]
+        chunk_size = max(1, _MAX_TRAVERSAL_CELLS // max(self.n_trees, 1))
+        children = self.children.ravel()
+        
+        for start in range(0, len(X), chunk_size):
+            X_chunk = X[start:start + chunk_size]
+            n_rows = len(X_chunk)
+            values = X_chunk.ravel()
+            row_offsets = np.repeat(np.arange(n_rows) * n_features, self.n_trees)
+            nodes = np.tile(self.roots, n_rows)
+            for _ in range(n_steps):
+                go_right = values.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+                nodes = children.take(nodes * 2 + go_right)
+            yield start, start + n_rows, nodes
+    
+    def _as_matrix(self, X):
+        if hasattr(X, 'columns'):
+            if self.feature_names is not None:
+                X = X[self.feature_names]
+            X = X.to_numpy()
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+def _tree_arrays(tree):
+    """
+    Các mảng nút của một sklearn Tree và độ sâu của từng nút
+    """
+    state = tree.__getstate__()
+    nodes = state['nodes']
+    left = nodes['left_child'].astype(np.int64)
+    right = nodes['right_child'].astype(np.int64)
+    
+    depth = np.zeros(len(nodes), dtype=np.int64)
+    frontier = np.array([0])
+    level = 0
+    while len(frontier):
+        depth[frontier] = level
+        internal = frontier[left[frontier] >= 0]
+        frontier = np.concatenate([left[internal], right[internal]])
+        level += 1
+    
+    return {
+        'left': left,
+        'right': right,
+        'feature': nodes['feature'].astype(np.int64),
+        'threshold': nodes['threshold'],
+        # Giá trị của cả nút trong (trung bình mẫu của nút) dùng khi cắt cây theo độ sâu
+        'value': state['values'][:, 0, 0],
+        'depth': depth
+    }
+
+def _float32_floor(values):
+    """
+    Làm tròn xuống float32 lớn nhất không vượt quá giá trị float64: với x float32,
+    x <= t tương đương x <= floor32(t)
+    """
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+def _compact_tree(arrays, max_depth, merge_leaves, float32):
+    """
+    Cắt một cây ở max_depth, gộp hai lá anh em có cùng giá trị và đánh lại chỉ số các nút còn dùng
+    
+    Returns:
+        Tuple (dict mảng nút của cây đã nén với lá trỏ về chính nó, số lần gộp lá)
+    """
+    left, right, depth = arrays['left'], arrays['right'], arrays['depth']
+    value_dtype = np.float32 if float32 else np.float64
+    value = arrays['value'].astype(value_dtype)
+    is_leaf = (left < 0) | (depth >= max_depth)
+    
+    merged = 0
+    if merge_leaves:
+        safe_left, safe_right = np.maximum(left, 0), np.maximum(right, 0)
+        # Từ dưới lên: một nút có thể thành lá sau khi các con của nó đã được gộp
+        for level in range(int(min(depth.max(), max_depth)) - 1, -1, -1):
+            mergeable = ((depth == level) & ~is_leaf & is_leaf[safe_left] & is_leaf[safe_right]
+                         & (value[safe_left] == value[safe_right]))
+            value[mergeable] = value[safe_left[mergeable]]
+            is_leaf |= mergeable
+            merged += int(mergeable.sum())
+    
+    # Các nút còn đến được từ gốc (cây sklearn đánh số nút con sau nút cha)
+    reachable = np.zeros(len(left), dtype=bool)
+    reachable[0] = True
+    for level in range(int(min(depth.max(), max_depth))):
+        parents = np.flatnonzero(reachable & (depth == level) & ~is_leaf)
+        reachable[left[parents]] = True
+        reachable[right[parents]] = True
+    
+    old_ids = np.flatnonzero(reachable)
+    new_id = np.full(len(left), -1, dtype=np.int64)
+    new_id[old_ids] = np.arange(len(old_ids))
+    leaf = is_leaf[old_ids]
+    own = np.arange(len(old_ids))
+    
+    threshold = arrays['threshold'][old_ids]
+    return {
+        'feature': np.where(leaf, 0, arrays['feature'][old_ids]),
+        'threshold': np.where(leaf, np.inf, _float32_floor(threshold) if float32 else threshold),
+        'children': np.stack([np.where(leaf, own, new_id[np.maximum(left[old_ids], 0)]),
+                              np.where(leaf, own, new_id[np.maximum(right[old_ids], 0)])], axis=1),
+        'value': value[old_ids],
+        'depth': int(min(depth[old_ids].max(), max_depth))
+    }, merged
+
+def build_compact_forest(forest, n_trees=None, max_depth=None, merge_leaves=True, float32=True):
+    """
+    Chuyển RandomForestRegressor đã huấn luyện sang CompactForest
+    
+    Args:
+        forest: RandomForestRegressor đã huấn luyện
+        n_trees: Chỉ giữ n_trees cây đầu tiên (None để giữ tất cả)
+        max_depth: Cắt các cây ở độ sâu này (None để giữ nguyên)
+        merge_leaves: Gộp hai lá anh em có cùng giá trị thành lá của nút cha
+        float32: Lưu ngưỡng và giá trị dạng float32
+    
+    Returns:
+        Tuple (CompactForest, số lần gộp lá)
+    """
+    estimators = forest.estimators_[:n_trees]
+    trees, merged = [], 0
+    for estimator in estimators:
+        arrays = _tree_arrays(estimator.tree_)
+        tree, tree_merged = _compact_tree(arrays, arrays['depth'].max() if max_depth is None else max_depth,
+                                          merge_leaves, float32)
+        trees.append(tree)
+        merged += tree_merged
+    
+    sizes = np.array([len(tree['feature']) for tree in trees])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    feature_dtype = np.int16 if forest.n_features_in_ < np.iinfo(np.int16).max else np.int32
+    
+    compact = CompactForest(
+        feature=np.concatenate([tree['feature'] for tree in trees]).astype(feature_dtype),
+        threshold=np.concatenate([tree['threshold'] for tree in trees]).astype(
+            np.float32 if float32 else np.float64),
+        children=np.concatenate([tree['children'] + offset for tree, offset in zip(trees, offsets)]).astype(np.int32),
+        value=np.concatenate([tree['value'] for tree in trees]),
+        roots=offsets.astype(np.int32),
+        max_depth=max(tree['depth'] for tree in trees),
+        feature_names=getattr(forest, 'feature_names_in_', None)
+    )
+    return compact, merged
+
+def search_compaction(forest, X_val, y_val, tolerance=0.01, prune_trees=True, prune_depth=True,
+                      n_bootstrap=200, confidence=0.95, seed=0):
+    """
+    Tìm số cây và độ sâu cho rừng nhỏ nhất (tổng số nút) mà MAE trên tập validation
+    không vượt quá MAE của rừng đầy đủ quá tolerance (tương đối)
+    - Dự đoán của mọi cặp (số cây đầu tiên, độ sâu) được tính trong một lần duyệt:
+      dừng duyệt sau d bước cho giá trị của cây cắt ở độ sâu d, cộng dồn theo cây cho k cây đầu
+    - Mức tăng MAE được kiểm định bằng bootstrap ghép cặp (trọng số Poisson, cùng mẫu cho mọi
+      cấu hình và rừng đầy đủ): một cấu hình chỉ được chấp nhận khi cả giá trị điểm lẫn cận trên
+      theo confidence của mức tăng đều không vượt tolerance, nên chênh lệch nằm trong nhiễu
+      của tập validation không đủ để bỏ cây
+    
+    Args:
+        forest: RandomForestRegressor đã huấn luyện
+        X_val: Đặc trưng của tập validation
+        y_val: Giá trị thực của tập validation
+        tolerance: Mức tăng MAE tương đối cho phép (0.01 = 1%)
+        prune_trees: Cho phép bỏ bớt cây
+        prune_depth: Cho phép giảm độ sâu
+        n_bootstrap: Số mẫu bootstrap
+        confidence: Mức tin cậy của cận trên
+        seed: Random seed của bootstrap
+    
+    Returns:
+        Dict với số cây, độ sâu, số nút, MAE, mức tăng MAE (điểm và cận trên) của cấu hình được chọn,
+        của rừng đầy đủ, và số cấu hình nhỏ hơn chỉ bị loại vì cận trên (rejected_by_bound)
+    """
+    full, _ = build_compact_forest(forest, merge_leaves=False, float32=False)
+    y_val = np.asarray(y_val, dtype=np.float64)
+    n_trees, full_depth = full.n_trees, full.max_depth
+    
+    # Tổng sai số tuyệt đối cho mọi (độ sâu, số cây đầu tiên), trên dữ liệu gốc và từng mẫu bootstrap
+    abs_error = np.zeros((full_depth + 1, n_trees))
+    boot_error = np.zeros((n_bootstrap, full_depth + 1, n_trees))
+    X = full._as_matrix(X_val)
+    counts = np.arange(1, n_trees + 1)
+    for depth in range(full_depth + 1):
+        for start, stop, nodes in full._traverse(X, n_steps=depth):
+            predictions = np.cumsum(full.value.take(nodes).reshape(stop - start, n_trees), axis=1) / counts
+            errors = np.abs(predictions - y_val[start:stop, None])
+            abs_error[depth] += errors.sum(axis=0)
+            # Trọng số bootstrap Poisson(1) (số lần mỗi dòng được lấy lại), sinh theo nhóm dòng
+            # với seed cố định nên mọi độ sâu dùng cùng mẫu mà không giữ cả ma trận trọng số
+            weights = np.random.default_rng([seed, start]).poisson(1.0, size=(n_bootstrap, stop - start))
+            boot_error[:, depth] += weights @ errors
+    mae = abs_error / len(X)
+    
+    # Mức tăng MAE tương đối so với rừng đầy đủ: giá trị điểm và cận trên bootstrap
+    full_mae = mae[full_depth, n_trees - 1]
+    increase = mae / full_mae - 1
+    boot_increase = boot_error / boot_error[:, full_depth, n_trees - 1][:, None, None] - 1
+    increase_upper = np.quantile(boot_increase, confidence, axis=0)
+    
+    # Số nút của k cây đầu tiên khi cắt ở từng độ sâu
+    node_counts = np.zeros((full_depth + 1, n_trees), dtype=np.int64)
+    for tree_index, estimator in enumerate(forest.estimators_):
+        depth = _tree_arrays(estimator.tree_)['depth']
+        node_counts[:, tree_index] = np.cumsum(np.bincount(depth, minlength=full_depth + 1))
+    node_counts = np.cumsum(node_counts, axis=1)
+    
+    within_tolerance = increase <= tolerance
+    if not prune_trees:
+        within_tolerance[:, :n_trees - 1] = False
+    if not prune_depth:
+        within_tolerance[:full_depth] = False
+    allowed = within_tolerance & (increase_upper <= tolerance)
+    allowed[full_depth, n_trees - 1] = True
+    
+    # Ít nút nhất, hòa thì chọn độ sâu nhỏ hơn (ít bước duyệt hơn)
+    candidates = np.argwhere(allowed)
+    best_depth, best_k = min(candidates, key=lambda cell: (node_counts[cell[0], cell[1]], cell[0]))
+    best_nodes = node_counts[best_depth, best_k]
+    return {
+        'n_trees': int(best_k + 1),
+        'max_depth': int(best_depth),
+        'n_nodes': int(best_nodes),
+        'mae': float(mae[best_depth, best_k]),
+        'mae_increase': float(increase[best_depth, best_k]),
+        'mae_increase_upper': float(increase_upper[best_depth, best_k]),
+        'rejected_by_bound': int(np.sum(within_tolerance & ~allowed & (node_counts < best_nodes))),
+        'full_n_trees': int(n_trees),
+        'full_max_depth': int(full_depth),
+        'full_n_nodes': int(node_counts[full_depth, n_trees - 1]),
+        'full_mae': float(full_mae),
+        'tolerance': tolerance,
+        'confidence': confidence,
+        'validation_rows': int(len(X))
+    }
+
+def measure_artifact(model, X, n_runs=5, n_calls=200):
+    """
+    Đo kích thước pickle, thời gian tải và độ trễ dự đoán của một mô hình
+    
+    Args:
+        model: Đối tượng có predict (vd. RidePricingModel)
+        X: DataFrame đặc trưng đã tiền xử lý dùng để đo dự đoán
+        n_runs: Số lần đo thời gian tải và dự đoán theo lô (lấy trung vị)
+        n_calls: Số lần gọi dự đoán một dòng
+    
+    Returns:
+        Dict với artifact_bytes, load_ms, predict_one_ms (p50) và predict_batch_ms (trung vị, cả X)
+    """
+    import joblib
+    
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    payload = buffer.getvalue()
+    
+    load_times = []
+    for _ in range(n_runs):
+        started = time.perf_counter()
+        joblib.load(io.BytesIO(payload))
+        load_times.append(time.perf_counter() - started)
+    
+    one_row = X.iloc[[0]]
+    model.predict(one_row)
+    one_times = []
+    for _ in range(n_calls):
+        started = time.perf_counter()
+        model.predict(one_row)
+        one_times.append(time.perf_counter() - started)
+    
+    batch_times = []
+    for _ in range(n_runs):
+        started = time.perf_counter()
+        model.predict(X)
+        batch_times.append(time.perf_counter() - started)
+    
+    return {
+        'artifact_bytes': len(payload),
+        'load_ms': float(np.median(load_times) * 1000),
+        'predict_one_ms': float(np.median(one_times) * 1000),
+        'predict_batch_ms': float(np.median(batch_times) * 1000),
+        'batch_rows': len(X)
+    }
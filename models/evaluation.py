@@ -0,0 +1,242 @@
+import math
+
+import numpy as np
+
+# Các chiều mặc định để phân tích sai số theo nhóm
+DEFAULT_SEGMENTS = ('vehicle_type', 'hour', 'weather_condition')
+
+# Các phân vị sai số được báo cáo
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+class QuantileSketch:
+    """
+    Sketch kích thước cố định để ước lượng phân vị của các giá trị không âm
+    - Histogram theo thang log: bucket i chứa các giá trị trong (gamma^(i-1), gamma^i]
+    - Sai số tương đối của phân vị ước lượng không quá relative_accuracy
+    - Số bucket chỉ phụ thuộc khoảng giá trị và độ chính xác, không phụ thuộc số mẫu
+    """
+    def __init__(self, relative_accuracy=0.01, min_value=1e-3, max_value=1e9):
+        """
+        Khởi tạo sketch
+        
+        Args:
+            relative_accuracy: Sai số tương đối tối đa của phân vị
+            min_value: Giá trị nhỏ hơn mức này được coi là 0
+            max_value: Giá trị lớn hơn mức này được gộp vào bucket cuối
+        """
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self._offset = math.ceil(math.log(min_value) / self._log_gamma)
+        n_buckets = math.ceil(math.log(max_value) / self._log_gamma) - self._offset + 1
+        # Bucket 0 dành cho các giá trị nhỏ hơn min_value
+        self.counts = np.zeros(n_buckets + 1, dtype=np.int64)
+    
+    def update(self, values):
+        """
+        Thêm các giá trị vào sketch
+        
+        Args:
+            values: Mảng giá trị không âm
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        index = np.zeros(len(values), dtype=np.int64)
+        positive = values >= self.min_value
+        index[positive] = np.ceil(np.log(values[positive]) / self._log_gamma) - self._offset + 1
+        np.clip(index, 0, len(self.counts) - 1, out=index)
+        self.counts += np.bincount(index, minlength=len(self.counts))
+    
+    def merge(self, other):
+        """
+        Gộp một sketch khác (cùng cấu hình) vào sketch này
+        """
+        self.counts += other.counts
+    
+    def quantile(self, q):
+        """
+        Ước lượng phân vị q
+        
+        Args:
+            q: Phân vị trong khoảng [0, 1]
+        
+        Returns:
+            Giá trị ước lượng (NaN nếu sketch rỗng)
+        """
+        total = self.counts.sum()
+        if total == 0:
+            return float('nan')
+        
+        bucket = int(np.searchsorted(np.cumsum(self.counts), q * (total - 1), side='right'))
+        if bucket == 0:
+            return 0.0
+        # Giá trị đại diện của bucket có sai số tương đối nhỏ nhất với mọi giá trị trong bucket
+        upper = self.gamma ** (bucket - 1 + self._offset)
+        return float(2 * upper / (self.gamma + 1))
+
+class _RunningMoments:
+    """
+    Các tổng cộng dồn cho MAE, MAPE và R² của một nhóm
+    - Trung bình và tổng bình phương độ lệch của giá trị thực được gộp theo công thức
+      song song của Chan để tránh mất độ chính xác khi số mẫu lớn
+    """
+    __slots__ = ('n', 'sum_abs_error', 'sum_abs_pct_error', 'sum_sq_error', 'mean_true', 'm2_true')
+    
+    def __init__(self):
+        self.n = 0
+        self.sum_abs_error = 0.0
+        self.sum_abs_pct_error = 0.0
+        self.sum_sq_error = 0.0
+        self.mean_true = 0.0
+        self.m2_true = 0.0
+    
+    def merge(self, n, sum_abs_error, sum_abs_pct_error, sum_sq_error, mean_true, m2_true):
+        total = self.n + n
+        delta = mean_true - self.mean_true
+        self.m2_true += m2_true + delta * delta * self.n * n / total
+        self.mean_true += delta * n / total
+        self.n = total
+        self.sum_abs_error += sum_abs_error
+        self.sum_abs_pct_error += sum_abs_pct_error
+        self.sum_sq_error += sum_sq_error
+    
+    def result(self):
+        if self.n == 0:
+            return {'n': 0}
+        return {
+            'n': self.n,
+            'mae': float(self.sum_abs_error / self.n),
+            'mape': float(self.sum_abs_pct_error / self.n * 100),
+            'rmse': math.sqrt(self.sum_sq_error / self.n),
+            'r2': float(1 - self.sum_sq_error / self.m2_true) if self.m2_true > 0 else float('nan')
+        }
+
+class StreamingEvaluator:
+    """
+    Đánh giá mô hình theo từng chunk với bộ nhớ cố định
+    - Cộng dồn MAE, MAPE, RMSE và R² (qua các moment cộng dồn) trên toàn bộ dữ liệu
+    - Cùng các chỉ số theo từng nhóm (loại xe, giờ, thời tiết...)
+    - Phân vị của sai số tuyệt đối và sai số phần trăm ước lượng bằng QuantileSketch
+    """
+    def __init__(self, segments=DEFAULT_SEGMENTS, relative_accuracy=0.01):
+        """
+        Khởi tạo evaluator
+        
+        Args:
+            segments: Tên các chiều để phân tích theo nhóm
+            relative_accuracy: Sai số tương đối của các phân vị ước lượng
+        """
+        self.segments = list(segments)
+        self.overall = _RunningMoments()
+        self.by_segment = {segment: {} for segment in self.segments}
+        self.abs_error_sketch = QuantileSketch(relative_accuracy)
+        self.abs_pct_error_sketch = QuantileSketch(relative_accuracy)
+    
+    def update(self, y_true, y_pred, segment_values=None):
+        """
+        Cộng dồn một chunk
+        
+        Args:
+            y_true: Giá trị thực
+            y_pred: Giá trị dự đoán
+            segment_values: Dict tên chiều -> mảng giá trị của chiều đó (cùng độ dài)
+        
+        Returns:
+            self
+        """
+        y_true = np.asarray(y_true, dtype=float)
+        y_pred = np.asarray(y_pred, dtype=float)
+        if len(y_true) == 0:
+            return self
+        
+        errors = y_true - y_pred
+        abs_errors = np.abs(errors)
+        abs_pct_errors = abs_errors / np.abs(y_true)
+        
+        self.overall.merge(*_chunk_moments(y_true, errors, abs_errors, abs_pct_errors))
+        self.abs_error_sketch.update(abs_errors)
+        self.abs_pct_error_sketch.update(abs_pct_errors * 100)
+        
+        for segment in self.segments:
+            if segment_values is None or segment not in segment_values:
+                continue
+            keys, codes = np.unique(np.asarray(segment_values[segment]), return_inverse=True)
+            groups = self.by_segment[segment]
+            for code, moments in enumerate(_grouped_moments(codes, len(keys), y_true, errors,
+                                                            abs_errors, abs_pct_errors)):
+                key = keys[code].item()
+                if key not in groups:
+                    groups[key] = _RunningMoments()
+                groups[key].merge(*moments)
+        
+        return self
+    
+    def result(self, quantiles=DEFAULT_QUANTILES):
+        """
+        Kết quả đánh giá
+        
+        Args:
+            quantiles: Các phân vị sai số cần báo cáo
+        
+        Returns:
+            Dict với các chỉ số tổng thể (mae, mape, rmse, r2 như RidePricingModel.evaluate),
+            phân vị sai số và các chỉ số theo từng nhóm
+        """
+        return {
+            **self.overall.result(),
+            'abs_error_quantiles': {q: self.abs_error_sketch.quantile(q) for q in quantiles},
+            'abs_pct_error_quantiles': {q: self.abs_pct_error_sketch.quantile(q) for q in quantiles},
+            'segments': {segment: {key: moments.result() for key, moments in sorted(groups.items())}
+                         for segment, groups in self.by_segment.items()}
+        }
+
+def evaluate_in_chunks(model, chunks, preprocessor=None, target='base_price',
+                       segments=DEFAULT_SEGMENTS, relative_accuracy=0.01):
+    """
+    Đánh giá mô hình trên dữ liệu đọc theo từng chunk, chỉ giữ một chunk trong bộ nhớ
+    
+    Args:
+        model: RidePricingModel đã huấn luyện
+        chunks: Iterable các DataFrame dữ liệu chuyến xe gốc (có cột target và các cột phân nhóm),
+            vd. pricing.backtest.iter_ride_chunks(path)
+        preprocessor: RideDataPreprocessor đã khớp (None nếu chunk đã được tiền xử lý)
+        target: Tên cột giá trị thực
+        segments: Tên các chiều để phân tích theo nhóm
+        relative_accuracy: Sai số tương đối của các phân vị ước lượng
+    
+    Returns:
+        Dict kết quả (xem StreamingEvaluator.result)
+    """
+    evaluator = StreamingEvaluator(segments, relative_accuracy)
+    
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        X = preprocessor.transform(chunk) if preprocessor is not None else chunk.drop(columns=[target])
+        evaluator.update(chunk[target].to_numpy(), model.predict(X),
+                         {segment: chunk[segment].to_numpy() for segment in segments if segment in chunk})
+    
+    return evaluator.result()
+
+def _chunk_moments(y_true, errors, abs_errors, abs_pct_errors):
+    mean_true = y_true.mean()
+    return (len(y_true), abs_errors.sum(), abs_pct_errors.sum(), np.dot(errors, errors),
+            mean_true, np.sum((y_true - mean_true) ** 2))
+
+def _grouped_moments(codes, n_groups, y_true, errors, abs_errors, abs_pct_errors):
+    """
+    Các moment của từng nhóm trong một chunk (véc-tơ hóa bằng bincount)
+    
+    Returns:
+        Generator tuple moment cho các nhóm theo thứ tự mã nhóm (mã từ np.unique nên không có nhóm rỗng)
+    """
+    counts = np.bincount(codes, minlength=n_groups)
+    sums = {name: np.bincount(codes, weights=values, minlength=n_groups)
+            for name, values in (('abs', abs_errors), ('pct', abs_pct_errors),
+                                 ('sq', errors * errors), ('true', y_true))}
+    means = sums['true'] / np.maximum(counts, 1)
+    m2 = np.bincount(codes, weights=(y_true - means[codes]) ** 2, minlength=n_groups)
+    
+    for code in range(n_groups):
+        yield (int(counts[code]), sums['abs'][code], sums['pct'][code], sums['sq'][code],
+               means[code], m2[code])
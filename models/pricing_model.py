@@ -85,6 +85,92 @@ class RidePricingModel:
             'mape': mape
         }
     
+    def evaluate_streaming(self, chunks, preprocessor=None, target='base_price'):
+        """
+        Đánh giá mô hình trên dữ liệu lớn theo từng chunk với bộ nhớ cố định,
+        kèm chỉ số theo loại xe, giờ, thời tiết và phân vị sai số
+        
+        Args:
+            chunks: Iterable các DataFrame dữ liệu chuyến xe
+            preprocessor: RideDataPreprocessor đã khớp (None nếu chunk đã được tiền xử lý)
+            target: Tên cột giá thực tế
+            
+        Returns:
+            Dict với các độ đo đánh giá (xem models.evaluation.StreamingEvaluator.result)
+        """
+        from models.evaluation import evaluate_in_chunks
+        
+        return evaluate_in_chunks(self, chunks, preprocessor=preprocessor, target=target)
+    
+    def compact(self, X_val, y_val, tolerance=0.01, prune_trees=True, prune_depth=True,
+                merge_leaves=True, float32=True):
+        """
+        Nén mô hình đã huấn luyện: tìm số cây và độ sâu nhỏ nhất giữ MAE trên tập validation
+        trong mức cho phép, rồi thay rừng sklearn bằng CompactForest dạng mảng phẳng
+        (mô hình sau khi nén chỉ dùng để dự đoán, không huấn luyện lại được)
+        - Việc tìm kiếm chấm điểm rừng float64 chưa gộp lá, nên mô hình nén cuối cùng được kiểm tra
+          lại trên tập validation; nếu vượt mức cho phép thì dựng lại với float64, và nếu vẫn vượt
+          thì giữ nguyên rừng ban đầu
+        
+        Args:
+            X_val: DataFrame đặc trưng đã tiền xử lý của tập validation (tách từ tập huấn luyện,
+                không dùng tập kiểm thử)
+            y_val: Series giá thực tế của tập validation
+            tolerance: Mức tăng MAE tương đối cho phép so với mô hình đầy đủ (0.01 = 1%)
+            prune_trees: Cho phép bỏ bớt cây
+            prune_depth: Cho phép giảm độ sâu
+            merge_leaves: Gộp hai lá anh em có cùng giá trị
+            float32: Lưu ngưỡng và giá trị dạng float32
+        
+        Returns:
+            Dict với cấu hình được chọn, MAE trước/sau, phương án dự phòng đã dùng
+            (None, 'float64' hoặc 'original') và kích thước artifact, thời gian tải,
+            độ trễ dự đoán trước/sau (xem models.compaction.measure_artifact)
+        """
+        from models.compaction import build_compact_forest, measure_artifact, search_compaction
+        
+        if not hasattr(self.model, 'estimators_'):
+            raise ValueError("Chỉ nén được RandomForestRegressor đã huấn luyện")
+        
+        forest = self.model
+        before = measure_artifact(self, X_val)
+        search = search_compaction(forest, X_val, y_val, tolerance=tolerance,
+                                   prune_trees=prune_trees, prune_depth=prune_depth)
+        # Cộng thêm sai số làm tròn: việc tìm kiếm cộng dồn dự đoán theo thứ tự khác với predict
+        max_mae = search['full_mae'] * (1 + tolerance + 1e-9)
+        
+        # Các phương án theo thứ tự ưu tiên: cấu hình yêu cầu, rồi float64 (đúng mô hình đã chấm điểm)
+        attempts = [(None, float32)] + ([('float64', False)] if float32 else [])
+        for fallback, use_float32 in attempts:
+            compacted, merged_leaves = build_compact_forest(forest, n_trees=search['n_trees'],
+                                                            max_depth=search['max_depth'],
+                                                            merge_leaves=merge_leaves, float32=use_float32)
+            compacted_mae = mean_absolute_error(y_val, compacted.predict(X_val))
+            if compacted_mae <= max_mae:
+                break
+        else:
+            fallback, compacted, merged_leaves = 'original', forest, 0
+            compacted_mae = search['full_mae']
+            search.update(n_trees=search['full_n_trees'], max_depth=search['full_max_depth'],
+                          n_nodes=search['full_n_nodes'], mae=search['full_mae'],
+                          mae_increase=0.0, mae_increase_upper=0.0)
+        
+        if fallback is not None:
+            print(f"Mô hình nén vượt mức sai số cho phép, dùng phương án dự phòng: {fallback}")
+        
+        self.model = compacted
+        after = measure_artifact(self, X_val)
+        
+        return {
+            **search,
+            'n_nodes': getattr(compacted, 'n_nodes', search['n_nodes']),
+            'merged_leaves': merged_leaves,
+            'compacted_mae': compacted_mae,
+            'fallback': fallback,
+            'before': before,
+            'after': after
+        }
+    
     def get_feature_importance(self):
         """
         Trả về tầm quan trọng của các đặc trưng
@@ -0,0 +1,67 @@
+import numpy as np
+
+VEHICLE_TYPES = ["Xe máy", "Xe 4 chỗ", "Xe 7 chỗ", "Xe sang"]
+
+def summarize_pricing_results(rides_df, results_df, n_bins=20):
+    """
+    Tổng hợp kết quả định giá của một mẫu lớn thành các thống kê gọn nhẹ
+    (dùng cho dashboard thay vì trả về dữ liệu thô từng chuyến)
+    
+    Args:
+        rides_df: DataFrame với thông tin các chuyến xe
+        results_df: DataFrame kết quả từ batch_price_rides
+        n_bins: Số khoảng của histogram % thay đổi giá
+    
+    Returns:
+        Dict với giá trung bình, histogram % thay đổi giá và phân vị giá theo loại xe
+    """
+    optimal_prices = results_df['optimal_price'].to_numpy()
+    percent_changes = results_df['price_percent_change'].to_numpy()
+    vehicle_types = rides_df['vehicle_type'].to_numpy()
+    
+    counts, bin_edges = np.histogram(percent_changes, bins=n_bins)
+    
+    price_by_vehicle_type = []
+    for vehicle_type in np.unique(vehicle_types):
+        prices = optimal_prices[vehicle_types == vehicle_type]
+        stats = _box_stats(prices)
+        stats['vehicle_type'] = VEHICLE_TYPES[vehicle_type]
+        price_by_vehicle_type.append(stats)
+    
+    return {
+        'n_rides': int(len(results_df)),
+        'mean_price': float(optimal_prices.mean()),
+        'mean_percent_change': float(percent_changes.mean()),
+        'percent_change_histogram': {
+            'counts': counts.tolist(),
+            'bin_edges': bin_edges.tolist()
+        },
+        'price_by_vehicle_type': price_by_vehicle_type
+    }
+
+def _box_stats(values):
+    """
+    Tính các phân vị cho boxplot (râu theo quy tắc 1.5 IQR như matplotlib)
+    
+    Args:
+        values: Mảng giá của một nhóm
+    
+    Returns:
+        Dict các thống kê của nhóm
+    """
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    whislo = values[values >= q1 - 1.5 * iqr].min()
+    whishi = values[values <= q3 + 1.5 * iqr].max()
+    
+    return {
+        'count': int(len(values)),
+        'mean': float(values.mean()),
+        'min': float(values.min()),
+        'q1': float(q1),
+        'median': float(median),
+        'q3': float(q3),
+        'max': float(values.max()),
+        'whislo': float(whislo),
+        'whishi': float(whishi)
+    }
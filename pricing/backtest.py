@@ -0,0 +1,178 @@
+import os
+
+import pandas as pd
+
+# Các chiều mặc định để tổng hợp kết quả (chiều không có trong dữ liệu sẽ được bỏ qua)
+DEFAULT_DIMENSIONS = ('hour', 'zone', 'vehicle_type')
+
+# Các tổng được cộng dồn cho mỗi nhóm
+_SUM_COLUMNS = ['rides', 'revenue', 'base_revenue', 'model_revenue', 'price_multiplier',
+                'surge_multiplier', 'clamped_min', 'clamped_max']
+
+class PricingBacktester:
+    """
+    Chạy lại dữ liệu chuyến xe lịch sử qua một hoặc nhiều cấu hình định giá
+    - Đọc dữ liệu theo từng phần (chunk), bộ nhớ chỉ phụ thuộc kích thước chunk
+    - Mỗi chunk được định giá bởi tất cả các cấu hình, nên chỉ cần một lần đọc dữ liệu
+    - Cộng dồn doanh thu, hệ số tăng giá và tỷ lệ chạm giới hạn giá theo từng chiều
+    """
+    def __init__(self, policies, dimensions=DEFAULT_DIMENSIONS, chunk_size=100000):
+        """
+        Khởi tạo backtester
+        
+        Args:
+            policies: Dict tên cấu hình -> DynamicRidePricingSystem
+            dimensions: Các cột dùng để nhóm kết quả (vd. giờ, khu vực, loại xe)
+            chunk_size: Số chuyến mỗi chunk khi đọc từ file
+        """
+        if not policies:
+            raise ValueError("Cần ít nhất một cấu hình định giá")
+        
+        self.policies = dict(policies)
+        self.dimensions = list(dimensions)
+        self.chunk_size = chunk_size
+        self.reset()
+    
+    def reset(self):
+        """
+        Xóa các kết quả đã cộng dồn
+        """
+        self.active_dimensions = None
+        self.totals = {name: pd.Series(0.0, index=_SUM_COLUMNS) for name in self.policies}
+        self.grouped_totals = {name: {} for name in self.policies}
+    
+    def run(self, source):
+        """
+        Chạy backtest trên toàn bộ dữ liệu
+        
+        Args:
+            source: Đường dẫn file CSV/Parquet, DataFrame hoặc iterable các DataFrame
+        
+        Returns:
+            self
+        """
+        for chunk in iter_ride_chunks(source, chunk_size=self.chunk_size):
+            self.update(chunk)
+        
+        return self
+    
+    def update(self, rides_df):
+        """
+        Định giá một chunk với tất cả các cấu hình và cộng dồn kết quả
+        
+        Args:
+            rides_df: DataFrame với thông tin các chuyến xe
+        
+        Returns:
+            self
+        """
+        if len(rides_df) == 0:
+            return self
+        
+        if self.active_dimensions is None:
+            self.active_dimensions = [dim for dim in self.dimensions if dim in rides_df.columns]
+        
+        for name, pricing_system in self.policies.items():
+            results = pricing_system._price_batch(rides_df, include_insights=False,
+                                                  include_adjustments=True)
+            metrics = pd.DataFrame({
+                'rides': 1.0,
+                'revenue': results['optimal_price'],
+                'base_revenue': results['base_price'],
+                'model_revenue': results['model_price'],
+                'price_multiplier': results['price_multiplier'],
+                'surge_multiplier': results['surge_multiplier'],
+                'clamped_min': results['clamped_min'],
+                'clamped_max': results['clamped_max']
+            }, index=rides_df.index)
+            
+            self.totals[name] = self.totals[name] + metrics.sum().astype(float)
+            
+            for dim in self.active_dimensions:
+                chunk_totals = metrics.groupby(rides_df[dim]).sum().astype(float)
+                previous = self.grouped_totals[name].get(dim)
+                if previous is not None:
+                    chunk_totals = previous.add(chunk_totals, fill_value=0)
+                self.grouped_totals[name][dim] = chunk_totals
+        
+        return self
+    
+    def summary(self):
+        """
+        Kết quả tổng hợp trên toàn bộ dữ liệu cho mỗi cấu hình
+        
+        Returns:
+            DataFrame với mỗi dòng là một cấu hình
+        """
+        return pd.DataFrame({name: _finalize(totals) for name, totals in self.totals.items()}).T
+    
+    def report(self, dimension):
+        """
+        Kết quả theo một chiều, các cấu hình đặt cạnh nhau để so sánh
+        
+        Args:
+            dimension: Tên chiều (vd. 'hour', 'zone', 'vehicle_type')
+        
+        Returns:
+            DataFrame với cột MultiIndex (cấu hình, chỉ số)
+        """
+        if self.active_dimensions is None or dimension not in self.active_dimensions:
+            raise KeyError(f"Không có kết quả theo chiều '{dimension}'")
+        
+        return pd.concat({name: _finalize(grouped[dimension])
+                          for name, grouped in self.grouped_totals.items()}, axis=1)
+
+def iter_ride_chunks(source, chunk_size=100000):
+    """
+    Đọc dữ liệu chuyến xe theo từng chunk
+    
+    Args:
+        source: Đường dẫn file CSV/Parquet, DataFrame hoặc iterable các DataFrame
+        chunk_size: Số chuyến mỗi chunk
+    
+    Returns:
+        Generator các DataFrame
+    """
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_size):
+            yield source.iloc[start:start + chunk_size]
+    elif isinstance(source, (str, os.PathLike)):
+        if str(source).endswith('.parquet'):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise ImportError("Đọc file Parquet cần thư viện pyarrow (pip install pyarrow)") from e
+            
+            for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(source, chunksize=chunk_size)
+    else:
+        yield from source
+
+def _finalize(totals):
+    """
+    Chuyển các tổng đã cộng dồn thành chỉ số cuối cùng
+    
+    Args:
+        totals: Series (một nhóm) hoặc DataFrame (nhiều nhóm) các tổng
+    
+    Returns:
+        Series hoặc DataFrame các chỉ số
+    """
+    rides = totals['rides']
+    metrics = {
+        'rides': rides,
+        'revenue': totals['revenue'],
+        'revenue_vs_base_pct': (totals['revenue'] / totals['base_revenue'] - 1) * 100,
+        'avg_price': totals['revenue'] / rides,
+        'avg_model_price': totals['model_revenue'] / rides,
+        'avg_price_multiplier': totals['price_multiplier'] / rides,
+        'avg_surge_multiplier': totals['surge_multiplier'] / rides,
+        'clamp_min_rate': totals['clamped_min'] / rides,
+        'clamp_max_rate': totals['clamped_max'] / rides
+    }
+    
+    if isinstance(totals, pd.DataFrame):
+        return pd.DataFrame(metrics)
+    return pd.Series(metrics)
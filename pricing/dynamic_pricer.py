@@ -2,6 +2,11 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from utils.metrics import timed
+
+# Các quy tắc kinh doanh có thể áp dụng cho một chuyến (vị trí trong tuple là vị trí bit trong mask)
+PRICING_RULES = ('surge', 'weather', 'traffic', 'peak', 'loyal', 'frequent', 'clamped_min', 'clamped_max')
+
 class DynamicRidePricingSystem:
     """
     Hệ thống Dynamic Pricing cho ứng dụng đặt xe
@@ -19,6 +24,8 @@ class DynamicRidePricingSystem:
         """
         self.model = model
         self.preprocessor = preprocessor
+        # Bảng giá mô hình tính trước (PriceSurface), None để luôn dùng mô hình
+        self.price_surface = None
         self.price_constraints = {
             'min_multiplier': 0.8,  # Giảm giá tối đa 20%
             'max_multiplier': 2.0,  # Tăng giá tối đa 100%
@@ -40,15 +47,29 @@ class DynamicRidePricingSystem:
         Returns:
             Dict với giá tối ưu và thông tin chi tiết
         """
-        # Biến đổi dữ liệu
-        X = self.preprocessor.transform(ride_data)
-        
-        # Dự đoán giá cơ bản bằng mô hình ML
         base_price = ride_data['base_price'].values[0]
-        model_price = self.model.predict(X)[0]
+        
+        # Tra bảng giá tính trước nếu chuyến nằm trong lưới, không cần tiền xử lý và chạy mô hình
+        model_price = None
+        surface = getattr(self, 'price_surface', None)  # hệ thống lưu trước khi có bảng giá
+        if surface is not None:
+            with timed('surface_lookup'):
+                prices, in_grid = surface.lookup(ride_data)
+            if in_grid[0]:
+                model_price = prices[0]
+        
+        if model_price is None:
+            # Biến đổi dữ liệu
+            with timed('transform'):
+                X = self.preprocessor.transform(ride_data)
+            
+            # Dự đoán giá cơ bản bằng mô hình ML
+            with timed('predict'):
+                model_price = self.model.predict(X)[0]
         
         # Điều chỉnh giá theo các quy tắc kinh doanh
-        constrained_price, insights = self._apply_business_rules(ride_data)
+        with timed('business_rules'):
+            constrained_price, insights, applied_rules = self._apply_business_rules(ride_data)
         
         # Tính phần trăm thay đổi giá
         price_change = ((constrained_price - base_price) / base_price) * 100
@@ -61,34 +82,98 @@ class DynamicRidePricingSystem:
             'base_price': base_price,
             'model_price': model_price,
             'price_percent_change': price_change,
-            'insights': insights
+            'insights': insights,
+            'applied_rules': applied_rules
         }
     
-    def batch_price_rides(self, rides_df):
+    def batch_price_rides(self, rides_df, include_insights=True):
         """
-        Tính giá cho nhiều chuyến xe cùng lúc
+        Tính giá cho nhiều chuyến xe cùng lúc (véc-tơ hóa trên toàn bộ DataFrame)
         
         Args:
             rides_df: DataFrame với thông tin nhiều chuyến xe
+            include_insights: Có tạo insights cho từng chuyến hay không
+                (tắt đi khi chỉ cần giá cho các mẫu lớn)
             
         Returns:
             DataFrame với giá và insights cho mỗi chuyến
         """
-        results = []
+        results = pd.DataFrame({'ride_id': rides_df['ride_id'].to_numpy()})
+        for column, values in self._price_batch(rides_df, include_insights).items():
+            results[column] = values
+        
+        return results
+    
+    def batch_price_rides_parallel(self, rides_df, n_workers=None, shard_size=None, include_insights=False):
+        """
+        Tính giá cho rất nhiều chuyến xe bằng nhiều tiến trình
+        (dữ liệu đầu vào được đặt trong shared memory, kết quả giống hệt batch_price_rides)
+        
+        Args:
+            rides_df: DataFrame với thông tin nhiều chuyến xe
+            n_workers: Số tiến trình (mặc định bằng số CPU)
+            shard_size: Số chuyến mỗi phần (mặc định chia đều 4 phần cho mỗi tiến trình)
+            include_insights: Có tạo insights cho từng chuyến hay không
+            
+        Returns:
+            DataFrame với giá (và insights) cho mỗi chuyến, theo thứ tự của rides_df
+        """
+        from pricing.parallel import parallel_batch_price_rides
         
-        for i, row in rides_df.iterrows():
-            ride_data = pd.DataFrame([row])
-            price_result = self.get_ride_price(ride_data)
+        return parallel_batch_price_rides(self, rides_df, n_workers=n_workers, shard_size=shard_size,
+                                          include_insights=include_insights)
+    
+    def _price_batch(self, rides_df, include_insights=True, include_adjustments=False):
+        """
+        Tính giá véc-tơ hóa cho một DataFrame chuyến xe
+        
+        Args:
+            rides_df: DataFrame với thông tin các chuyến xe
+            include_insights: Có tạo insights cho từng chuyến hay không
+            include_adjustments: Có trả về hệ số điều chỉnh và cờ chạm giới hạn giá hay không
             
-            results.append({
-                'ride_id': row['ride_id'],
-                'base_price': price_result['base_price'],
-                'optimal_price': price_result['optimal_price'],
-                'price_percent_change': price_result['price_percent_change'],
-                'insights': price_result['insights']
+        Returns:
+            Dict tên cột kết quả -> mảng giá trị (theo thứ tự của rides_df)
+        """
+        surface = getattr(self, 'price_surface', None)
+        if surface is not None:
+            # Tra bảng cho các chuyến trong lưới, chỉ chạy mô hình cho các chuyến còn lại
+            with timed('batch_surface_predict'):
+                model_prices, _ = surface.predict(rides_df, self.model, self.preprocessor)
+        else:
+            # Biến đổi dữ liệu và dự đoán giá mô hình cho toàn bộ chuyến trong một lần gọi
+            with timed('batch_transform'):
+                X = self.preprocessor.transform(rides_df)
+            with timed('batch_predict'):
+                model_prices = self.model.predict(X)
+        
+        # Điều chỉnh giá theo các quy tắc kinh doanh
+        with timed('batch_business_rules'):
+            adjustments = self._compute_price_adjustments(rides_df)
+        base_prices = adjustments['base_price']
+        constrained_prices = adjustments['constrained_price']
+        
+        results = {
+            'base_price': base_prices,
+            'optimal_price': np.round(constrained_prices, -3),
+            'model_price': model_prices,
+            'price_percent_change': ((constrained_prices - base_prices) / base_prices) * 100
+        }
+        
+        if include_adjustments:
+            results.update({
+                'price_multiplier': constrained_prices / base_prices,
+                'surge_multiplier': adjustments['surge_multiplier'],
+                'clamped_min': adjustments['clamped_min'],
+                'clamped_max': adjustments['clamped_max']
             })
         
-        return pd.DataFrame(results)
+        if include_insights:
+            with timed('batch_insights'):
+                results['insights'] = [self._build_insights(adjustments, i)
+                                       for i in range(len(rides_df))]
+        
+        return results
     
     def _apply_business_rules(self, ride_data):
         """
@@ -98,67 +183,142 @@ class DynamicRidePricingSystem:
             ride_data: DataFrame với thông tin chuyến xe (1 dòng)
             
         Returns:
-            Tuple (giá sau điều chỉnh, danh sách insights)
+            Tuple (giá sau điều chỉnh, danh sách insights, mask các quy tắc đã áp dụng)
         """
-        data = ride_data.iloc[0]
-        base_price = data['base_price']
-        constrained_price = base_price
-        insights = []
-        reasons = []
+        adjustments = self._compute_price_adjustments(ride_data.iloc[[0]])
         
-        # 1. Yếu tố cung-cầu
-        demand = data['area_demand']
-        drivers = data['available_drivers']
-        demand_supply_ratio = demand / max(drivers, 1)
+        return (adjustments['constrained_price'][0], self._build_insights(adjustments, 0),
+                int(rule_mask(adjustments)[0]))
+    
+    def _compute_price_adjustments(self, rides_df):
+        """
+        Tính các hệ số điều chỉnh giá theo quy tắc kinh doanh cho nhiều chuyến xe
+        bằng các phép toán véc-tơ trên numpy
+        
+        Args:
+            rides_df: DataFrame với thông tin các chuyến xe
+            
+        Returns:
+            Dict các mảng numpy: dữ liệu đầu vào của quy tắc, hệ số của từng quy tắc,
+            giá trước/sau khi giới hạn
+        """
+        base_price = rides_df['base_price'].to_numpy()
+        demand = rides_df['area_demand'].to_numpy()
+        drivers = rides_df['available_drivers'].to_numpy()
+        weather = rides_df['weather_condition'].to_numpy()
+        traffic = rides_df['traffic_level'].to_numpy()
+        previous_rides = rides_df['user_previous_rides'].to_numpy()
+        user_rating = rides_df['user_rating'].to_numpy()
+        vehicle_type = rides_df['vehicle_type'].to_numpy()
+        if 'hour' in rides_df:
+            hour = rides_df['hour'].to_numpy()
+        else:
+            hour = np.full(len(rides_df), datetime.now().hour)
         
-        if demand_supply_ratio > 2:  # Nhu cầu gấp đôi số tài xế
-            surge_multiplier = min(1.5, 1 + (demand_supply_ratio - 2) * 0.1)
-            constrained_price *= surge_multiplier
-            reasons.append(f"Nhu cầu cao ({demand}) và ít tài xế ({drivers}), dẫn đến tăng giá.")
+        constrained_price = base_price.astype(float)
+        
+        # 1. Yếu tố cung-cầu
+        demand_supply_ratio = demand / np.maximum(drivers, 1)
+        is_surge = demand_supply_ratio > 2  # Nhu cầu gấp đôi số tài xế
+        surge_multiplier = np.where(
+            is_surge, np.minimum(1.5, 1 + (demand_supply_ratio - 2) * 0.1), 1.0)
+        constrained_price = constrained_price * surge_multiplier
         
         # 2. Điều kiện thời tiết
-        weather = data['weather_condition']
-        if weather == 1:  # Mưa
-            constrained_price *= 1.1
-            reasons.append("Thời tiết mưa làm tăng giá do điều kiện đi lại khó khăn.")
-        elif weather == 2:  # Mưa to
-            constrained_price *= 1.2
-            reasons.append("Thời tiết mưa to làm tăng giá đáng kể do rủi ro và khó khăn trong di chuyển.")
+        weather_multiplier = np.select([weather == 1, weather == 2], [1.1, 1.2], 1.0)  # Mưa / mưa to
+        constrained_price = constrained_price * weather_multiplier
         
         # 3. Tắc nghẽn giao thông
-        traffic = data['traffic_level']
-        if traffic > 7:  # Tắc nghẽn cao
-            constrained_price *= 1 + (traffic - 7) * 0.03
-            reasons.append(f"Tắc nghẽn giao thông cao (mức {traffic}/10) làm tăng giá.")
+        is_congested = traffic > 7  # Tắc nghẽn cao
+        traffic_multiplier = np.where(is_congested, 1 + (traffic - 7) * 0.03, 1.0)
+        constrained_price = constrained_price * traffic_multiplier
         
         # 4. Giờ cao điểm
-        hour = data.get('hour', datetime.now().hour)
-        if (hour >= 7 and hour <= 9) or (hour >= 17 and hour <= 19):
-            constrained_price *= 1.15
-            reasons.append(f"Đặt xe trong giờ cao điểm ({hour}h) làm tăng giá.")
+        is_peak = ((hour >= 7) & (hour <= 9)) | ((hour >= 17) & (hour <= 19))
+        peak_multiplier = np.where(is_peak, 1.15, 1.0)
+        constrained_price = constrained_price * peak_multiplier
         
         # 5. Chiết khấu cho người dùng thường xuyên
-        previous_rides = data['user_previous_rides']
-        user_rating = data['user_rating']
-        
-        if previous_rides > 50 and user_rating >= 4.5:
-            constrained_price *= 0.95  # Giảm 5% cho người dùng trung thành
-            reasons.append(f"Giảm giá 5% cho người dùng trung thành (>50 chuyến, đánh giá ≥4.5).")
-        elif previous_rides > 20:
-            constrained_price *= 0.98  # Giảm 2% cho người dùng thường xuyên
-            reasons.append(f"Giảm giá 2% cho người dùng thường xuyên ({previous_rides} chuyến).")
+        is_loyal = (previous_rides > 50) & (user_rating >= 4.5)
+        is_frequent = ~is_loyal & (previous_rides > 20)
+        loyalty_multiplier = np.select([is_loyal, is_frequent], [0.95, 0.98], 1.0)
+        constrained_price = constrained_price * loyalty_multiplier
         
         # 6. Đảm bảo giá nằm trong giới hạn
-        min_price = self.price_constraints['min_price'][data['vehicle_type']]
+        min_price = pd.Series(vehicle_type).map(self.price_constraints['min_price']).to_numpy()
+        if np.isnan(min_price).any():
+            unknown = vehicle_type[np.isnan(min_price)][0]
+            raise KeyError(unknown)
         min_allowed = base_price * self.price_constraints['min_multiplier']
         max_allowed = base_price * self.price_constraints['max_multiplier']
         
-        constrained_price = max(constrained_price, min_price)
-        constrained_price = max(constrained_price, min_allowed)
-        constrained_price = min(constrained_price, max_allowed)
+        unclamped_price = constrained_price
+        constrained_price = np.maximum(constrained_price, min_price)
+        constrained_price = np.maximum(constrained_price, min_allowed)
+        constrained_price = np.minimum(constrained_price, max_allowed)
+        
+        return {
+            'base_price': base_price,
+            'area_demand': demand,
+            'available_drivers': drivers,
+            'traffic_level': traffic,
+            'hour': hour,
+            'user_previous_rides': previous_rides,
+            'weather_condition': weather,
+            'is_surge': is_surge,
+            'is_congested': is_congested,
+            'is_peak': is_peak,
+            'surge_multiplier': surge_multiplier,
+            'weather_multiplier': weather_multiplier,
+            'traffic_multiplier': traffic_multiplier,
+            'peak_multiplier': peak_multiplier,
+            'loyalty_multiplier': loyalty_multiplier,
+            'is_loyal': is_loyal,
+            'is_frequent': is_frequent,
+            'unclamped_price': unclamped_price,
+            'constrained_price': constrained_price,
+            'clamped_min': constrained_price > unclamped_price,
+            'clamped_max': constrained_price < unclamped_price
+        }
+    
+    def _build_insights(self, adjustments, i):
+        """
+        Tạo insights cho chuyến xe thứ i từ kết quả của _compute_price_adjustments
+        
+        Args:
+            adjustments: Dict các mảng điều chỉnh giá
+            i: Vị trí của chuyến xe
+            
+        Returns:
+            Danh sách insights
+        """
+        insights = []
+        reasons = []
+        
+        if adjustments['is_surge'][i]:
+            reasons.append(f"Nhu cầu cao ({adjustments['area_demand'][i]}) và ít tài xế "
+                           f"({adjustments['available_drivers'][i]}), dẫn đến tăng giá.")
+        
+        weather = adjustments['weather_condition'][i]
+        if weather == 1:
+            reasons.append("Thời tiết mưa làm tăng giá do điều kiện đi lại khó khăn.")
+        elif weather == 2:
+            reasons.append("Thời tiết mưa to làm tăng giá đáng kể do rủi ro và khó khăn trong di chuyển.")
+        
+        if adjustments['is_congested'][i]:
+            reasons.append(f"Tắc nghẽn giao thông cao (mức {adjustments['traffic_level'][i]}/10) làm tăng giá.")
+        
+        if adjustments['is_peak'][i]:
+            reasons.append(f"Đặt xe trong giờ cao điểm ({adjustments['hour'][i]}h) làm tăng giá.")
+        
+        if adjustments['is_loyal'][i]:
+            reasons.append(f"Giảm giá 5% cho người dùng trung thành (>50 chuyến, đánh giá ≥4.5).")
+        elif adjustments['is_frequent'][i]:
+            reasons.append(f"Giảm giá 2% cho người dùng thường xuyên ({adjustments['user_previous_rides'][i]} chuyến).")
         
         # Tạo insights tổng quát
-        price_change = ((constrained_price - base_price) / base_price) * 100
+        base_price = adjustments['base_price'][i]
+        price_change = ((adjustments['constrained_price'][i] - base_price) / base_price) * 100
         
         if price_change > 0:
             insights.append(f"Giá tăng {abs(price_change):.1f}% so với giá cơ bản do nhu cầu cao hoặc điều kiện bất lợi.")
@@ -170,4 +330,43 @@ class DynamicRidePricingSystem:
         # Thêm các lý do cụ thể
         insights.extend(reasons)
         
-        return constrained_price, insights
+        return insights
+
+def rule_mask(adjustments):
+    """
+    Mã hóa các quy tắc kinh doanh đã áp dụng cho từng chuyến thành mask bit (theo PRICING_RULES)
+    
+    Args:
+        adjustments: Dict các mảng điều chỉnh giá từ _compute_price_adjustments
+    
+    Returns:
+        Mảng số nguyên, bit thứ k bật nếu quy tắc PRICING_RULES[k] được áp dụng
+    """
+    flags = [
+        adjustments['is_surge'],
+        adjustments['weather_multiplier'] != 1.0,
+        adjustments['is_congested'],
+        adjustments['is_peak'],
+        adjustments['is_loyal'],
+        adjustments['is_frequent'],
+        adjustments['clamped_min'],
+        adjustments['clamped_max']
+    ]
+    
+    mask = np.zeros(len(adjustments['base_price']), dtype=np.int64)
+    for bit, flag in enumerate(flags):
+        mask |= np.asarray(flag, dtype=np.int64) << bit
+    
+    return mask
+
+def decode_rules(mask):
+    """
+    Giải mã mask quy tắc thành danh sách tên quy tắc
+    
+    Args:
+        mask: Số nguyên mask (từ rule_mask)
+    
+    Returns:
+        Danh sách tên quy tắc theo thứ tự PRICING_RULES
+    """
+    return [rule for bit, rule in enumerate(PRICING_RULES) if mask >> bit & 1]
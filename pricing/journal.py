@@ -0,0 +1,383 @@
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+from utils.metrics import Counter
+
+# Độ dài tối đa (byte UTF-8) của mã chuyến và tên khu vực; giá trị dài hơn bị từ chối thay vì bị cắt
+MAX_RIDE_ID_BYTES = 64
+MAX_REGION_BYTES = 32
+
+# Bố cục nhị phân của một bản ghi báo giá (kích thước cố định, không có padding)
+# Mọi đầu vào số được lưu dạng float64 để đọc lại đúng giá trị đã dùng khi tính giá
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('ride_id', f'S{MAX_RIDE_ID_BYTES}'),
+    ('region', f'S{MAX_REGION_BYTES}'),
+    ('distance_km', '<f8'),
+    ('duration_min', '<f8'),
+    ('hour', '<f8'),
+    ('day_of_week', '<f8'),
+    ('is_weekend', '<f8'),
+    ('month', '<f8'),
+    ('weather_condition', '<f8'),
+    ('traffic_level', '<f8'),
+    ('vehicle_type', '<f8'),
+    ('available_drivers', '<f8'),
+    ('area_demand', '<f8'),
+    ('user_rating', '<f8'),
+    ('user_previous_rides', '<f8'),
+    ('base_price', '<f8'),
+    ('model_price', '<f8'),
+    ('optimal_price', '<f8'),
+    ('price_percent_change', '<f8'),
+    ('applied_rules', '<u2')
+])
+
+# Các cột đầu vào được lấy từ DataFrame chuyến xe (theo thứ tự trong RECORD_DTYPE)
+INPUT_COLUMNS = ['distance_km', 'duration_min', 'hour', 'day_of_week', 'is_weekend', 'month',
+                 'weather_condition', 'traffic_level', 'vehicle_type', 'available_drivers',
+                 'area_demand', 'user_rating', 'user_previous_rides', 'base_price']
+
+# Header của mỗi segment: magic, phiên bản, kích thước bản ghi (đệm đến HEADER_SIZE byte)
+MAGIC = b'QJOURNAL'
+VERSION = 2
+HEADER_SIZE = 64
+
+SEGMENT_PREFIX = 'quotes-'
+SEGMENT_SUFFIX = '.qj'
+
+class QuoteJournal:
+    """
+    Nhật ký báo giá chỉ ghi thêm (append-only) cho mục đích kiểm toán
+    - Request chỉ đưa bản ghi vào hàng đợi có giới hạn, không chờ I/O đĩa
+    - Đầu vào số được lưu dạng float64; mã chuyến/khu vực quá dài bị từ chối (ValueError)
+      trước khi vào hàng đợi để bản ghi luôn đọc lại đúng những gì đã báo giá
+    - Một luồng nền ghi theo lô các bản ghi kích thước cố định vào file segment nhị phân,
+      fsync định kỳ và chuyển sang segment mới khi segment hiện tại đạt kích thước tối đa
+    - Bộ nhớ bị chặn bởi max_pending bản ghi đang chờ; khi đĩa chậm và hàng đợi đầy,
+      request chờ tối đa put_timeout giây, quá thời gian thì bản ghi bị bỏ qua, được đếm
+      trong 'dropped' và record() trả về False để nơi gọi xử lý
+    """
+    def __init__(self, directory, max_pending=100000, batch_size=4096, flush_interval=0.5,
+                 fsync_interval=1.0, segment_bytes=64 * 1024 ** 2, put_timeout=0.1):
+        """
+        Khởi tạo nhật ký và bắt đầu luồng ghi
+        
+        Args:
+            directory: Thư mục chứa các segment
+            max_pending: Số bản ghi tối đa đang chờ ghi (giới hạn bộ nhớ; mỗi bản ghi đang chờ
+                chiếm khoảng 400 byte, tức khoảng 40 MB với giá trị mặc định)
+            batch_size: Số bản ghi tối đa mỗi lần ghi
+            flush_interval: Thời gian tối đa một bản ghi nằm trong hàng đợi trước khi được ghi (giây)
+            fsync_interval: Khoảng thời gian giữa hai lần fsync (giây)
+            segment_bytes: Kích thước tối đa của một segment (byte)
+            put_timeout: Thời gian chờ tối đa khi hàng đợi đầy (giây)
+        """
+        self.directory = directory
+        self.put_timeout = put_timeout
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = max(segment_bytes, HEADER_SIZE + RECORD_DTYPE.itemsize)
+        
+        os.makedirs(directory, exist_ok=True)
+        
+        self._queue = queue.Queue(maxsize=max_pending)
+        # Bộ đếm không khóa vì được cập nhật trên đường xử lý request
+        self._enqueued = Counter()
+        self._dropped = Counter()
+        self._positions = {}
+        
+        # Chỉ luồng ghi cập nhật các giá trị dưới đây
+        self.written = 0
+        self.bytes_written = 0
+        self.segments = 0
+        self.fsyncs = 0
+        self.errors = 0
+        
+        # Luôn mở segment mới, không ghi tiếp vào segment cũ có thể bị cắt dở
+        existing = list_segments(directory)
+        self._next_sequence = _segment_sequence(existing[-1]) + 1 if existing else 1
+        self._file = None
+        self._file_size = 0
+        self._last_fsync = time.monotonic()
+        
+        self._writer = threading.Thread(target=self._run_writer, name='quote-journal', daemon=True)
+        self._writer.start()
+    
+    def record(self, ride_data, price_result, region=None):
+        """
+        Đưa một báo giá vào hàng đợi ghi (chỉ chờ khi hàng đợi đầy, tối đa put_timeout giây)
+        
+        Args:
+            ride_data: DataFrame một dòng đã dùng để tính giá
+            price_result: Kết quả của get_ride_price
+            region: Khu vực của hệ thống định giá (None nếu dùng hệ thống chung)
+        
+        Returns:
+            True nếu được đưa vào hàng đợi, False nếu bị bỏ qua do hàng đợi vẫn đầy sau put_timeout
+        
+        Raises:
+            ValueError: Mã chuyến hoặc khu vực quá dài, hoặc đầu vào không phải số
+        """
+        # Lấy cả dòng một lần (nhanh hơn nhiều so với truy cập từng cột của DataFrame)
+        row = ride_data.to_numpy(dtype=object)[0]
+        positions = self._column_positions(ride_data.columns)
+        
+        try:
+            inputs = tuple(float(value) for value in row[positions[1:]])
+        except (TypeError, ValueError):
+            raise ValueError("Đầu vào của báo giá phải là số")
+        
+        item = (time.time(), check_identifier(row[positions[0]], MAX_RIDE_ID_BYTES, 'ride_id'),
+                check_identifier(region or '', MAX_REGION_BYTES, 'region'), inputs,
+                price_result['model_price'], price_result['optimal_price'],
+                price_result['price_percent_change'], price_result.get('applied_rules', 0))
+        
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            self._dropped.inc()
+            return False
+        
+        self._enqueued.inc()
+        return True
+    
+    def _column_positions(self, columns):
+        """Vị trí của ride_id và các cột đầu vào (được cache theo danh sách cột)"""
+        key = tuple(columns)
+        positions = self._positions.get(key)
+        if positions is None:
+            positions = columns.get_indexer(['ride_id'] + INPUT_COLUMNS)
+            if (positions < 0).any():
+                missing = [column for column, position in zip(['ride_id'] + INPUT_COLUMNS, positions)
+                           if position < 0]
+                raise KeyError(f"Thiếu cột {missing}")
+            self._positions[key] = positions
+        return positions
+    
+    def stats(self):
+        """
+        Thống kê của nhật ký
+        
+        Returns:
+            Dict với số bản ghi đã nhận/bỏ qua/đang chờ/đã ghi, số byte, segment, fsync và lỗi
+        """
+        return {
+            'directory': self.directory,
+            'enqueued': self._enqueued.value(),
+            'dropped': self._dropped.value(),
+            'pending': self._queue.qsize(),
+            'written': self.written,
+            'bytes_written': self.bytes_written,
+            'segments': self.segments,
+            'fsyncs': self.fsyncs,
+            'errors': self.errors
+        }
+    
+    def close(self, timeout=None):
+        """
+        Ghi hết các bản ghi đang chờ, fsync và đóng segment hiện tại
+        
+        Args:
+            timeout: Thời gian chờ tối đa (giây)
+        """
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
+    
+    def _run_writer(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            
+            while batch and len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = bool(batch) and batch[-1] is None
+            items = [item for item in batch if item is not None]
+            
+            try:
+                if items:
+                    records, n_invalid = _to_records(items)
+                    self.errors += n_invalid
+                    self._write(records)
+                if self._file is not None and time.monotonic() - self._last_fsync >= self.fsync_interval:
+                    self._fsync()
+            except Exception as e:
+                # Không thể chặn request khi đĩa lỗi: bỏ lô hiện tại, lô sau được ghi vào segment mới
+                self.errors += 1
+                print(f"Lỗi khi ghi nhật ký báo giá: {e}")
+                try:
+                    self._close_segment()
+                except Exception:
+                    self._file = None
+            
+            if stop:
+                self._close_segment()
+                return
+    
+    def _write(self, records):
+        data = records.tobytes()
+        # Chỉ chuyển segment ở ranh giới bản ghi để segment luôn chứa số bản ghi nguyên
+        per_segment = (self.segment_bytes - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        start = 0
+        while start < len(records):
+            if self._file is None or self._file_size + RECORD_DTYPE.itemsize > self.segment_bytes:
+                self._open_segment()
+            room = per_segment - (self._file_size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+            stop = min(len(records), start + room)
+            chunk = data[start * RECORD_DTYPE.itemsize:stop * RECORD_DTYPE.itemsize]
+            self._file.write(chunk)
+            self._file_size += len(chunk)
+            self.bytes_written += len(chunk)
+            self.written += stop - start
+            start = stop
+        self._file.flush()
+    
+    def _open_segment(self):
+        self._close_segment()
+        
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{self._next_sequence:08d}{SEGMENT_SUFFIX}")
+        self._next_sequence += 1
+        
+        self._file = open(path, 'xb')
+        header = MAGIC + struct.pack('<II', VERSION, RECORD_DTYPE.itemsize)
+        self._file.write(header.ljust(HEADER_SIZE, b'\0'))
+        self._file_size = HEADER_SIZE
+        self.bytes_written += HEADER_SIZE
+        self.segments += 1
+    
+    def _close_segment(self):
+        if self._file is None:
+            return
+        try:
+            self._fsync()
+            self._file.close()
+        finally:
+            self._file = None
+    
+    def _fsync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsyncs += 1
+        self._last_fsync = time.monotonic()
+
+def list_segments(directory):
+    """
+    Các file segment trong thư mục theo thứ tự ghi
+    
+    Args:
+        directory: Thư mục nhật ký
+    
+    Returns:
+        Danh sách đường dẫn
+    """
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)]
+
+def open_segment(path):
+    """
+    Ánh xạ một segment vào bộ nhớ (memory-map) để đọc mà không nạp toàn bộ file
+    
+    Args:
+        path: Đường dẫn segment
+    
+    Returns:
+        Mảng numpy (memmap, chỉ đọc) các bản ghi theo RECORD_DTYPE
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or not header.startswith(MAGIC):
+        raise ValueError(f"File không phải segment nhật ký báo giá: '{path}'")
+    version, record_size = struct.unpack('<II', header[len(MAGIC):len(MAGIC) + 8])
+    if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"Phiên bản segment không được hỗ trợ: '{path}'")
+    
+    # Bỏ qua bản ghi cuối bị ghi dở (nếu tiến trình dừng giữa chừng)
+    n_records = (os.path.getsize(path) - HEADER_SIZE) // record_size
+    if n_records == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(n_records,))
+
+def replay_journal(directory, chunk_size=100000):
+    """
+    Đọc lại các báo giá đã ghi theo từng chunk DataFrame (dùng được với PricingBacktester.run)
+    
+    Args:
+        directory: Thư mục nhật ký
+        chunk_size: Số bản ghi mỗi chunk
+    
+    Returns:
+        Generator các DataFrame với các cột của chuyến xe, booking_time (UTC) và kết quả báo giá
+    """
+    import pandas as pd
+    
+    for path in list_segments(directory):
+        records = open_segment(path)
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            df = pd.DataFrame({name: chunk[name] for name in RECORD_DTYPE.names})
+            df['ride_id'] = df['ride_id'].str.decode('utf-8', errors='replace')
+            df['region'] = df['region'].str.decode('utf-8', errors='replace')
+            df['booking_time'] = pd.to_datetime(df['timestamp'], unit='s')
+            yield df
+
+def _to_records(items):
+    """
+    Chuyển các bản ghi trong hàng đợi thành mảng có cấu trúc theo RECORD_DTYPE
+    
+    Returns:
+        Tuple (mảng bản ghi, số bản ghi không chuyển được do giá trị nằm ngoài kiểu dữ liệu)
+    """
+    rows = [(timestamp, ride_id, region, *inputs, *results)
+            for timestamp, ride_id, region, inputs, *results in items]
+    try:
+        return np.array(rows, dtype=RECORD_DTYPE), 0
+    except (TypeError, ValueError, OverflowError):
+        # Chuyển từng bản ghi để chỉ bỏ những bản ghi lỗi
+        records = []
+        for row in rows:
+            try:
+                records.append(np.array([row], dtype=RECORD_DTYPE))
+            except (TypeError, ValueError, OverflowError):
+                pass
+        if not records:
+            return np.zeros(0, dtype=RECORD_DTYPE), len(rows)
+        return np.concatenate(records), len(rows) - len(records)
+
+def check_identifier(value, max_bytes, name):
+    """
+    Mã hóa UTF-8 một mã chuyến/tên khu vực để ghi vào nhật ký
+    
+    Args:
+        value: Giá trị cần ghi
+        max_bytes: Độ dài tối đa (byte)
+        name: Tên trường (cho thông báo lỗi)
+    
+    Returns:
+        Bytes đã mã hóa
+    
+    Raises:
+        ValueError: Giá trị dài hơn max_bytes byte
+    """
+    encoded = str(value).encode('utf-8')
+    if len(encoded) > max_bytes:
+        raise ValueError(f"{name} dài tối đa {max_bytes} byte")
+    return encoded
+
+def _segment_sequence(path):
+    name = os.path.basename(path)
+    return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
@@ -0,0 +1,213 @@
+import math
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Các cột kết quả dạng số được tiến trình con ghi thẳng vào shared memory
+OUTPUT_COLUMNS = ['optimal_price', 'model_price', 'price_percent_change']
+
+# Trạng thái của mỗi tiến trình con (khởi tạo một lần trong _init_worker)
+_worker = {}
+
+def parallel_batch_price_rides(pricing_system, rides_df, n_workers=None, shard_size=None,
+                               include_insights=False):
+    """
+    Tính giá cho nhiều chuyến xe bằng một pool tiến trình
+    
+    Các cột số của rides_df được sao chép một lần vào shared memory; mỗi tiến trình
+    con tải hệ thống định giá một lần khi khởi tạo, đọc phần dữ liệu của mình trực tiếp
+    từ shared memory và ghi kết quả vào các mảng kết quả dùng chung, nên dữ liệu chuyến
+    xe không bị pickle qua lại giữa các tiến trình.
+    
+    Args:
+        pricing_system: DynamicRidePricingSystem
+        rides_df: DataFrame với thông tin nhiều chuyến xe
+        n_workers: Số tiến trình (mặc định bằng số CPU)
+        shard_size: Số chuyến mỗi phần
+        include_insights: Có tạo insights cho từng chuyến hay không
+    
+    Returns:
+        DataFrame kết quả theo thứ tự của rides_df (giống hệt batch_price_rides)
+    """
+    n_rows = len(rides_df)
+    n_workers = n_workers or os.cpu_count() or 1
+    if shard_size is None:
+        shard_size = max(1, math.ceil(n_rows / (n_workers * 4)))
+    
+    # Cột không phải số (ride_id, booking_time) không cần cho việc định giá
+    input_columns = [column for column in rides_df.columns
+                     if pd.api.types.is_numeric_dtype(rides_df[column])]
+    
+    blocks = []
+    try:
+        input_specs = {}
+        for column in input_columns:
+            values = rides_df[column].to_numpy()
+            block, array = _create_shared_array(values.dtype, n_rows)
+            blocks.append(block)
+            array[:] = values
+            input_specs[column] = (block.name, values.dtype.str)
+        
+        output_specs = {}
+        outputs = {}
+        for column in OUTPUT_COLUMNS:
+            block, array = _create_shared_array(np.dtype(np.float64), n_rows)
+            blocks.append(block)
+            output_specs[column] = (block.name, array.dtype.str)
+            outputs[column] = array
+        
+        shards = [(start, min(start + shard_size, n_rows)) for start in range(0, n_rows, shard_size)]
+        insights = [None] * n_rows
+        
+        with multiprocessing.Pool(n_workers, initializer=_init_worker,
+                                  initargs=(pricing_system, input_specs, output_specs, n_rows)) as pool:
+            for start, shard_insights in pool.imap_unordered(
+                    _price_shard, [(start, stop, include_insights) for start, stop in shards]):
+                if shard_insights is not None:
+                    insights[start:start + len(shard_insights)] = shard_insights
+        
+        # Ghép kết quả theo đúng thứ tự ban đầu
+        results = pd.DataFrame({
+            'ride_id': rides_df['ride_id'].to_numpy(),
+            'base_price': rides_df['base_price'].to_numpy()
+        })
+        for column in OUTPUT_COLUMNS:
+            results[column] = outputs[column].copy()
+        if include_insights:
+            results['insights'] = insights
+        
+        return results
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+def measure_parallel_scaling(pricing_system, rides_df, worker_counts=(1, 2, 4, 8), shard_size=None):
+    """
+    Đo thời gian và hiệu suất mở rộng của chế độ định giá song song
+    
+    Args:
+        pricing_system: DynamicRidePricingSystem
+        rides_df: DataFrame với thông tin các chuyến xe
+        worker_counts: Các số tiến trình cần đo
+        shard_size: Số chuyến mỗi phần
+    
+    Returns:
+        List dict kết quả cho mỗi số tiến trình (đo cả chế độ một tiến trình làm mốc)
+    """
+    start = time.perf_counter()
+    expected = pricing_system.batch_price_rides(rides_df, include_insights=False)
+    single_process_seconds = time.perf_counter() - start
+    
+    report = [{
+        'n_workers': 0,
+        'seconds': single_process_seconds,
+        'rides_per_sec': len(rides_df) / single_process_seconds,
+        'speedup': 1.0,
+        'efficiency': 1.0,
+        'identical': True
+    }]
+    
+    base_workers, base_seconds = None, None
+    for n_workers in worker_counts:
+        start = time.perf_counter()
+        results = parallel_batch_price_rides(pricing_system, rides_df, n_workers=n_workers,
+                                             shard_size=shard_size)
+        seconds = time.perf_counter() - start
+        
+        # Hiệu suất mở rộng được tính so với số tiến trình nhỏ nhất được đo (thường là 1)
+        if base_seconds is None:
+            base_workers, base_seconds = n_workers, seconds
+        speedup = base_seconds / seconds
+        
+        report.append({
+            'n_workers': n_workers,
+            'seconds': seconds,
+            'rides_per_sec': len(rides_df) / seconds,
+            'speedup': speedup,
+            'efficiency': speedup * base_workers / n_workers,
+            'identical': bool(results.equals(expected))
+        })
+    
+    return report
+
+def _create_shared_array(dtype, n_rows):
+    """
+    Tạo một khối shared memory và mảng numpy trỏ vào khối đó
+    
+    Args:
+        dtype: Kiểu dữ liệu của mảng
+        n_rows: Số phần tử
+    
+    Returns:
+        Tuple (SharedMemory, mảng numpy)
+    """
+    # SharedMemory không cho phép kích thước 0
+    block = shared_memory.SharedMemory(create=True, size=max(1, n_rows * dtype.itemsize))
+    array = np.ndarray((n_rows,), dtype=dtype, buffer=block.buf)
+    
+    return block, array
+
+def _attach_shared_array(name, dtype, n_rows):
+    """
+    Gắn vào khối shared memory do tiến trình cha tạo
+    
+    Args:
+        name: Tên khối shared memory
+        dtype: Kiểu dữ liệu của mảng (chuỗi dtype của numpy)
+        n_rows: Số phần tử
+    
+    Returns:
+        Tuple (SharedMemory, mảng numpy)
+    """
+    # Tiến trình con dùng chung resource tracker với tiến trình cha,
+    # khối được tiến trình cha unlink sau khi pool kết thúc
+    block = shared_memory.SharedMemory(name=name)
+    
+    return block, np.ndarray((n_rows,), dtype=np.dtype(dtype), buffer=block.buf)
+
+def _init_worker(pricing_system, input_specs, output_specs, n_rows):
+    """
+    Khởi tạo tiến trình con: nhận hệ thống định giá và gắn vào các mảng dùng chung
+    """
+    blocks = []
+    inputs = {}
+    for column, (name, dtype) in input_specs.items():
+        block, inputs[column] = _attach_shared_array(name, dtype, n_rows)
+        blocks.append(block)
+    
+    outputs = {}
+    for column, (name, dtype) in output_specs.items():
+        block, outputs[column] = _attach_shared_array(name, dtype, n_rows)
+        blocks.append(block)
+    
+    _worker.update({
+        'pricing_system': pricing_system,
+        'blocks': blocks,
+        'inputs': inputs,
+        'outputs': outputs
+    })
+
+def _price_shard(task):
+    """
+    Tính giá cho một phần dữ liệu trong tiến trình con
+    
+    Args:
+        task: Tuple (vị trí bắt đầu, vị trí kết thúc, có tạo insights hay không)
+    
+    Returns:
+        Tuple (vị trí bắt đầu, danh sách insights hoặc None)
+    """
+    start, stop, include_insights = task
+    
+    shard = pd.DataFrame({column: values[start:stop] for column, values in _worker['inputs'].items()})
+    results = _worker['pricing_system']._price_batch(shard, include_insights=include_insights)
+    
+    for column, values in _worker['outputs'].items():
+        values[start:stop] = results[column]
+    
+    return start, results.get('insights')
@@ -0,0 +1,196 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# Lưới mặc định: khoảng cách dưới 30 km (bước 0.1 km như dữ liệu), 4 loại xe, 3 kiểu thời tiết, tắc nghẽn 0-10
+DEFAULT_GRID = {
+    'distance_km': np.round(np.arange(0, 301) * 0.1, 1),
+    'vehicle_type': np.arange(4),
+    'weather_condition': np.arange(3),
+    'traffic_level': np.arange(11)
+}
+
+# Các trục liên tục được nội suy tuyến tính; các trục còn lại phải khớp đúng một giá trị của lưới
+CONTINUOUS_AXES = ('distance_km', 'traffic_level')
+
+# Giá trị tham chiếu của các đặc trưng không thuộc lưới khi không có dữ liệu để tính
+DEFAULT_REFERENCE = {
+    'minutes_per_km': 2.4,  # Tốc độ trung bình 25 km/h, thời gian đi được suy ra từ khoảng cách
+    'hour': 14,
+    'day_of_week': 2,
+    'is_weekend': 0,
+    'month': 1,
+    'available_drivers': 20,
+    'area_demand': 50,
+    'user_rating': 4.5,
+    'user_previous_rides': 14
+}
+
+def reference_from_rides(rides_df):
+    """
+    Giá trị tham chiếu của các đặc trưng không thuộc lưới, lấy trung vị trên dữ liệu chuyến xe
+    
+    Args:
+        rides_df: DataFrame dữ liệu chuyến xe (vd. tập huấn luyện)
+    
+    Returns:
+        Dict tên đặc trưng -> giá trị, cùng minutes_per_km để suy ra duration_min từ khoảng cách
+    """
+    reference = {column: rides_df[column].median().item()
+                 for column in DEFAULT_REFERENCE if column in rides_df}
+    moving = rides_df['distance_km'] > 0
+    reference['minutes_per_km'] = float(rides_df.loc[moving, 'duration_min'].sum()
+                                        / rides_df.loc[moving, 'distance_km'].sum())
+    return {**DEFAULT_REFERENCE, **reference}
+
+class PriceSurface:
+    """
+    Bảng giá mô hình tính trước trên lưới đặc trưng thường gặp
+    - Giá tại mỗi điểm lưới được tính bằng mô hình thật một lần sau khi huấn luyện,
+      các đặc trưng ngoài lưới lấy giá trị tham chiếu (duration_min suy ra từ khoảng cách)
+    - Khi phục vụ, giá mô hình là tra bảng cộng nội suy tuyến tính trên các trục liên tục,
+      không cần tiền xử lý hay chạy mô hình
+    - Chuyến nằm ngoài lưới (hoặc có giá trị phân loại không thuộc lưới) dùng mô hình thật
+    - Được lưu cùng hệ thống định giá nên không phải tính lại khi khởi động
+    """
+    def __init__(self, axes, values, reference):
+        """
+        Args:
+            axes: Dict tên trục -> mảng giá trị tăng dần của lưới
+            values: Mảng giá mô hình có số chiều bằng số trục (theo thứ tự của axes)
+            reference: Giá trị tham chiếu của các đặc trưng ngoài lưới
+        """
+        self.axes = {name: np.asarray(points, dtype=float) for name, points in axes.items()}
+        self.values = values
+        self.reference = dict(reference)
+    
+    @classmethod
+    def build(cls, model, preprocessor, grid=None, reference=None):
+        """
+        Tính bảng giá bằng mô hình thật trên toàn bộ lưới
+        
+        Args:
+            model: RidePricingModel đã huấn luyện
+            preprocessor: RideDataPreprocessor đã khớp
+            grid: Dict tên trục -> các giá trị (mặc định DEFAULT_GRID)
+            reference: Giá trị tham chiếu của các đặc trưng ngoài lưới (mặc định DEFAULT_REFERENCE,
+                vd. reference_from_rides(X_train))
+        
+        Returns:
+            PriceSurface
+        """
+        axes = {name: np.unique(np.asarray(points, dtype=float))
+                for name, points in (grid or DEFAULT_GRID).items()}
+        reference = {**DEFAULT_REFERENCE, **(reference or {})}
+        
+        mesh = np.meshgrid(*axes.values(), indexing='ij')
+        rides_df = pd.DataFrame({name: points.ravel() for name, points in zip(axes, mesh)})
+        for column, value in reference.items():
+            if column != 'minutes_per_km' and column not in rides_df:
+                rides_df[column] = value
+        if 'duration_min' not in rides_df:
+            rides_df['duration_min'] = np.round(rides_df['distance_km'] * reference['minutes_per_km'])
+        
+        values = model.predict(preprocessor.transform(rides_df)).reshape(mesh[0].shape)
+        return cls(axes, values, reference)
+    
+    @property
+    def n_points(self):
+        return self.values.size
+    
+    def lookup(self, rides_df):
+        """
+        Giá mô hình của các chuyến nằm trong lưới
+        
+        Args:
+            rides_df: DataFrame chuyến xe (có các cột của lưới)
+        
+        Returns:
+            Tuple (mảng giá, NaN với chuyến ngoài lưới; mảng bool chuyến nằm trong lưới)
+        """
+        n_rides = len(rides_df)
+        in_grid = np.ones(n_rides, dtype=bool)
+        exact_index = []
+        # Mỗi trục liên tục: (chỉ số điểm lưới bên trái, tỷ lệ khoảng cách tới điểm bên phải)
+        interpolated = []
+        
+        for name, points in self.axes.items():
+            x = rides_df[name].to_numpy(dtype=float)
+            if name in CONTINUOUS_AXES and len(points) > 1:
+                in_grid &= (x >= points[0]) & (x <= points[-1])
+                left = np.clip(np.searchsorted(points, x, side='right') - 1, 0, len(points) - 2)
+                fraction = (x - points[left]) / (points[left + 1] - points[left])
+                exact_index.append(None)
+                interpolated.append((left, fraction))
+            else:
+                index = np.clip(np.searchsorted(points, x), 0, len(points) - 1)
+                in_grid &= points[index] == x
+                exact_index.append(index)
+        
+        prices = np.full(n_rides, np.nan)
+        if not in_grid.any():
+            return prices, in_grid
+        
+        rows = np.flatnonzero(in_grid)
+        total = np.zeros(len(rows))
+        # Nội suy đa tuyến tính: cộng giá ở các góc của ô lưới theo trọng số
+        for corner in itertools.product((0, 1), repeat=len(interpolated)):
+            weight = np.ones(len(rows))
+            index, corner_axes = [], iter(zip(corner, interpolated))
+            for axis_index in exact_index:
+                if axis_index is not None:
+                    index.append(axis_index[rows])
+                    continue
+                offset, (left, fraction) = next(corner_axes)
+                index.append(left[rows] + offset)
+                weight *= fraction[rows] if offset else 1 - fraction[rows]
+            total += weight * self.values[tuple(index)]
+        
+        prices[rows] = total
+        return prices, in_grid
+    
+    def predict(self, rides_df, model, preprocessor):
+        """
+        Giá mô hình cho mọi chuyến: tra bảng trong lưới, mô hình thật ngoài lưới
+        
+        Args:
+            rides_df: DataFrame chuyến xe
+            model: RidePricingModel dùng cho các chuyến ngoài lưới
+            preprocessor: RideDataPreprocessor đã khớp
+        
+        Returns:
+            Tuple (mảng giá mô hình, mảng bool chuyến nằm trong lưới)
+        """
+        prices, in_grid = self.lookup(rides_df)
+        if not in_grid.all():
+            outside = rides_df if not in_grid.any() else rides_df[~in_grid]
+            prices[~in_grid] = model.predict(preprocessor.transform(outside))
+        return prices, in_grid
+    
+    def evaluate(self, rides_df, model, preprocessor):
+        """
+        Sai số của bảng giá so với mô hình thật trên các chuyến nằm trong lưới
+        
+        Args:
+            rides_df: DataFrame chuyến xe (vd. tập kiểm thử)
+            model: RidePricingModel đã dùng để tính bảng
+            preprocessor: RideDataPreprocessor đã khớp
+        
+        Returns:
+            Dict với tỷ lệ chuyến nằm trong lưới, MAE, MAPE, p95 và max sai số tuyệt đối
+        """
+        prices, in_grid = self.lookup(rides_df)
+        report = {'rides': len(rides_df), 'coverage': float(in_grid.mean()) if len(rides_df) else 0.0}
+        if not in_grid.any():
+            return report
+        
+        exact = model.predict(preprocessor.transform(rides_df[in_grid]))
+        abs_errors = np.abs(prices[in_grid] - exact)
+        report.update({
+            'mae': float(abs_errors.mean()),
+            'mape': float(np.mean(abs_errors / np.abs(exact)) * 100),
+            'p95_abs_error': float(np.percentile(abs_errors, 95)),
+            'max_abs_error': float(abs_errors.max())
+        })
+        return report
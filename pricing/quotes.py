@@ -0,0 +1,144 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+# Thời gian giữ giá mặc định của một báo giá (giây)
+DEFAULT_QUOTE_TTL_S = 120
+
+# Số báo giá tối đa được giữ trong bộ nhớ
+DEFAULT_MAX_QUOTES = 100000
+
+# Số báo giá hết hạn tối đa được dọn trong mỗi thao tác (dọn dần, không quét toàn bảng)
+EXPIRE_BATCH = 8
+
+class QuoteStore:
+    """
+    Kho báo giá trong bộ nhớ để giữ giá (price lock) cho đến khi khách xác nhận
+    - Mỗi báo giá có mã ngẫu nhiên, tra cứu và xác nhận theo mã là O(1), không tính lại giá
+    - Mọi báo giá có cùng thời hạn nên thứ tự thêm vào cũng là thứ tự hết hạn: báo giá cũ nhất
+      luôn ở đầu OrderedDict
+    - Mỗi lần thêm báo giá dọn tối đa EXPIRE_BATCH báo giá hết hạn ở đầu bảng, nên chi phí
+      dọn được chia đều cho các request thay vì quét toàn bảng; báo giá hết hạn chưa kịp dọn
+      bị bỏ qua khi tra cứu
+    - Khi đầy, báo giá cũ nhất bị loại bỏ
+    """
+    def __init__(self, ttl=DEFAULT_QUOTE_TTL_S, max_quotes=DEFAULT_MAX_QUOTES, clock=time.monotonic):
+        """
+        Khởi tạo kho báo giá
+        
+        Args:
+            ttl: Thời gian giữ giá (giây)
+            max_quotes: Số báo giá tối đa được giữ
+            clock: Hàm trả về thời gian hiện tại (giây, đơn điệu tăng)
+        """
+        if ttl <= 0 or max_quotes <= 0:
+            raise ValueError("ttl và max_quotes phải lớn hơn 0")
+        
+        self.ttl = ttl
+        self.max_quotes = max_quotes
+        self.clock = clock
+        
+        self._lock = threading.Lock()
+        self._quotes = OrderedDict()  # mã báo giá -> (thời điểm hết hạn, báo giá), cũ nhất ở đầu
+        self._counts = {'issued': 0, 'confirmed': 0, 'fetched': 0, 'misses': 0,
+                        'expired': 0, 'evicted': 0}
+    
+    @staticmethod
+    def new_quote_id():
+        """
+        Tạo mã báo giá ngẫu nhiên (khó đoán)
+        """
+        return secrets.token_urlsafe(12)
+    
+    def issue(self, quote, quote_id=None):
+        """
+        Lưu một báo giá và cấp mã cho nó
+        
+        Args:
+            quote: Dict kết quả báo giá (giữ nguyên, không sao chép)
+            quote_id: Mã đã tạo trước bằng new_quote_id (None để tạo mới)
+        
+        Returns:
+            Mã báo giá
+        """
+        quote_id = quote_id or self.new_quote_id()
+        now = self.clock()
+        
+        with self._lock:
+            self._expire(now, EXPIRE_BATCH)
+            while len(self._quotes) >= self.max_quotes:
+                self._quotes.popitem(last=False)
+                self._counts['evicted'] += 1
+            self._quotes[quote_id] = (now + self.ttl, quote)
+            self._counts['issued'] += 1
+        
+        return quote_id
+    
+    def get(self, quote_id):
+        """
+        Lấy lại một báo giá còn hạn
+        
+        Args:
+            quote_id: Mã báo giá
+        
+        Returns:
+            Tuple (báo giá, số giây còn lại) hoặc None nếu không có hoặc đã hết hạn
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._quotes.get(quote_id)
+            if entry is None or entry[0] <= now:
+                self._counts['misses'] += 1
+                return None
+            self._counts['fetched'] += 1
+        
+        return entry[1], entry[0] - now
+    
+    def confirm(self, quote_id):
+        """
+        Xác nhận một báo giá còn hạn; mỗi báo giá chỉ xác nhận được một lần
+        
+        Args:
+            quote_id: Mã báo giá
+        
+        Returns:
+            Tuple (báo giá, số giây còn lại) hoặc None nếu không có, đã hết hạn hoặc đã được xác nhận
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._quotes.pop(quote_id, None)
+            if entry is None or entry[0] <= now:
+                self._counts['misses'] += 1
+                if entry is not None:
+                    self._counts['expired'] += 1
+                return None
+            self._counts['confirmed'] += 1
+        
+        return entry[1], entry[0] - now
+    
+    def stats(self):
+        """
+        Thống kê của kho báo giá
+        
+        Returns:
+            Dict với thời hạn, sức chứa, số báo giá đang giữ và số báo giá đã cấp/xác nhận/
+            lấy lại/không tìm thấy/hết hạn/bị loại bỏ
+        """
+        with self._lock:
+            return {
+                'ttl_s': self.ttl,
+                'max_quotes': self.max_quotes,
+                'size': len(self._quotes),
+                **self._counts
+            }
+    
+    def _expire(self, now, limit):
+        for _ in range(limit):
+            if not self._quotes:
+                return
+            quote_id, (expires_at, _) = next(iter(self._quotes.items()))
+            if expires_at > now:
+                return
+            del self._quotes[quote_id]
+            self._counts['expired'] += 1
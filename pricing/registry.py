@@ -0,0 +1,219 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Thư mục chứa hệ thống định giá của từng khu vực (mỗi khu vực một file <region>.pkl)
+DEFAULT_REGION_DIR = "regions"
+
+# Ngân sách bộ nhớ mặc định cho các hệ thống định giá đang được giữ (MB)
+DEFAULT_MEMORY_BUDGET_MB = 512
+
+# Tên khu vực hợp lệ (cũng là tên file nên không cho phép ký tự đường dẫn)
+_REGION_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+class RegionLoadError(Exception):
+    """
+    File hệ thống định giá của khu vực có nhưng không tải được (hỏng, ghi dở, không unpickle được)
+    """
+
+class _PendingLoad:
+    """
+    Lần tải đang diễn ra của một khu vực, các request khác cho cùng khu vực chờ trên đó
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.system = None
+        self.error = None
+        self.waiters = 0
+
+class PricingSystemRegistry:
+    """
+    Kho hệ thống định giá theo khu vực
+    - Tải hệ thống định giá của một khu vực ở lần dùng đầu tiên
+    - Nhiều request đồng thời cho cùng một khu vực chưa tải chỉ kích hoạt một lần tải
+    - Giữ tổng kích thước các hệ thống đã tải dưới ngân sách bộ nhớ, loại bỏ khu vực
+      ít được dùng gần đây nhất (LRU) khi vượt ngân sách
+    - Ghi nhận số lần hit/tải/loại bỏ của từng khu vực để chọn ngân sách phù hợp
+    """
+    def __init__(self, region_dir=DEFAULT_REGION_DIR, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, loader=None):
+        """
+        Khởi tạo registry
+        
+        Args:
+            region_dir: Thư mục chứa file <region>.pkl của các khu vực
+            memory_budget_mb: Tổng kích thước tối đa của các hệ thống được giữ (MB)
+            loader: Hàm tải hệ thống định giá từ đường dẫn (mặc định joblib.load)
+        """
+        self.region_dir = region_dir
+        self.memory_budget = int(memory_budget_mb * 1024 ** 2)
+        self.loader = loader
+        
+        self._lock = threading.Lock()
+        self._systems = OrderedDict()  # khu vực -> (hệ thống định giá, kích thước), cũ nhất ở đầu
+        self._pending = {}
+        self._stats = {}
+        self.memory_used = 0
+        self.unknown_requests = 0
+    
+    def region_path(self, region):
+        """
+        Đường dẫn file hệ thống định giá của một khu vực
+        
+        Args:
+            region: Tên khu vực
+        
+        Returns:
+            Đường dẫn file
+        """
+        if not isinstance(region, str) or not _REGION_PATTERN.match(region):
+            raise ValueError(f"Tên khu vực không hợp lệ: '{region}'")
+        return os.path.join(self.region_dir, f"{region}.pkl")
+    
+    def available_regions(self):
+        """
+        Các khu vực có file hệ thống định giá trong thư mục
+        """
+        if not os.path.isdir(self.region_dir):
+            return []
+        return sorted(name[:-4] for name in os.listdir(self.region_dir)
+                      if name.endswith('.pkl') and _REGION_PATTERN.match(name[:-4]))
+    
+    def get(self, region):
+        """
+        Lấy hệ thống định giá của một khu vực, tải nếu chưa có
+        
+        Args:
+            region: Tên khu vực
+        
+        Returns:
+            DynamicRidePricingSystem
+        
+        Raises:
+            ValueError: Tên khu vực không hợp lệ
+            KeyError: Khu vực không có hệ thống định giá
+            RegionLoadError: File của khu vực không tải được (không được cache, lần sau tải lại)
+        """
+        path = self.region_path(region)
+        
+        with self._lock:
+            entry = self._systems.get(region)
+            if entry is not None:
+                self._systems.move_to_end(region)
+                self._stats[region]['hits'] += 1
+                return entry[0]
+            
+            pending = self._pending.get(region)
+            if pending is None:
+                pending = self._pending[region] = _PendingLoad()
+                is_loader = True
+            else:
+                pending.waiters += 1
+                is_loader = False
+        
+        if not is_loader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.system
+        
+        # Tải bên ngoài khóa để các khu vực khác không bị chặn
+        try:
+            pending.system = self._load(region, path)
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._pending[region]
+                # Các request đã chờ lần tải này được tính khi lần tải kết thúc
+                if pending.system is not None:
+                    self._stats[region]['waits'] += pending.waiters
+                elif isinstance(pending.error, KeyError):
+                    # Khu vực không tồn tại không có thống kê riêng để số khu vực không tăng theo request
+                    self.unknown_requests += 1 + pending.waiters
+            pending.done.set()
+        
+        return pending.system
+    
+    def evict(self, region):
+        """
+        Bỏ hệ thống định giá của một khu vực khỏi bộ nhớ
+        
+        Returns:
+            True nếu khu vực đang được giữ
+        """
+        with self._lock:
+            if region not in self._systems:
+                return False
+            self._evict(region)
+            return True
+    
+    def stats(self):
+        """
+        Thống kê của registry và từng khu vực
+        
+        Returns:
+            Dict với ngân sách, bộ nhớ đang dùng, các khu vực đang giữ (cũ nhất trước)
+            và số hit/tải/lỗi tải/loại bỏ theo khu vực
+        """
+        with self._lock:
+            return {
+                'memory_budget_mb': self.memory_budget / 1024 ** 2,
+                'memory_used_mb': self.memory_used / 1024 ** 2,
+                'loaded_regions': list(self._systems),
+                'unknown_requests': self.unknown_requests,
+                'regions': {region: {**stats, 'loaded': region in self._systems,
+                                     'size_mb': stats['size_bytes'] / 1024 ** 2}
+                            for region, stats in sorted(self._stats.items())}
+            }
+    
+    def _load(self, region, path):
+        if not os.path.exists(path):
+            raise KeyError(f"Không có hệ thống định giá cho khu vực '{region}'")
+        
+        loader = self.loader
+        if loader is None:
+            import joblib
+            loader = joblib.load
+        
+        started = time.perf_counter()
+        try:
+            system = loader(path)
+        except Exception as e:
+            # Lỗi bên trong loader (kể cả ValueError) không phải lỗi tên khu vực của request
+            print(f"Không tải được hệ thống định giá của khu vực '{region}' từ '{path}': {e!r}")
+            with self._lock:
+                self._region_stats(region)['load_errors'] += 1
+            raise RegionLoadError(f"Không tải được hệ thống định giá của khu vực '{region}'") from e
+        seconds = time.perf_counter() - started
+        # Kích thước file pickle được dùng làm ước lượng bộ nhớ của hệ thống định giá
+        size = os.path.getsize(path)
+        
+        with self._lock:
+            stats = self._region_stats(region)
+            stats['loads'] += 1
+            stats['load_seconds'] += seconds
+            stats['size_bytes'] = size
+            
+            self._systems[region] = (system, size)
+            self.memory_used += size
+            
+            # Loại bỏ các khu vực cũ nhất cho đến khi nằm trong ngân sách (luôn giữ khu vực vừa tải)
+            while self.memory_used > self.memory_budget and len(self._systems) > 1:
+                self._evict(next(iter(self._systems)))
+        
+        return system
+    
+    def _evict(self, region):
+        _, size = self._systems.pop(region)
+        self.memory_used -= size
+        self._region_stats(region)['evictions'] += 1
+    
+    def _region_stats(self, region):
+        stats = self._stats.get(region)
+        if stats is None:
+            stats = self._stats[region] = {'hits': 0, 'waits': 0, 'loads': 0, 'load_errors': 0,
+                                           'evictions': 0, 'load_seconds': 0.0, 'size_bytes': 0}
+        return stats
@@ -0,0 +1,108 @@
+import math
+
+import numpy as np
+
+# Các đặc trưng có thể quét khi phân tích độ nhạy của giá
+SWEEPABLE_FEATURES = [
+    'distance_km', 'duration_min', 'hour', 'weather_condition', 'traffic_level',
+    'available_drivers', 'area_demand', 'vehicle_type', 'user_rating', 'user_previous_rides'
+]
+
+def parse_sweep_axes(ranges, max_cells=10000):
+    """
+    Chuyển mô tả khoảng quét từ request thành danh sách trục của lưới
+    
+    Args:
+        ranges: Dict tên đặc trưng -> danh sách giá trị hoặc
+            dict {"start", "stop", "step"} (bao gồm cả stop)
+        max_cells: Số ô tối đa của lưới
+    
+    Returns:
+        Danh sách tuple (tên đặc trưng, mảng giá trị) theo thứ tự trong request
+    """
+    if not ranges or not isinstance(ranges, dict):
+        raise ValueError("Cần ít nhất một đặc trưng để quét")
+    
+    # Kiểm tra và tính số giá trị của mọi trục trước khi cấp phát bộ nhớ cho bất kỳ trục nào
+    specs = []
+    for name, spec in ranges.items():
+        if name not in SWEEPABLE_FEATURES:
+            raise ValueError(f"Không hỗ trợ quét đặc trưng '{name}'")
+        
+        if isinstance(spec, dict):
+            if 'start' not in spec or 'stop' not in spec:
+                raise ValueError(f"Khoảng quét của '{name}' cần có start và stop")
+            start = _finite_number(spec['start'], name, 'start')
+            stop = _finite_number(spec['stop'], name, 'stop')
+            step = _finite_number(spec.get('step', 1), name, 'step')
+            if step <= 0:
+                raise ValueError(f"Bước quét của '{name}' phải dương")
+            if stop < start:
+                raise ValueError(f"Khoảng quét của '{name}' cần stop >= start")
+            # Bao gồm cả stop; sai số nhỏ để (0.3 - 0) / 0.1 vẫn cho 4 giá trị
+            n_steps = (stop - start) / step
+            if n_steps >= max_cells:
+                raise ValueError(f"Khoảng quét của '{name}' có hơn {max_cells} giá trị")
+            length = math.floor(n_steps + 1e-9) + 1
+            specs.append((name, (start, step), length))
+        elif isinstance(spec, list) and spec:
+            specs.append((name, spec, len(spec)))
+        else:
+            raise ValueError(f"Khoảng quét của '{name}' không hợp lệ")
+    
+    n_cells = math.prod(length for _, _, length in specs)
+    if n_cells > max_cells:
+        raise ValueError(f"Lưới có {n_cells} ô, vượt quá giới hạn {max_cells}")
+    
+    axes = []
+    for name, spec, length in specs:
+        if isinstance(spec, tuple):
+            start, step = spec
+            values = start + step * np.arange(length)
+        else:
+            values = np.array([_finite_number(value, name, 'giá trị') for value in spec])
+        axes.append((name, values))
+    
+    return axes
+
+def _finite_number(value, name, field):
+    # bool là lớp con của int nhưng không phải giá trị quét hợp lệ
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{field} của '{name}' phải là số hữu hạn")
+    return value
+
+def build_sweep_grid(axes):
+    """
+    Tạo tích Descartes của các trục quét
+    
+    Args:
+        axes: Danh sách tuple (tên đặc trưng, mảng giá trị)
+    
+    Returns:
+        Tuple (dict tên đặc trưng -> mảng giá trị đã trải phẳng, kích thước lưới)
+    """
+    mesh = np.meshgrid(*[values for _, values in axes], indexing='ij')
+    shape = mesh[0].shape
+    grid = {name: values.ravel() for (name, _), values in zip(axes, mesh)}
+    
+    return grid, shape
+
+def format_sweep_result(axes, shape, results):
+    """
+    Định dạng kết quả định giá trên lưới thành các tensor giá
+    
+    Args:
+        axes: Danh sách tuple (tên đặc trưng, mảng giá trị)
+        shape: Kích thước lưới
+        results: DataFrame kết quả từ batch_price_rides (theo thứ tự của lưới)
+    
+    Returns:
+        Dict với các trục và tensor giá (dạng list lồng nhau theo thứ tự trục)
+    """
+    return {
+        'axes': [{'name': name, 'values': values.tolist()} for name, values in axes],
+        'shape': list(shape),
+        'optimal_price': results['optimal_price'].to_numpy().reshape(shape).tolist(),
+        'model_price': results['model_price'].to_numpy().reshape(shape).tolist(),
+        'price_percent_change': results['price_percent_change'].to_numpy().reshape(shape).tolist()
+    }
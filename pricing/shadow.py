@@ -0,0 +1,224 @@
+import math
+import queue
+import threading
+import time
+from bisect import bisect_left
+
+from utils.metrics import Counter, stage_prefix
+
+# Biên trên (%) của các bucket histogram chênh lệch giá giữa mô hình thử nghiệm và mô hình đang chạy
+DELTA_PCT_BUCKETS = (-50, -20, -10, -5, -2, -1, -0.5, 0.5, 1, 2, 5, 10, 20, 50)
+
+# Hệ số làm mượt của trung bình trượt (EWMA) dùng để phát hiện độ lệch gần đây
+EWMA_ALPHA = 0.01
+
+# Các giá được so sánh giữa mô hình thử nghiệm và mô hình đang chạy
+COMPARED_PRICES = ('optimal_price', 'model_price')
+
+# Các trường của kết quả định giá được giữ lại để so sánh
+_LIVE_FIELDS = COMPARED_PRICES + ('price_percent_change',)
+
+class _DeltaStats:
+    """
+    Thống kê cộng dồn chênh lệch của một loại giá (bộ nhớ cố định, không lưu từng chuyến)
+    """
+    def __init__(self):
+        self.rides = 0
+        self.sum_delta = 0.0
+        self.sum_abs_delta = 0.0
+        self.sum_sq_delta = 0.0
+        self.sum_pct_delta = 0.0
+        self.max_abs_delta = 0.0
+        self.sum_live_price = 0.0
+        self.sum_shadow_price = 0.0
+        self.ewma_pct_delta = None
+        self.pct_delta_counts = [0] * (len(DELTA_PCT_BUCKETS) + 1)
+    
+    def update(self, live_prices, shadow_prices):
+        for live, shadow in zip(live_prices, shadow_prices):
+            delta = shadow - live
+            pct_delta = delta / live * 100 if live else 0.0
+            
+            self.rides += 1
+            self.sum_delta += delta
+            self.sum_abs_delta += abs(delta)
+            self.sum_sq_delta += delta * delta
+            self.sum_pct_delta += pct_delta
+            self.max_abs_delta = max(self.max_abs_delta, abs(delta))
+            self.sum_live_price += live
+            self.sum_shadow_price += shadow
+            if self.ewma_pct_delta is None:
+                self.ewma_pct_delta = pct_delta
+            else:
+                self.ewma_pct_delta += EWMA_ALPHA * (pct_delta - self.ewma_pct_delta)
+            self.pct_delta_counts[bisect_left(DELTA_PCT_BUCKETS, pct_delta)] += 1
+    
+    def summary(self):
+        if self.rides == 0:
+            return {'rides': 0}
+        
+        mean_delta = self.sum_delta / self.rides
+        return {
+            'rides': self.rides,
+            'mean_live_price': self.sum_live_price / self.rides,
+            'mean_shadow_price': self.sum_shadow_price / self.rides,
+            'mean_delta': mean_delta,
+            'mean_abs_delta': self.sum_abs_delta / self.rides,
+            'std_delta': math.sqrt(max(0.0, self.sum_sq_delta / self.rides - mean_delta ** 2)),
+            'max_abs_delta': self.max_abs_delta,
+            'mean_pct_delta': self.sum_pct_delta / self.rides,
+            'recent_pct_delta': self.ewma_pct_delta,
+            'pct_delta_histogram': {
+                'upper_bounds': list(DELTA_PCT_BUCKETS) + ['+Inf'],
+                'counts': list(self.pct_delta_counts)
+            }
+        }
+
+class _CandidateStats:
+    """
+    Thống kê của một mô hình thử nghiệm so với mô hình đang chạy
+    """
+    def __init__(self):
+        self.errors = 0
+        self.direction_disagreements = 0
+        self.prices = {price: _DeltaStats() for price in COMPARED_PRICES}
+    
+    def update(self, live, shadow):
+        for price, stats in self.prices.items():
+            stats.update(live[price], shadow[price])
+        # Hai mô hình điều chỉnh giá so với giá cơ bản theo hai hướng ngược nhau
+        for live_change, shadow_change in zip(live['price_percent_change'], shadow['price_percent_change']):
+            if live_change * shadow_change < 0:
+                self.direction_disagreements += 1
+    
+    def summary(self):
+        rides = self.prices['optimal_price'].rides
+        return {
+            'rides': rides,
+            'errors': self.errors,
+            'direction_disagreement_rate': self.direction_disagreements / rides if rides else 0.0,
+            **{price: stats.summary() for price, stats in self.prices.items()}
+        }
+
+class ShadowScorer:
+    """
+    Chấm giá song song (shadow) bằng các mô hình thử nghiệm trên lưu lượng thực
+    - Request chỉ đưa dữ liệu chuyến vào hàng đợi có giới hạn; khi đầy thì bỏ qua, không chờ
+    - Các luồng nền lấy theo lô, tính giá bằng từng mô hình thử nghiệm và so với giá đã trả về
+    - Chỉ giữ các thống kê cộng dồn về chênh lệch giá và độ lệch (drift)
+    """
+    def __init__(self, candidates, max_queue=10000, n_workers=2, batch_size=256, max_delay=0.2):
+        """
+        Khởi tạo shadow scorer
+        
+        Args:
+            candidates: Dict tên mô hình thử nghiệm -> DynamicRidePricingSystem
+            max_queue: Số chuyến tối đa đang chờ chấm
+            n_workers: Số luồng nền
+            batch_size: Số chuyến tối đa mỗi lần chấm
+            max_delay: Thời gian chờ tối đa để gom đủ lô (giây); lô lớn giảm chi phí
+                chấm mỗi chuyến và giảm tranh chấp CPU với các request
+        """
+        if not candidates:
+            raise ValueError("Cần ít nhất một mô hình thử nghiệm")
+        
+        self.candidates = dict(candidates)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stats = {name: _CandidateStats() for name in self.candidates}
+        # Bộ đếm không khóa vì được cập nhật trên đường xử lý request
+        self._submitted = Counter()
+        self._dropped = Counter()
+        
+        self._workers = [threading.Thread(target=self._run_worker, name=f'shadow-scorer-{i}', daemon=True)
+                         for i in range(n_workers)]
+        for worker in self._workers:
+            worker.start()
+    
+    def submit(self, ride_data, price_result):
+        """
+        Đưa một chuyến đã được định giá vào hàng đợi chấm shadow (không bao giờ chờ)
+        
+        Args:
+            ride_data: DataFrame một dòng đã dùng để tính giá
+            price_result: Kết quả của get_ride_price cho chuyến đó
+        
+        Returns:
+            True nếu được đưa vào hàng đợi, False nếu bị bỏ qua do hàng đợi đầy
+        """
+        try:
+            self._queue.put_nowait((ride_data, price_result))
+        except queue.Full:
+            self._dropped.inc()
+            return False
+        
+        self._submitted.inc()
+        return True
+    
+    def stats(self):
+        """
+        Thống kê chênh lệch giá của từng mô hình thử nghiệm so với mô hình đang chạy
+        
+        Returns:
+            Dict với số chuyến đã nhận/bỏ qua/đang chờ và thống kê theo mô hình
+        """
+        with self._lock:
+            return {
+                'submitted': self._submitted.value(),
+                'dropped': self._dropped.value(),
+                'queued': self._queue.qsize(),
+                'candidates': {name: stats.summary() for name, stats in self._stats.items()}
+            }
+    
+    def close(self, timeout=None):
+        """
+        Dừng các luồng nền sau khi chấm hết các chuyến đang chờ
+        
+        Args:
+            timeout: Thời gian chờ tối đa cho mỗi luồng (giây)
+        """
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+    
+    def _run_worker(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                                 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = batch[-1] is None
+            items = [item for item in batch if item is not None]
+            if items:
+                self._score(items)
+            if stop:
+                return
+    
+    def _score(self, items):
+        import pandas as pd
+        
+        rides_df = pd.concat([ride_data for ride_data, _ in items], ignore_index=True)
+        live = {key: [float(result[key]) for _, result in items] for key in _LIVE_FIELDS}
+        
+        for name, system in self.candidates.items():
+            try:
+                # Độ trễ của mô hình thử nghiệm được ghi dưới giai đoạn shadow_*, tách khỏi lưu lượng thật
+                with stage_prefix('shadow_'):
+                    results = system._price_batch(rides_df, include_insights=False)
+            except Exception:
+                with self._lock:
+                    self._stats[name].errors += len(items)
+                continue
+            
+            with self._lock:
+                self._stats[name].update(live, {key: results[key].tolist() for key in _LIVE_FIELDS})
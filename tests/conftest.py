@@ -0,0 +1,28 @@
+import pytest
+
+from data.data_generator import TRAINING_REFERENCE_TIME, generate_sample_ride_data
+from data.preprocessor import RideDataPreprocessor
+from models.pricing_model import RidePricingModel
+from pricing.dynamic_pricer import DynamicRidePricingSystem
+
+def make_rides(n_samples, seed):
+    """Dữ liệu chuyến xe tái lập được (mốc thời gian cố định)"""
+    return generate_sample_ride_data(n_samples=n_samples, seed=seed, reference_time=TRAINING_REFERENCE_TIME)
+
+@pytest.fixture(scope='session')
+def training_data():
+    data = make_rides(1500, seed=3)
+    X = data.drop(['ride_id', 'booking_time', 'base_price'], axis=1)
+    preprocessor = RideDataPreprocessor()
+    preprocessor.fit(X)
+    return preprocessor, preprocessor.transform(X), data['base_price']
+
+@pytest.fixture(scope='session')
+def pricing_model(training_data):
+    _, X, y = training_data
+    return RidePricingModel({'n_estimators': 20, 'max_depth': 10}).fit(X, y)
+
+@pytest.fixture(scope='session')
+def pricing_system(training_data, pricing_model):
+    preprocessor, _, _ = training_data
+    return DynamicRidePricingSystem(pricing_model, preprocessor)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from models.compaction import build_compact_forest, search_compaction
+from models.pricing_model import RidePricingModel
+
+def test_full_compact_forest_matches_sklearn_at_float64(training_data, pricing_model):
+    _, X, _ = training_data
+    forest = pricing_model.model
+    
+    compact, merged = build_compact_forest(forest, merge_leaves=False, float32=False)
+    
+    assert merged == 0
+    assert compact.n_trees == len(forest.estimators_)
+    np.testing.assert_allclose(compact.predict(X), forest.predict(X), rtol=1e-12)
+    # Một dòng và dữ liệu dạng mảng (không có tên cột) cho cùng kết quả
+    np.testing.assert_allclose(compact.predict(X.iloc[[5]]), forest.predict(X.iloc[[5]]), rtol=1e-12)
+
+def test_merging_leaves_and_float32_keep_predictions(training_data, pricing_model):
+    _, X, _ = training_data
+    forest = pricing_model.model
+    
+    compact, _ = build_compact_forest(forest)
+    
+    assert compact.threshold.dtype == np.float32
+    np.testing.assert_allclose(compact.predict(X), forest.predict(X), rtol=1e-6)
+
+def test_pruned_forest_matches_truncated_trees(training_data, pricing_model):
+    _, X, _ = training_data
+    forest = pricing_model.model
+    
+    compact, _ = build_compact_forest(forest, n_trees=5, max_depth=3, merge_leaves=False, float32=False)
+    
+    # Cây cắt ở độ sâu 3 dự đoán giá trị của nút mà cây đầy đủ đi tới sau 3 bước
+    expected = []
+    for estimator in forest.estimators_[:5]:
+        paths = estimator.decision_path(X.to_numpy(dtype=np.float32))
+        depth_3_nodes = [row.indices[min(3, len(row.indices) - 1)] for row in paths]
+        expected.append(estimator.tree_.value[depth_3_nodes, 0, 0])
+    np.testing.assert_allclose(compact.predict(X), np.mean(expected, axis=0), rtol=1e-12)
+
+def test_compact_keeps_validation_mae_within_tolerance(training_data):
+    _, X, y = training_data
+    model = RidePricingModel({'n_estimators': 20, 'max_depth': 10}).fit(X.iloc[:1000], y.iloc[:1000])
+    
+    report = model.compact(X.iloc[1000:], y.iloc[1000:], tolerance=0.05)
+    
+    assert report['fallback'] in (None, 'float64')
+    assert report['compacted_mae'] <= report['full_mae'] * 1.05 + 1e-6
+    assert report['mae_increase_upper'] <= 0.05
+    assert report['n_nodes'] <= report['full_n_nodes']
+
+def test_search_keeps_full_forest_when_difference_is_noise():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(60, 3))
+    y = X[:, 0] + rng.normal(0, 1, size=60)
+    forest = RandomForestRegressor(n_estimators=10, random_state=0).fit(X[:40], y[:40])
+    
+    # 20 dòng validation không đủ để khẳng định mức tăng MAE dưới 0.1%
+    search = search_compaction(forest, X[40:], y[40:], tolerance=0.001)
+    
+    # Cấu hình nhỏ hơn có MAE điểm không tăng nhưng cận trên vượt mức thì không được chọn
+    assert search['rejected_by_bound'] > 0
+    assert search['mae_increase'] <= 0.001 and search['mae_increase_upper'] <= 0.001
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from sklearn.metrics import mean_absolute_error, r2_score
+
+from models.evaluation import QuantileSketch, StreamingEvaluator, _RunningMoments, _chunk_moments
+
+@pytest.mark.parametrize('relative_accuracy', [0.01, 0.05])
+def test_quantile_sketch_stays_within_relative_accuracy(relative_accuracy):
+    values = np.random.default_rng(0).lognormal(mean=5, sigma=2, size=50000)
+    sketch = QuantileSketch(relative_accuracy)
+    # Cập nhật theo nhiều phần và gộp sketch cho cùng kết quả như một lần
+    halves = QuantileSketch(relative_accuracy), QuantileSketch(relative_accuracy)
+    for i, part in enumerate(np.array_split(values, 7)):
+        sketch.update(part)
+        halves[i % 2].update(part)
+    halves[0].merge(halves[1])
+    
+    np.testing.assert_array_equal(sketch.counts, halves[0].counts)
+    for q in (0.0, 0.1, 0.5, 0.9, 0.99, 1.0):
+        exact = np.quantile(values, q, method='lower')
+        assert abs(sketch.quantile(q) - exact) <= relative_accuracy * exact, q
+
+def test_quantile_sketch_handles_zero_and_empty():
+    sketch = QuantileSketch()
+    assert np.isnan(sketch.quantile(0.5))
+    sketch.update([0.0, 0.0, 0.0, 10.0, np.nan])
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == pytest.approx(10.0, rel=0.01)
+
+def test_running_moments_merge_matches_single_pass():
+    rng = np.random.default_rng(1)
+    # Giá trị lớn với phương sai nhỏ: gộp ngây thơ (tổng bình phương) mất độ chính xác
+    y_true = 1e6 + rng.normal(0, 10, size=10000)
+    y_pred = y_true + rng.normal(0, 3, size=10000)
+    
+    moments = _RunningMoments()
+    for start, stop in [(0, 1), (1, 2500), (2500, 2600), (2600, 10000)]:
+        true, errors = y_true[start:stop], y_true[start:stop] - y_pred[start:stop]
+        moments.merge(*_chunk_moments(true, errors, np.abs(errors), np.abs(errors) / true))
+    result = moments.result()
+    
+    assert result['n'] == 10000
+    assert result['mae'] == pytest.approx(mean_absolute_error(y_true, y_pred), rel=1e-12)
+    assert result['r2'] == pytest.approx(r2_score(y_true, y_pred), rel=1e-9)
+    assert moments.m2_true == pytest.approx(np.sum((y_true - y_true.mean()) ** 2), rel=1e-9)
+
+def test_streaming_evaluator_matches_in_memory_metrics_per_segment():
+    rng = np.random.default_rng(2)
+    y_true = rng.uniform(10000, 200000, size=3000)
+    y_pred = y_true * rng.normal(1, 0.05, size=3000)
+    vehicle = rng.integers(0, 4, size=3000)
+    
+    evaluator = StreamingEvaluator(segments=['vehicle_type'])
+    for part in np.array_split(np.arange(3000), 5):
+        evaluator.update(y_true[part], y_pred[part], {'vehicle_type': vehicle[part]})
+    result = evaluator.result()
+    
+    assert result['mae'] == pytest.approx(mean_absolute_error(y_true, y_pred))
+    assert result['r2'] == pytest.approx(r2_score(y_true, y_pred))
+    for vehicle_type, metrics in result['segments']['vehicle_type'].items():
+        mask = vehicle == vehicle_type
+        assert metrics['n'] == mask.sum()
+        assert metrics['mae'] == pytest.approx(mean_absolute_error(y_true[mask], y_pred[mask]))
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data.feature_cache import FeatureCache, preprocess_with_cache
+from data.preprocessor import RideDataPreprocessor
+from tests.conftest import make_rides
+
+def _split(seed, n_samples=200):
+    X = make_rides(n_samples, seed=seed).drop(['ride_id', 'booking_time', 'base_price'], axis=1)
+    return X.iloc[:150], X.iloc[150:]
+
+def test_key_ignores_unused_columns_and_tracks_preprocessor_inputs(tmp_path):
+    cache, preprocessor = FeatureCache(str(tmp_path)), RideDataPreprocessor()
+    X_train, _ = _split(seed=1)
+    key = cache.key({'train': X_train}, preprocessor)
+    
+    # Cột preprocessor không đọc (vd. month, mốc thời gian) không đổi khóa
+    assert cache.key({'train': X_train.assign(month=12, booking_time=pd.Timestamp.now())},
+                     preprocessor) == key
+    # Đổi một giá trị đầu vào thì khóa đổi
+    changed = X_train.copy()
+    changed.iloc[0, changed.columns.get_loc('distance_km')] += 0.1
+    assert cache.key({'train': changed}, preprocessor) != key
+
+def test_same_seed_hits_cache_with_identical_matrices(tmp_path):
+    X_train, X_test = _split(seed=2)
+    _, train_first, test_first, hit_first = preprocess_with_cache(X_train, X_test, cache_dir=str(tmp_path))
+    # Dữ liệu sinh lại với cùng seed (mốc thời gian cố định) phải dùng được cache
+    X_train, X_test = _split(seed=2)
+    _, train_second, test_second, hit_second = preprocess_with_cache(X_train, X_test, cache_dir=str(tmp_path))
+    
+    assert (hit_first, hit_second) == (False, True)
+    np.testing.assert_array_equal(train_first.to_numpy(), train_second.to_numpy())
+    np.testing.assert_array_equal(test_first.to_numpy(), test_second.to_numpy())
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = FeatureCache(str(tmp_path), max_entries=2)
+    keys = []
+    for seed, mtime in zip((3, 4, 5), (100, 200, 300)):
+        X_train, _ = _split(seed)
+        preprocessor = RideDataPreprocessor()
+        preprocessor.fit(X_train)
+        key = cache.key({'train': X_train}, preprocessor)
+        cache.save(key, preprocessor, {'train': preprocessor.transform(X_train)})
+        os.utime(tmp_path / key, (mtime, mtime))
+        keys.append(key)
+    
+    # Mục mới nhất luôn được giữ; trong hai mục còn lại, mục dùng gần nhất được giữ
+    assert [key for key, _, _ in cache.entries()] == [keys[2], keys[1]]
+    os.utime(tmp_path / keys[1], (50, 50))
+    assert cache.load(keys[1]) is not None  # đọc lại đánh dấu là vừa được dùng
+    assert cache.entries()[0][0] == keys[1]
+    
+    assert FeatureCache(str(tmp_path), max_entries=5, max_bytes=1).evict(keep=keys[2]) == [keys[1]]
+    assert [key for key, _, _ in cache.entries()] == [keys[2]]
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from pricing.journal import MAX_RIDE_ID_BYTES, QuoteJournal, replay_journal
+
+def _ride(**overrides):
+    ride = {
+        'ride_id': 'R' * 40,
+        'distance_km': 7.3,
+        'duration_min': 18.5,
+        'booking_time': pd.Timestamp('2024-05-01 08:15'),
+        'hour': 8,
+        'day_of_week': 2,
+        'is_weekend': 0,
+        'month': 5,
+        'weather_condition': 1,
+        'traffic_level': 5.5,
+        'available_drivers': 12.5,
+        'area_demand': 61.2,
+        'vehicle_type': 1,
+        'user_rating': 4.7,
+        'user_previous_rides': 25.7,
+        'base_price': 109500.0
+    }
+    ride.update(overrides)
+    return pd.DataFrame([ride])
+
+PRICE_RESULT = {'model_price': 108734.5, 'optimal_price': 131000.0,
+                'price_percent_change': 19.634703196347033, 'applied_rules': 0b1011}
+
+def test_record_then_replay_round_trips_inputs(tmp_path):
+    ride = _ride()
+    journal = QuoteJournal(str(tmp_path), flush_interval=0.01)
+    assert journal.record(ride, PRICE_RESULT, region='hanoi-central')
+    journal.close(5)
+    
+    replayed = pd.concat(list(replay_journal(str(tmp_path))), ignore_index=True)
+    
+    assert len(replayed) == 1
+    record = replayed.iloc[0]
+    assert record['ride_id'] == ride['ride_id'][0]
+    assert record['region'] == 'hanoi-central'
+    for column in ride.columns.drop(['ride_id', 'booking_time']):
+        assert record[column] == ride[column][0], column
+    for key, value in PRICE_RESULT.items():
+        assert record[key] == value, key
+    assert journal.stats()['written'] == 1
+
+def test_record_rejects_oversize_ride_id(tmp_path):
+    journal = QuoteJournal(str(tmp_path), flush_interval=0.01)
+    with pytest.raises(ValueError):
+        journal.record(_ride(ride_id='R' * (MAX_RIDE_ID_BYTES + 1)), PRICE_RESULT)
+    journal.close(5)
+    
+    assert journal.stats()['enqueued'] == 0
+
+def test_record_reports_drop_when_queue_stays_full(tmp_path):
+    journal = QuoteJournal(str(tmp_path), max_pending=1, put_timeout=0.01)
+    # Dừng luồng ghi rồi lấp đầy hàng đợi để mô phỏng đĩa không theo kịp
+    journal.close(5)
+    journal._queue.put_nowait(object())
+    
+    assert not journal.record(_ride(), PRICE_RESULT)
+    assert journal.stats()['dropped'] == 1
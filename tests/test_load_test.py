@@ -0,0 +1,30 @@
+import pytest
+
+from benchmarks.load_test import build_schedule, parse_mix, summarize_results
+
+def test_parse_mix_normalizes_and_rejects_unknown_kinds():
+    assert parse_mix('get_price=8,health=2') == {'get_price': 0.8, 'health': 0.2}
+    with pytest.raises(ValueError):
+        parse_mix('get_price=1,delete=1')
+
+def test_schedule_is_open_loop_and_reproducible():
+    mix = {'get_price': 0.5, 'health': 0.5}
+    schedule = build_schedule(rate=200, duration=5, mix=mix, n_rides=50, seed=7)
+    
+    assert schedule == build_schedule(rate=200, duration=5, mix=mix, n_rides=50, seed=7)
+    times = [at for at, _, _ in schedule]
+    assert times == sorted(times) and 0 <= times[0] and times[-1] < 5
+    # Poisson với 1000 request kỳ vọng: lệch quá 5 độ lệch chuẩn là lỗi
+    assert abs(len(schedule) - 1000) < 5 * 1000 ** 0.5
+    assert {kind for _, kind, _ in schedule} == set(mix)
+
+def test_summarize_results_counts_errors_per_kind_and_window():
+    results = [(0.1, 'get_price', 0.010, None), (0.2, 'get_price', 0.030, 'HTTP 500'),
+               (1.5, 'health', 0.001, None)]
+    
+    report = summarize_results(results, elapsed=2.0, interval=1)
+    
+    assert report['overall']['requests'] == 3
+    assert report['by_kind']['get_price']['error_rate'] == 0.5
+    assert [window['requests'] for window in report['timeline']] == [2, 1]
+    assert report['errors'] == {'HTTP 500': 1}
@@ -0,0 +1,22 @@
+import pandas as pd
+
+from tests.conftest import make_rides
+
+def test_parallel_matches_serial_batch_pricing(pricing_system):
+    rides = make_rides(403, seed=11)
+    
+    serial = pricing_system.batch_price_rides(rides, include_insights=True)
+    # Phần lẻ (403 = 4 x 100 + 3) để kiểm tra ghép kết quả theo đúng thứ tự
+    parallel = pricing_system.batch_price_rides_parallel(rides, n_workers=2, shard_size=100,
+                                                         include_insights=True)
+    
+    pd.testing.assert_frame_equal(parallel[serial.columns], serial)
+
+def test_parallel_single_worker_without_insights(pricing_system):
+    rides = make_rides(50, seed=12)
+    
+    serial = pricing_system.batch_price_rides(rides, include_insights=False)
+    parallel = pricing_system.batch_price_rides_parallel(rides, n_workers=1)
+    
+    assert 'insights' not in parallel
+    pd.testing.assert_frame_equal(parallel[serial.columns], serial)
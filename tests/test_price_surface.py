@@ -0,0 +1,98 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from pricing.price_surface import DEFAULT_REFERENCE, PriceSurface
+from tests.conftest import make_rides
+
+class IdentityPreprocessor:
+    def transform(self, rides_df):
+        return rides_df
+
+class CountingModel:
+    """Giá tuyến tính theo khoảng cách và tắc nghẽn cộng phụ phí theo loại xe và thời tiết"""
+    def __init__(self):
+        self.rows = 0
+    
+    def predict(self, X):
+        self.rows += len(X)
+        return (10000 * X['distance_km'] + 700 * X['traffic_level'] * X['distance_km']
+                + 5000 * X['vehicle_type'] + 3000 * X['weather_condition']).to_numpy(dtype=float)
+
+GRID = {'distance_km': np.arange(0, 11), 'vehicle_type': np.arange(2),
+        'weather_condition': np.arange(2), 'traffic_level': np.arange(0, 11, 2)}
+
+def _rides(**columns):
+    n_rows = len(next(iter(columns.values())))
+    defaults = {'distance_km': 1.0, 'vehicle_type': 0, 'weather_condition': 0, 'traffic_level': 0}
+    return pd.DataFrame({name: columns.get(name, [value] * n_rows) for name, value in defaults.items()})
+
+def test_build_fills_non_grid_features_from_reference():
+    seen = []
+    
+    class RecordingModel(CountingModel):
+        def predict(self, X):
+            seen.append(X)
+            return super().predict(X)
+    
+    surface = PriceSurface.build(RecordingModel(), IdentityPreprocessor(), grid=GRID, reference={'hour': 8})
+    
+    assert surface.values.shape == (11, 2, 2, 6) and surface.n_points == 264
+    assert (seen[0]['hour'] == 8).all() and (seen[0]['user_rating'] == DEFAULT_REFERENCE['user_rating']).all()
+    np.testing.assert_array_equal(seen[0]['duration_min'],
+                                  np.round(seen[0]['distance_km'] * DEFAULT_REFERENCE['minutes_per_km']))
+
+def test_lookup_interpolates_between_grid_points():
+    model = CountingModel()
+    surface = PriceSurface.build(model, IdentityPreprocessor(), grid=GRID)
+    rides = _rides(distance_km=[0.0, 2.5, 7.25, 10.0], traffic_level=[0, 3, 9.5, 10],
+                   vehicle_type=[0, 1, 0, 1], weather_condition=[1, 0, 1, 1])
+    
+    prices, in_grid = surface.lookup(rides)
+    
+    assert in_grid.all()
+    # Nội suy song tuyến tính theo khoảng cách và tắc nghẽn: trên một ô lưới,
+    # distance x traffic được nội suy là trung bình có trọng số của 4 góc
+    distance, traffic = rides['distance_km'].to_numpy(), rides['traffic_level'].to_numpy()
+    low_traffic = np.minimum(np.floor(traffic / 2) * 2, 8)
+    t = (traffic - low_traffic) / 2
+    d_low = np.minimum(np.floor(distance), 9)
+    d = distance - d_low
+    cross = sum(w_d * w_t * (d_low + dd) * (low_traffic + 2 * tt)
+                for dd, w_d in ((0, 1 - d), (1, d)) for tt, w_t in ((0, 1 - t), (1, t)))
+    expected = (10000 * distance + 700 * cross + 5000 * rides['vehicle_type']
+                + 3000 * rides['weather_condition']).to_numpy()
+    np.testing.assert_allclose(prices, expected, rtol=1e-12)
+    # Tại điểm lưới, giá tra bảng đúng bằng giá mô hình
+    assert prices[0] == model.predict(rides.iloc[[0]])[0]
+
+def test_rides_outside_grid_fall_back_to_model():
+    model = CountingModel()
+    surface = PriceSurface.build(model, IdentityPreprocessor(), grid=GRID)
+    rides = _rides(distance_km=[2.0, 12.0, 3.0, 4.0], vehicle_type=[0, 0, 3, 0],
+                   weather_condition=[0, 0, 0, 0.5])
+    model.rows = 0
+    
+    prices, in_grid = surface.predict(rides, model, IdentityPreprocessor())
+    
+    np.testing.assert_array_equal(in_grid, [True, False, False, False])
+    assert model.rows == 3
+    np.testing.assert_allclose(prices, model.predict(rides), rtol=1e-12)
+    
+    report = surface.evaluate(rides, model, IdentityPreprocessor())
+    assert report['coverage'] == 0.25 and report['mae'] == 0.0
+
+def test_pricing_system_uses_surface_for_single_and_batch_quotes(pricing_system, training_data):
+    preprocessor, _, _ = training_data
+    system = copy.copy(pricing_system)
+    system.price_surface = PriceSurface.build(system.model, preprocessor)
+    rides = make_rides(30, seed=21).drop(columns=['booking_time'])
+    
+    batch = system.batch_price_rides(rides, include_insights=False)
+    single = system.get_ride_price(rides.iloc[[0]].reset_index(drop=True))
+    
+    assert single['optimal_price'] == batch['optimal_price'][0]
+    exact = pricing_system.batch_price_rides(rides, include_insights=False)
+    # Sai số nội suy nhỏ so với giá chuyến
+    assert np.median(np.abs(batch['model_price'] - exact['model_price']) / exact['model_price']) < 0.01
@@ -0,0 +1,66 @@
+import pytest
+
+from pricing.quotes import EXPIRE_BATCH, QuoteStore
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+def test_quote_is_held_until_ttl():
+    clock = FakeClock()
+    store = QuoteStore(ttl=120, clock=clock)
+    quote = {'optimal_price': 131000.0}
+    quote_id = store.issue(quote)
+    
+    clock.now += 119.5
+    assert store.get(quote_id) == (quote, pytest.approx(0.5))
+    clock.now += 0.5
+    assert store.get(quote_id) is None
+    assert store.get('unknown') is None
+    assert store.stats()['misses'] == 2
+
+def test_confirm_is_one_shot_and_rejects_expired_quotes():
+    clock = FakeClock()
+    store = QuoteStore(ttl=60, clock=clock)
+    first, second = store.issue({'price': 1}), store.issue({'price': 2})
+    
+    assert store.confirm(first) == ({'price': 1}, 60)
+    assert store.confirm(first) is None
+    clock.now += 60
+    assert store.confirm(second) is None
+    
+    stats = store.stats()
+    assert (stats['confirmed'], stats['expired'], stats['size']) == (1, 1, 0)
+
+def test_expired_quotes_are_removed_a_batch_at_a_time():
+    clock = FakeClock()
+    store = QuoteStore(ttl=10, clock=clock)
+    for _ in range(3 * EXPIRE_BATCH):
+        store.issue({})
+    clock.now += 10
+    
+    # Mỗi báo giá mới chỉ dọn tối đa EXPIRE_BATCH báo giá hết hạn ở đầu bảng
+    store.issue({})
+    assert store.stats()['size'] == 2 * EXPIRE_BATCH + 1
+    store.issue({})
+    store.issue({})
+    stats = store.stats()
+    assert (stats['size'], stats['expired']) == (3, 3 * EXPIRE_BATCH)
+
+def test_oldest_quote_is_evicted_when_full():
+    store = QuoteStore(ttl=60, max_quotes=2, clock=FakeClock())
+    ids = [store.issue({'n': n}, store.new_quote_id()) for n in range(3)]
+    
+    assert store.get(ids[0]) is None
+    assert store.get(ids[2])[0] == {'n': 2}
+    assert store.stats()['evicted'] == 1
+    assert len(set(ids)) == 3
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError):
+        QuoteStore(ttl=0)
+    with pytest.raises(ValueError):
+        QuoteStore(max_quotes=0)
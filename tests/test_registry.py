@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from pricing.registry import PricingSystemRegistry, RegionLoadError
+
+def _write_regions(region_dir, sizes):
+    for region, size in sizes.items():
+        (region_dir / f'{region}.pkl').write_bytes(b'x' * size)
+
+def test_concurrent_first_requests_share_one_load(tmp_path):
+    _write_regions(tmp_path, {'hanoi': 10})
+    release = threading.Event()
+    calls = []
+    
+    def loader(path):
+        calls.append(path)
+        release.wait(5)
+        return object()
+    
+    registry = PricingSystemRegistry(str(tmp_path), loader=loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('hanoi'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # Chờ cho đến khi mọi luồng khác đã chờ trên lần tải đang diễn ra
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        pending = registry._pending.get('hanoi')
+        if pending is not None and pending.waiters == 7:
+            break
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    
+    assert len(calls) == 1
+    assert len(results) == 8 and all(system is results[0] for system in results)
+    stats = registry.stats()['regions']['hanoi']
+    assert (stats['loads'], stats['waits'], stats['hits']) == (1, 7, 0)
+
+def test_least_recently_used_region_is_evicted_over_budget(tmp_path):
+    _write_regions(tmp_path, {'a': 400 * 1024, 'b': 400 * 1024, 'c': 400 * 1024})
+    loads = []
+    registry = PricingSystemRegistry(str(tmp_path), memory_budget_mb=1,
+                                     loader=lambda path: loads.append(path) or object())
+    
+    registry.get('a')
+    registry.get('b')
+    registry.get('a')  # b thành khu vực ít được dùng gần đây nhất
+    registry.get('c')
+    
+    assert registry.stats()['loaded_regions'] == ['a', 'c']
+    assert registry.memory_used == 800 * 1024
+    registry.get('b')
+    assert len(loads) == 4
+    assert registry.stats()['regions']['b']['evictions'] == 1
+
+def test_failed_load_is_reported_and_not_cached(tmp_path):
+    _write_regions(tmp_path, {'broken': 10})
+    attempts = []
+    
+    def loader(path):
+        attempts.append(path)
+        if len(attempts) == 1:
+            raise ValueError('truncated pickle')
+        return 'system'
+    
+    registry = PricingSystemRegistry(str(tmp_path), loader=loader)
+    with pytest.raises(RegionLoadError):
+        registry.get('broken')
+    assert registry.stats()['loaded_regions'] == []
+    
+    assert registry.get('broken') == 'system'
+    stats = registry.stats()['regions']['broken']
+    assert (stats['load_errors'], stats['loads']) == (1, 1)
+
+def test_invalid_and_unknown_regions(tmp_path):
+    registry = PricingSystemRegistry(str(tmp_path), loader=lambda path: object())
+    
+    with pytest.raises(ValueError):
+        registry.get('../etc')
+    with pytest.raises(KeyError):
+        registry.get('nowhere')
+    assert registry.stats()['unknown_requests'] == 1
+    assert registry.stats()['regions'] == {}
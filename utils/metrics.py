@@ -0,0 +1,273 @@
+import threading
+import time
+from contextlib import contextmanager
+from bisect import bisect_left
+
+# Biên trên (giây) của các bucket histogram độ trễ, cố định cho mọi giai đoạn
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Số shard cố định của mỗi chỉ số; số nguyên tố để phân tán đều mã luồng
+# (get_ident thường là địa chỉ stack nên chia hết cho các lũy thừa của 2)
+_N_SHARDS = 31
+
+_enabled = True
+
+# Tiền tố tên giai đoạn theo luồng (xem stage_prefix)
+_stage_context = threading.local()
+
+class _ShardedCells:
+    """
+    Mảng bộ đếm chia thành một số shard cố định, mỗi shard có khóa riêng
+    - Luồng ghi vào shard get_ident() % _N_SHARDS: không cần đăng ký shard hay khóa toàn cục,
+      nên server tạo một luồng cho mỗi request cũng chỉ lấy khóa của một shard
+    - Hai luồng chỉ tranh chấp khi cùng ghi vào một shard tại cùng thời điểm
+    - Khi đọc tổng, khóa lần lượt từng shard
+    """
+    def __init__(self, size):
+        self.size = size
+        self._shards = [(threading.Lock(), [0] * size) for _ in range(_N_SHARDS)]
+    
+    def shard(self):
+        """
+        Trả về (khóa, mảng bộ đếm) của shard dành cho luồng hiện tại
+        """
+        return self._shards[threading.get_ident() % _N_SHARDS]
+    
+    def totals(self):
+        """
+        Cộng dồn giá trị của tất cả các shard
+        """
+        totals = [0] * self.size
+        for lock, cells in self._shards:
+            with lock:
+                for i, value in enumerate(cells):
+                    totals[i] += value
+        return totals
+
+class Counter:
+    """
+    Bộ đếm (hoặc gauge khi dùng cả inc và dec), ghi vào shard theo luồng
+    """
+    def __init__(self):
+        self._cells = _ShardedCells(1)
+    
+    def inc(self, amount=1):
+        lock, cells = self._cells.shard()
+        with lock:
+            cells[0] += amount
+    
+    def dec(self, amount=1):
+        lock, cells = self._cells.shard()
+        with lock:
+            cells[0] -= amount
+    
+    def value(self):
+        return self._cells.totals()[0]
+
+class Histogram:
+    """
+    Histogram với các bucket cố định, ghi vào shard theo luồng
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # Bố cục: [số mẫu theo từng bucket..., số mẫu lớn hơn bucket cuối, tổng giá trị]
+        self._cells = _ShardedCells(len(self.buckets) + 2)
+    
+    def observe(self, value):
+        bucket = bisect_left(self.buckets, value)
+        lock, cells = self._cells.shard()
+        with lock:
+            cells[bucket] += 1
+            cells[-1] += value
+    
+    def snapshot(self):
+        """
+        Returns:
+            Tuple (số mẫu theo từng bucket, bao gồm +Inf; tổng giá trị)
+        """
+        totals = self._cells.totals()
+        return totals[:-1], totals[-1]
+
+class _StageTimer:
+    __slots__ = ('histogram', 'started')
+    
+    def __init__(self, histogram):
+        self.histogram = histogram
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+class _NoopTimer:
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NOOP_TIMER = _NoopTimer()
+
+class MetricsRegistry:
+    """
+    Tập hợp các chỉ số của hệ thống: histogram độ trễ theo giai đoạn, số request,
+    số lỗi và số request đang xử lý theo endpoint
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_latency = {}
+        self.request_latency = {}
+        self.requests = {}
+        self.errors = {}
+        self.in_flight = {}
+    
+    def stage_histogram(self, stage):
+        return self._get_or_create(self.stage_latency, stage, Histogram)
+    
+    def request_histogram(self, endpoint):
+        return self._get_or_create(self.request_latency, endpoint, Histogram)
+    
+    def request_counter(self, endpoint):
+        return self._get_or_create(self.requests, endpoint, Counter)
+    
+    def error_counter(self, endpoint, status):
+        return self._get_or_create(self.errors, (endpoint, status), Counter)
+    
+    def in_flight_gauge(self, endpoint):
+        return self._get_or_create(self.in_flight, endpoint, Counter)
+    
+    def _get_or_create(self, metrics, key, factory):
+        metric = metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = metrics.get(key)
+                if metric is None:
+                    metric = metrics[key] = factory()
+        return metric
+    
+    def render_prometheus(self):
+        """
+        Xuất các chỉ số theo định dạng văn bản của Prometheus
+        
+        Returns:
+            Chuỗi văn bản
+        """
+        lines = []
+        
+        lines += _render_histograms('ride_pricing_stage_latency_seconds',
+                                    'Độ trễ của từng giai đoạn tính giá', 'stage', self.stage_latency)
+        lines += _render_histograms('ride_pricing_request_latency_seconds',
+                                    'Độ trễ của request theo endpoint', 'endpoint', self.request_latency)
+        
+        lines.append('# HELP ride_pricing_requests_total Tổng số request theo endpoint')
+        lines.append('# TYPE ride_pricing_requests_total counter')
+        for endpoint, counter in sorted(self.requests.items()):
+            lines.append(f'ride_pricing_requests_total{{endpoint="{endpoint}"}} {counter.value()}')
+        
+        lines.append('# HELP ride_pricing_request_errors_total Số request lỗi theo endpoint và mã trạng thái')
+        lines.append('# TYPE ride_pricing_request_errors_total counter')
+        for (endpoint, status), counter in sorted(self.errors.items()):
+            lines.append(f'ride_pricing_request_errors_total{{endpoint="{endpoint}",status="{status}"}} '
+                         f'{counter.value()}')
+        
+        lines.append('# HELP ride_pricing_requests_in_flight Số request đang được xử lý theo endpoint')
+        lines.append('# TYPE ride_pricing_requests_in_flight gauge')
+        for endpoint, gauge in sorted(self.in_flight.items()):
+            lines.append(f'ride_pricing_requests_in_flight{{endpoint="{endpoint}"}} {gauge.value()}')
+        
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+def timed(stage):
+    """
+    Context manager đo thời gian của một giai đoạn và ghi vào histogram của giai đoạn đó
+    
+    Args:
+        stage: Tên giai đoạn (vd. 'transform', 'predict', 'business_rules')
+    
+    Returns:
+        Context manager
+    """
+    if not _enabled:
+        return _NOOP_TIMER
+    prefix = getattr(_stage_context, 'prefix', None)
+    if prefix is not None:
+        stage = prefix + stage
+    return _StageTimer(REGISTRY.stage_histogram(stage))
+
+@contextmanager
+def stage_prefix(prefix):
+    """
+    Thêm tiền tố vào tên mọi giai đoạn được đo trong luồng hiện tại, để các lần tính giá
+    nền (vd. chấm điểm shadow) không lẫn vào histogram của lưu lượng thật
+    
+    Args:
+        prefix: Tiền tố (vd. 'shadow_')
+    """
+    previous = getattr(_stage_context, 'prefix', None)
+    _stage_context.prefix = prefix
+    try:
+        yield
+    finally:
+        _stage_context.prefix = previous
+
+def set_enabled(enabled):
+    """
+    Bật/tắt việc đo thời gian các giai đoạn
+    
+    Args:
+        enabled: True để bật
+    """
+    global _enabled
+    _enabled = enabled
+
+def measure_timer_overhead(n_iterations=100000):
+    """
+    Đo chi phí trung bình của một lần đo giai đoạn qua timed() (so với vòng lặp rỗng),
+    gồm cả bước kiểm tra bật/tắt và tra cứu histogram trong REGISTRY
+    
+    Args:
+        n_iterations: Số lần lặp
+    
+    Returns:
+        Chi phí của một lần đo (giây)
+    """
+    started = time.perf_counter()
+    for _ in range(n_iterations):
+        pass
+    empty = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    for _ in range(n_iterations):
+        with timed('probe'):
+            pass
+    instrumented = time.perf_counter() - started
+    
+    # Không để lại histogram của phép đo trong /api/metrics
+    with REGISTRY._lock:
+        REGISTRY.stage_latency.pop('probe', None)
+    
+    return max(0.0, instrumented - empty) / n_iterations
+
+def _render_histograms(name, description, label, histograms):
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+    for key, histogram in sorted(histograms.items()):
+        counts, total = histogram.snapshot()
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {cumulative}')
+        lines.append(f'{name}_sum{{{label}="{key}"}} {total}')
+        lines.append(f'{name}_count{{{label}="{key}"}} {cumulative}')
+    return lines